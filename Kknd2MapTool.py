@@ -0,0 +1,205 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+
+from Kknd2Reader.KkndFileMapd import ReadMaps
+from Kknd2Reader.TerrainAttributes import LoadTerrainAttributeIcons
+from Kknd2Reader.ExportTiled import ExportTiledMap
+from Kknd2Reader.KkndMinimap import ExportMinimapPng
+from Kknd2Reader.KkndEntityCatalog import BuildEntityCatalog
+from Kknd2Reader.KkndCreatureLib import CreatureLibrary
+from Kknd2Reader.PngFile import WritePngRgba, PNG_FILTERS, PNG_FILTER_ADAPTIVE
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+def FindMapFiles(pathList : list[str]) -> list[str]:
+    """ Returns the map files, directories are searched recursively for *.lpm and *.lps files.
+
+    Args:
+        pathList (list[str]): Map files and directories.
+
+    Returns:
+        list[str]: The map files.
+    """
+    mapFileList : list[str] = []
+
+    for path in pathList:
+        if not os.path.isdir(path):
+            mapFileList.append(path)
+            continue
+
+        for dirPath, _, fileNames in os.walk(path):
+            for fileName in sorted(fileNames):
+                if fileName.lower().endswith((".lpm", ".lps")):
+                    mapFileList.append(os.path.join(dirPath, fileName))
+
+    return mapFileList
+
+def ExportTerrainAttributes(mapFileName : str, outFileName : str | None = None) -> str:
+    """ Renders the terrain attributes of a map as PNG overlay without the GUI.
+
+    Args:
+        mapFileName (str): The map file (*.lpm or *.lps).
+        outFileName (str | None, optional): The PNG file. Defaults to <map file>_attributes.png.
+
+    Returns:
+        str: The name of the written PNG file.
+    """
+    if outFileName is None:
+        outFileName = str(Path(mapFileName).with_suffix("")) + "_attributes.png"
+
+    map = ReadMaps(mapFileName)[0]
+    layer = map.LayerList[0]
+    icons = LoadTerrainAttributeIcons(tileWidth = layer.TileWidthInPixels, tileHeight = layer.TileHeightInPixels)
+
+    WritePngRgba(outFileName, map.RenderTerrainAttributesRgba(icons))
+
+    return outFileName
+
+def ExportLayers(mapFileName : str, compressionLevel : int = 6, filterStrategy : str = "none") -> list[str]:
+    """ Exports the bottom and top layer of a map as 8 bit palette PNG files.
+
+    Args:
+        mapFileName (str): The map file (*.lpm or *.lps).
+        compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+        filterStrategy (str, optional): The PNG row filter or "adaptive". Defaults to "none".
+
+    Returns:
+        list[str]: The names of the written PNG files.
+    """
+    baseFileName = str(Path(mapFileName).with_suffix(""))
+    map = ReadMaps(mapFileName)[0]
+    fileNameList : list[str] = []
+
+    for layerIndex, layerName in enumerate(["bottom", "top"][: len(map.LayerList)]):
+        fileName = f"{baseFileName}_{layerName}.png"
+        map.ExportLayerPng(layerIndex, fileName, compressionLevel, filterStrategy)
+        fileNameList.append(fileName)
+
+    return fileNameList
+
+def ExportMinimaps(mapFileList : list[str], samples : int = 1, outDir : str | None = None) -> None:
+    """ Exports a small preview PNG for every map.
+
+    Args:
+        mapFileList (list[str]): The map files.
+        samples (int, optional): Number of pixels per tile row and column, e.g. 1, 2 or 4. Defaults to 1.
+        outDir (str | None, optional): The output directory. Defaults to the directory of each map.
+    """
+    startTime = time.perf_counter()
+
+    for mapFileName in mapFileList:
+        baseFileName = str(Path(mapFileName).with_suffix(""))
+        if outDir is not None:
+            baseFileName = os.path.join(outDir, Path(baseFileName).name)
+
+        fileName = baseFileName + "_minimap.png"
+        ExportMinimapPng(ReadMaps(mapFileName)[0], fileName, samples)
+        print(fileName)
+
+    print(f"{len(mapFileList)} minimaps in {time.perf_counter() - startTime:.1f} s")
+
+def ExportEntityCatalog(mapFileList : list[str], outFileName : str, creatureLibFileName : str | None = None,
+                        maxWorkers : int | None = None) -> None:
+    """ Extracts the entities of all maps into one table and saves it as NumPy archive (*.npz) or CSV file (*.csv).
+
+    Args:
+        mapFileList (list[str]): The map files.
+        outFileName (str): The output file, the format is chosen by the extension.
+        creatureLibFileName (str | None, optional): The creature library for the entity names. Defaults to None.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to None for the number of CPUs.
+    """
+    startTime = time.perf_counter()
+
+    creatureLibrary = None
+    if creatureLibFileName is not None and os.path.isfile(creatureLibFileName):
+        creatureLibrary = CreatureLibrary()
+        creatureLibrary.ReadLibraryFile(creatureLibFileName)
+
+    catalog = BuildEntityCatalog(mapFileList, creatureLibrary, maxWorkers)
+
+    if outFileName.lower().endswith(".csv"):
+        catalog.SaveCsv(outFileName)
+    else:
+        catalog.SaveNpz(outFileName)
+
+    for mapName, count in zip(catalog.MapNames.tolist(), catalog.CountByMap().tolist()):
+        print(f"{mapName}: {count} entities")
+
+    print(f"{len(catalog)} entities of {len(mapFileList)} maps in {time.perf_counter() - startTime:.1f} s -> {outFileName}")
+
+def Main() -> None:
+    parser = argparse.ArgumentParser(description = "KKND2 map tool")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    commandAttributes = commands.add_parser("attributes", help = "export the terrain attributes of maps as PNG overlay")
+    commandAttributes.add_argument("maps", nargs = "+", help = "map files (*.lpm or *.lps)")
+
+    commandLayers = commands.add_parser("layers", help = "export the bottom and top layer of maps as 8 bit palette PNG")
+    commandLayers.add_argument("maps", nargs = "+", help = "map files (*.lpm or *.lps)")
+    commandLayers.add_argument("--level", type = int, default = 6, help = "zlib compression level 0..9")
+    commandLayers.add_argument("--filter", default = "none", choices = list(PNG_FILTERS) + [PNG_FILTER_ADAPTIVE], help = "PNG row filter")
+
+    commandTiled = commands.add_parser("tiled", help = "export maps for the Tiled map editor (TMX + TSX + tileset PNG)")
+    commandTiled.add_argument("maps", nargs = "+", help = "map files (*.lpm or *.lps)")
+
+    commandMinimap = commands.add_parser("minimap", help = "export small preview PNG files for maps")
+    commandMinimap.add_argument("maps", nargs = "+", help = "map files or directories with map files")
+    commandMinimap.add_argument("--samples", type = int, default = 1, help = "pixels per tile row and column, e.g. 1, 2 or 4")
+    commandMinimap.add_argument("--out", default = None, help = "output directory")
+
+    commandCatalog = commands.add_parser("catalog", help = "extract the entities of all maps into one table (*.npz or *.csv)")
+    commandCatalog.add_argument("maps", nargs = "+", help = "map files or directories with map files")
+    commandCatalog.add_argument("--out", default = "entities.npz", help = "output file (*.npz or *.csv)")
+    commandCatalog.add_argument("--library", default = os.path.join("assets", "creature.klb"), help = "creature library for the entity names")
+    commandCatalog.add_argument("--workers", type = int, default = None, help = "number of worker processes")
+
+    args = parser.parse_args()
+
+    if args.command == "attributes":
+        for mapFileName in args.maps:
+            print(ExportTerrainAttributes(mapFileName))
+
+    elif args.command == "layers":
+        for mapFileName in args.maps:
+            for fileName in ExportLayers(mapFileName, args.level, args.filter):
+                print(fileName)
+
+    elif args.command == "tiled":
+        for mapFileName in args.maps:
+            print(ExportTiledMap(ReadMaps(mapFileName)[0], str(Path(mapFileName).with_suffix(""))))
+
+    elif args.command == "minimap":
+        ExportMinimaps(FindMapFiles(args.maps), args.samples, args.out)
+
+    elif args.command == "catalog":
+        ExportEntityCatalog(FindMapFiles(args.maps), args.out, args.library, args.workers)
+
+if __name__ == "__main__":
+    
+    Main()
@@ -28,7 +28,7 @@ import base64
 import zlib
 
 from Kknd2Reader.KkndFileContainer import ContainerFileType
-from Kknd2Reader.KkndFileMobd import MobdFrame, MobdFile, MobdAnimation
+from Kknd2Reader.KkndFileMobd import MobdFrame, MobdAnimation, MobdFileCache
 
 def ExportFrame(frame : MobdFrame) -> dict[str, Any]:
     
@@ -49,74 +49,76 @@ def ExportAnimation(animation : MobdAnimation) -> list[Any]:
 
     return [ ExportFrame(frame) for frame in animation.FrameList ]
 
-def ExportGraphics(fileList : ContainerFileType, deathFileIdx : int, deathAnimationIdx : int) -> dict[str, Any]:
+def ExportGraphics(mobdFiles : MobdFileCache, deathFileIdx : int, deathAnimationIdx : int) -> dict[str, Any]:
 
     # TODO: it seems there are multiple death animations for some units
 
-    deathMobd = MobdFile(fileList.FileList[deathFileIdx])
-    deathAnimation = deathMobd.AnimationList[deathAnimationIdx]
+    deathAnimation = mobdFiles.GetAnimation(deathFileIdx, deathAnimationIdx)
 
     return {
         "Death": ExportAnimation(deathAnimation)
     }
 
-def ExportUnit(fileList : ContainerFileType, id : int, name : str, price : int,
+def ExportUnit(mobdFiles : MobdFileCache, id : int, name : str, price : int,
                deathFileIdx : int, deathAnimationIdx : int) -> dict[str, Any]:
 
     return {
         "Id": id,
         "Name": name,
         "Price": price,
-        "Gfx": ExportGraphics(fileList, deathFileIdx, deathAnimationIdx)
+        "Gfx": ExportGraphics(mobdFiles, deathFileIdx, deathAnimationIdx)
     }
 
-def ExportSurvivors(fileList : ContainerFileType) -> dict[str, Any]:
+def ExportSurvivors(mobdFiles : MobdFileCache) -> dict[str, Any]:
 
     return {
         "Army": "Survivors",
         "Units": [
-            ExportUnit(fileList, 1, "Machine gunner", 100, 199, 3),
-            ExportUnit(fileList, 2, "Grenadier", 125, 199, 2),
-            ExportUnit(fileList, 3, "Flamer", 200, 199, 1),
-            ExportUnit(fileList, 4, "Rocketeer", 200, 199, 7),
-            ExportUnit(fileList, 5, "Kamikaze", 250, 4, 0),
-            ExportUnit(fileList, 6, "Laser rifleman", 250, 199, 9),
-            ExportUnit(fileList, 7, "Technician", 100, 199, 10)
+            ExportUnit(mobdFiles, 1, "Machine gunner", 100, 199, 3),
+            ExportUnit(mobdFiles, 2, "Grenadier", 125, 199, 2),
+            ExportUnit(mobdFiles, 3, "Flamer", 200, 199, 1),
+            ExportUnit(mobdFiles, 4, "Rocketeer", 200, 199, 7),
+            ExportUnit(mobdFiles, 5, "Kamikaze", 250, 4, 0),
+            ExportUnit(mobdFiles, 6, "Laser rifleman", 250, 199, 9),
+            ExportUnit(mobdFiles, 7, "Technician", 100, 199, 10)
         ]
     }
 
-def ExportEvolved(fileList : ContainerFileType) -> dict[str, Any]:
+def ExportEvolved(mobdFiles : MobdFileCache) -> dict[str, Any]:
     return {
         "Army": "Evolved",
         "Units": [
-            ExportUnit(fileList, 1, "Berzerker", 100, 46, 3),
-            ExportUnit(fileList, 2, "Rioter", 125, 46, 2),
-            ExportUnit(fileList, 3, "Pyromaniac", 200, 46, 1),
-            ExportUnit(fileList, 4, "Homing bazookoid", 200, 46, 4),
-            ExportUnit(fileList, 5, "Martyr", 250, 4, 0),
-            ExportUnit(fileList, 6, "Spirit archer", 250, 46, 5),
-            ExportUnit(fileList, 7, "Mekanik", 100, 46, 6)
+            ExportUnit(mobdFiles, 1, "Berzerker", 100, 46, 3),
+            ExportUnit(mobdFiles, 2, "Rioter", 125, 46, 2),
+            ExportUnit(mobdFiles, 3, "Pyromaniac", 200, 46, 1),
+            ExportUnit(mobdFiles, 4, "Homing bazookoid", 200, 46, 4),
+            ExportUnit(mobdFiles, 5, "Martyr", 250, 4, 0),
+            ExportUnit(mobdFiles, 6, "Spirit archer", 250, 46, 5),
+            ExportUnit(mobdFiles, 7, "Mekanik", 100, 46, 6)
         ]
     }
 
-def ExportSeries9(fileList : ContainerFileType) -> dict[str, Any]:
+def ExportSeries9(mobdFiles : MobdFileCache) -> dict[str, Any]:
     return {
         "Army": "Series9",
         "Units": [
-            ExportUnit(fileList, 1, "Seeder", 250, 125, 1),
-            ExportUnit(fileList, 2, "Pod launcher", 300, 125, 2),
-            ExportUnit(fileList, 3, "Weed killer", 450, 125, 4),
-            ExportUnit(fileList, 4, "Spore missile", 450, 125, 3),
-            ExportUnit(fileList, 5, "Michelangelo", 500, 4, 0),
-            ExportUnit(fileList, 6, "Steriliser", 600, 125, 0),
-            ExportUnit(fileList, 7, "Systech", 100, 125, 5)
+            ExportUnit(mobdFiles, 1, "Seeder", 250, 125, 1),
+            ExportUnit(mobdFiles, 2, "Pod launcher", 300, 125, 2),
+            ExportUnit(mobdFiles, 3, "Weed killer", 450, 125, 4),
+            ExportUnit(mobdFiles, 4, "Spore missile", 450, 125, 3),
+            ExportUnit(mobdFiles, 5, "Michelangelo", 500, 4, 0),
+            ExportUnit(mobdFiles, 6, "Steriliser", 600, 125, 0),
+            ExportUnit(mobdFiles, 7, "Systech", 100, 125, 5)
         ]
     }
     
 def ExportInfantery(fileList : ContainerFileType) -> dict[str, Any]:
 
+    # the units share few MOBD files, each file is parsed only once
+    mobdFiles = MobdFileCache(fileList.FileList)
+
     return {
-        "Survivors": ExportSurvivors(fileList),
-        "Evolved": ExportEvolved(fileList),
-        "Series9": ExportSeries9(fileList)
+        "Survivors": ExportSurvivors(mobdFiles),
+        "Evolved": ExportEvolved(mobdFiles),
+        "Series9": ExportSeries9(mobdFiles)
     }
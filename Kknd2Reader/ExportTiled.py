@@ -0,0 +1,229 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import base64
+import math
+import os
+import shutil
+import zlib
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from Kknd2Reader.KkndFileMapd import MapdFile, MapdLayer, MapdTile
+from Kknd2Reader.PngFile import WritePngIndexed, ReadPngRgba
+from Kknd2Reader.TerrainAttributes import ETerrainAttribute, TerrainAttributeIconsFileName
+
+# number of tiles per row in the tileset image
+TILESET_COLUMNS = 32
+
+class TiledTileset:
+    """ The unique tiles of all map layers. Each tile content is stored only once.
+    """
+
+    # the unique tiles, local tile ID = index in the list
+    TileList : list[MapdTile]
+
+    # local tile ID by tile content hash
+    TileIdByContentHash : dict[bytes, int]
+
+    # content hash of the empty tile, mapped to GID 0
+    EmptyContentHash : bytes
+
+    def __init__(self, emptyTile : MapdTile) -> None:
+        self.TileList = []
+        self.TileIdByContentHash = {}
+        self.EmptyContentHash = emptyTile.ContentHash
+
+    def AddLayer(self, layer : MapdLayer, firstGid : int) -> npt.NDArray[np.uint32]:
+        """ Adds the tiles of the layer to the tileset.
+
+        Args:
+            layer (MapdLayer): The layer.
+            firstGid (int): The first global tile ID of the tileset in the map.
+
+        Returns:
+            npt.NDArray[np.uint32]: The global tile IDs of the layer, 0 = no tile [MapHeightInTiles, MapWidthInTiles].
+        """
+        gidByTileOffset : dict[int, int] = {}
+
+        for tileOffset, tile in layer.TileList.items():
+            if tile.ContentHash == self.EmptyContentHash:
+                gidByTileOffset[tileOffset] = 0
+                continue
+
+            tileId = self.TileIdByContentHash.get(tile.ContentHash)
+            if tileId is None:
+                tileId = len(self.TileList)
+                self.TileIdByContentHash[tile.ContentHash] = tileId
+                self.TileList.append(tile)
+
+            gidByTileOffset[tileOffset] = firstGid + tileId
+
+        gids = np.array([gidByTileOffset[tileOffset] for tileOffset in layer.TileMap], np.uint32)
+        return gids.reshape(layer.MapHeightInTiles, layer.MapWidthInTiles)
+
+    def RenderImageIndexed(self, tileWidth : int, tileHeight : int) -> npt.NDArray[np.uint8]:
+        """ Renders all tiles into one tileset image with TILESET_COLUMNS tiles per row.
+
+        Returns:
+            npt.NDArray[np.uint8]: The color indices in a 2D array [Height, Width].
+        """
+        columns = min(TILESET_COLUMNS, max(1, len(self.TileList)))
+        rows = max(1, math.ceil(len(self.TileList) / columns))
+
+        tiles = np.zeros((rows * columns, tileHeight, tileWidth), np.uint8)
+        for idx, tile in enumerate(self.TileList):
+            tiles[idx] = np.frombuffer(tile.Pixels, np.uint8, tileWidth * tileHeight).reshape(tileHeight, tileWidth)
+
+        return tiles.reshape(rows, columns, tileHeight, tileWidth).transpose(0, 2, 1, 3).reshape(rows * tileHeight, columns * tileWidth)
+
+def __EncodeLayerData(gids : npt.NDArray[np.uint32]) -> str:
+    """ Encodes the global tile IDs as Tiled layer data (zlib + base64).
+    """
+    return base64.b64encode(zlib.compress(gids.astype("<u4").tobytes(), 9)).decode("ASCII")
+
+def __AddProperties(element : ET.Element, properties : dict[str, str | int]) -> None:
+    """ Adds custom properties to a Tiled XML element.
+    """
+    propertiesElement = ET.SubElement(element, "properties")
+
+    for name, value in properties.items():
+        propertyElement = ET.SubElement(propertiesElement, "property", name = name, value = str(value))
+        if isinstance(value, int):
+            propertyElement.set("type", "int")
+
+def __AddTileLayer(mapElement : ET.Element, layerId : int, name : str, gids : npt.NDArray[np.uint32],
+                   properties : dict[str, str | int] | None = None) -> None:
+    """ Adds a tile layer with zlib compressed data to the map.
+    """
+    height, width = gids.shape
+    layerElement = ET.SubElement(mapElement, "layer", id = str(layerId), name = name, width = str(width), height = str(height))
+
+    if properties is not None:
+        __AddProperties(layerElement, properties)
+
+    dataElement = ET.SubElement(layerElement, "data", encoding = "base64", compression = "zlib")
+    dataElement.text = __EncodeLayerData(gids)
+
+def __WriteXml(fileName : str, element : ET.Element) -> None:
+    ET.indent(element)
+    ET.ElementTree(element).write(fileName, encoding = "UTF-8", xml_declaration = True)
+
+def __WriteTileset(fileName : str, name : str, imageFileName : str, imageWidth : int, imageHeight : int,
+                   tileWidth : int, tileHeight : int, tileCount : int, tileProperties : dict[int, dict[str, str | int]] | None = None) -> None:
+    """ Writes a Tiled tileset file (TSX).
+    """
+    columns = max(1, imageWidth // tileWidth)
+
+    tilesetElement = ET.Element("tileset", version = "1.10", name = name,
+                                tilewidth = str(tileWidth), tileheight = str(tileHeight),
+                                tilecount = str(tileCount), columns = str(columns))
+    ET.SubElement(tilesetElement, "image", source = imageFileName, width = str(imageWidth), height = str(imageHeight))
+
+    if tileProperties is not None:
+        for tileId, properties in tileProperties.items():
+            tileElement = ET.SubElement(tilesetElement, "tile", id = str(tileId))
+            __AddProperties(tileElement, properties)
+
+    __WriteXml(fileName, tilesetElement)
+
+def ExportTiledMap(map : MapdFile, baseFileName : str, terrainAttributeIconsFileName : str = TerrainAttributeIconsFileName) -> str:
+    """ Exports the map for the Tiled map editor.
+        Creates the following files:
+
+            map.tmx                     -> the map with the bottom, top and terrain attribute layer
+            map_tiles.tsx               -> the tileset with every unique tile of both layers
+            map_tiles.png               -> the tileset image (8 bit palette PNG)
+            map_attributes.tsx          -> the terrain attribute tileset, each tile has the attribute as custom property
+            TerrainAttributeIcons.png   -> the terrain attribute tileset image
+
+    Args:
+        map (MapdFile): The map.
+        baseFileName (str): The base filename for the created files.
+        terrainAttributeIconsFileName (str, optional): The PNG file with the terrain attribute icons.
+
+    Returns:
+        str: The name of the TMX file.
+    """
+    layerBottom = map.LayerList[0]
+    tileWidth = layerBottom.TileWidthInPixels
+    tileHeight = layerBottom.TileHeightInPixels
+
+    baseName = Path(baseFileName).name
+    outDir = os.path.dirname(baseFileName)
+
+    # tile layers
+    tileset = TiledTileset(layerBottom.TileList[0])
+    layerGids = [ tileset.AddLayer(layer, 1) for layer in map.LayerList ]
+
+    tilesetImage = tileset.RenderImageIndexed(tileWidth, tileHeight)
+    tilesetImageFileName = baseName + "_tiles.png"
+    WritePngIndexed(os.path.join(outDir, tilesetImageFileName), tilesetImage, map.ColorPalette.ColorsRGB, compressionLevel = 9)
+
+    tilesetFileName = baseName + "_tiles.tsx"
+    __WriteTileset(os.path.join(outDir, tilesetFileName), baseName, tilesetImageFileName,
+                   tilesetImage.shape[1], tilesetImage.shape[0], tileWidth, tileHeight, len(tileset.TileList))
+
+    # terrain attribute layer
+    attributeFirstGid = 1 + len(tileset.TileList)
+    attributeMap = layerBottom.TerrainAttributes.TerrainAttributeMap.astype(np.uint32)
+    attributeGids = np.where(attributeMap != ETerrainAttribute.OPEN, attributeMap + attributeFirstGid, 0).astype(np.uint32)
+
+    iconsFileName = Path(terrainAttributeIconsFileName).name
+    iconsTargetFileName = os.path.join(outDir, iconsFileName)
+    if not os.path.exists(iconsTargetFileName) or not os.path.samefile(terrainAttributeIconsFileName, iconsTargetFileName):
+        shutil.copyfile(terrainAttributeIconsFileName, iconsTargetFileName)
+
+    attributeTilesetFileName = baseName + "_attributes.tsx"
+    attributeProperties : dict[int, dict[str, str | int]] = {
+        attr.value: { "TerrainAttribute": attr.name, "Value": attr.value } for attr in ETerrainAttribute
+    }
+    iconsHeight, iconsWidth, _ = ReadPngRgba(terrainAttributeIconsFileName).shape
+    iconSize = iconsWidth // len(ETerrainAttribute)
+    __WriteTileset(os.path.join(outDir, attributeTilesetFileName), "TerrainAttributes", iconsFileName,
+                   iconsWidth, iconsHeight, iconSize, iconsHeight, len(ETerrainAttribute), attributeProperties)
+
+    # the map
+    mapElement = ET.Element("map", version = "1.10", orientation = "orthogonal", renderorder = "right-down",
+                            width = str(layerBottom.MapWidthInTiles), height = str(layerBottom.MapHeightInTiles),
+                            tilewidth = str(tileWidth), tileheight = str(tileHeight), infinite = "0",
+                            nextlayerid = str(len(layerGids) + 2), nextobjectid = "1")
+
+    ET.SubElement(mapElement, "tileset", firstgid = "1", source = tilesetFileName)
+    ET.SubElement(mapElement, "tileset", firstgid = str(attributeFirstGid), source = attributeTilesetFileName)
+
+    layerNames = ["Bottom", "Top"]
+    for idx, gids in enumerate(layerGids):
+        __AddTileLayer(mapElement, idx + 1, layerNames[idx] if idx < len(layerNames) else f"Layer {idx}", gids)
+
+    __AddTileLayer(mapElement, len(layerGids) + 1, "TerrainAttributes", attributeGids, { "TerrainAttributes": "true" })
+
+    fileNameTmx = os.path.join(outDir, baseName + ".tmx")
+    __WriteXml(fileNameTmx, mapElement)
+
+    return fileNameTmx
@@ -0,0 +1,353 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import hashlib
+import math
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from Kknd2Reader.KkndFileMobd import MobdFile
+from Kknd2Reader.PngFile import WritePngRgba
+from Kknd2Reader.PrettyJson import ExportAsJsonFile, JsonFlatList
+
+# the default number of transparent pixels between the frames in the atlas
+DEFAULT_ATLAS_PADDING = 1
+
+def CropToAlpha(imageAbgr : npt.NDArray[np.uint32]) -> tuple[npt.NDArray[np.uint32], int, int]:
+    """ Crops an image to the bounds of its visible (alpha != 0) pixels.
+
+    Args:
+        imageAbgr (npt.NDArray[np.uint32]): The ABGR image [Height, Width].
+
+    Returns:
+        npt.NDArray[np.uint32]: The cropped image, empty [0, 0] if no pixel is visible.
+        int: The X position of the cropped image in the original image.
+        int: The Y position of the cropped image in the original image.
+    """
+    visible = (imageAbgr >> 24) != 0
+
+    columns = np.nonzero(visible.any(axis = 0))[0]
+    rows = np.nonzero(visible.any(axis = 1))[0]
+
+    if len(columns) == 0:
+        return np.zeros((0, 0), np.uint32), 0, 0
+
+    x0, x1 = int(columns[0]), int(columns[-1]) + 1
+    y0, y1 = int(rows[0]), int(rows[-1]) + 1
+
+    return imageAbgr[y0 : y1, x0 : x1], x0, y0
+
+class SkylinePacker:
+    """ Packs rectangles into an area with fixed width (bottom-left skyline heuristic).
+        The skyline is the list of the top edges of the packed rectangles from left to right.
+    """
+
+    # the width of the packing area
+    Width : int
+
+    # the used height of the packing area
+    Height : int
+
+    # the skyline segments (x, y, width), sorted by x and covering the whole width
+    __skyline : list[list[int]]
+
+    def __init__(self, width : int) -> None:
+        if width <= 0:
+            raise Exception(f"Invalid atlas width {width}!")
+
+        self.Width = width
+        self.Height = 0
+        self.__skyline = [[0, 0, width]]
+
+    def Insert(self, width : int, height : int) -> tuple[int, int]:
+        """ Places a rectangle at the lowest position of the skyline, the leftmost one of equal positions.
+
+        Args:
+            width (int): The rectangle width.
+            height (int): The rectangle height.
+
+        Returns:
+            tuple[int, int]: The position (x, y) of the upper left rectangle corner.
+        """
+        if width > self.Width:
+            raise Exception(f"Rectangle width {width} exceeds the atlas width {self.Width}!")
+
+        bestIndex = -1
+        bestX = 0
+        bestY = 0
+
+        for index in range(len(self.__skyline)):
+            x = self.__skyline[index][0]
+            if x + width > self.Width:
+                break
+
+            y = self.__GetFitY(index, width)
+            if bestIndex < 0 or y < bestY:
+                bestIndex = index
+                bestX = x
+                bestY = y
+
+        self.__AddSegment(bestIndex, bestX, bestY + height, width)
+        self.Height = max(self.Height, bestY + height)
+
+        return bestX, bestY
+
+    def __GetFitY(self, index : int, width : int) -> int:
+        """ Returns the lowest Y of a rectangle that starts at a skyline segment, the rectangle lies on the highest segment below it.
+        """
+        y = 0
+        remaining = width
+
+        while remaining > 0:
+            _, segmentY, segmentWidth = self.__skyline[index]
+            y = max(y, segmentY)
+            remaining -= segmentWidth
+            index += 1
+
+        return y
+
+    def __AddSegment(self, index : int, x : int, y : int, width : int) -> None:
+        """ Adds the top edge of a packed rectangle to the skyline at a segment index.
+        """
+        self.__skyline.insert(index, [x, y, width])
+
+        # shorten or remove the segments covered by the new segment
+        end = x + width
+        next = index + 1
+        while next < len(self.__skyline) and self.__skyline[next][0] < end:
+            segment = self.__skyline[next]
+            segmentEnd = segment[0] + segment[2]
+
+            if segmentEnd <= end:
+                del self.__skyline[next]
+            else:
+                segment[2] = segmentEnd - end
+                segment[0] = end
+                break
+
+        # merge neighbor segments of the same height
+        index = 0
+        while index + 1 < len(self.__skyline):
+            if self.__skyline[index][1] == self.__skyline[index + 1][1]:
+                self.__skyline[index][2] += self.__skyline[index + 1][2]
+                del self.__skyline[index + 1]
+            else:
+                index += 1
+
+class AtlasRect:
+    """ One packed image in the atlas, identical frames share the same rectangle.
+    """
+
+    # the position in the atlas
+    X : int
+    Y : int
+
+    # the size in pixels
+    Width : int
+    Height : int
+
+    # the cropped ABGR image [Height, Width]
+    ImageAbgr : npt.NDArray[np.uint32]
+
+    def __init__(self, imageAbgr : npt.NDArray[np.uint32]) -> None:
+        self.X = 0
+        self.Y = 0
+        self.Height, self.Width = imageAbgr.shape
+        self.ImageAbgr = imageAbgr
+
+class AtlasFrame:
+    """ The atlas data of one animation frame.
+    """
+
+    # the index of the rectangle in the atlas
+    RectIndex : int
+
+    # the position of the cropped image in the uncropped frame
+    CropX : int
+    CropY : int
+
+    def __init__(self, rectIndex : int, cropX : int, cropY : int) -> None:
+        self.RectIndex = rectIndex
+        self.CropX = cropX
+        self.CropY = cropY
+
+class SpriteAtlas:
+    """ All frames of a MOBD file packed into one texture atlas. The frames are cropped to their visible pixels
+        and identical frames are stored only once.
+    """
+
+    # the sprite
+    MobdFile : MobdFile
+
+    # the team color the frames are rendered with, None = local MOBD palette
+    TeamColorId : int | None
+
+    # the atlas size in pixels
+    Width : int
+    Height : int
+
+    # the packed images
+    RectList : list[AtlasRect]
+
+    # the atlas data of each frame [animation index][frame index]
+    FrameList : list[list[AtlasFrame]]
+
+    def __init__(self, mobdFile : MobdFile, teamColorId : int | None = 0, padding : int = DEFAULT_ATLAS_PADDING) -> None:
+        """ Crops, deduplicates and packs the frames of a MOBD file.
+
+        Args:
+            mobdFile (MobdFile): The sprite.
+            teamColorId (int | None, optional): The team color, None for the local MOBD palette. Defaults to 0.
+            padding (int, optional): The number of transparent pixels between the frames. Defaults to DEFAULT_ATLAS_PADDING.
+        """
+        self.MobdFile = mobdFile
+        self.TeamColorId = teamColorId
+        self.RectList = []
+        self.FrameList = []
+
+        rectIndexByContentHash : dict[bytes, int] = {}
+
+        for animation in mobdFile.AnimationList:
+            frameList : list[AtlasFrame] = []
+
+            for frame in animation.FrameList:
+                imageAbgr, cropX, cropY = CropToAlpha(frame.RenderFrameUInt32Abgr(teamColorId))
+
+                height, width = imageAbgr.shape
+                hash = hashlib.blake2b(np.ascontiguousarray(imageAbgr).tobytes(), digest_size = 16)
+                hash.update(width.to_bytes(4, "little") + height.to_bytes(4, "little"))
+                contentHash = hash.digest()
+
+                rectIndex = rectIndexByContentHash.get(contentHash)
+                if rectIndex is None:
+                    rectIndex = len(self.RectList)
+                    rectIndexByContentHash[contentHash] = rectIndex
+                    self.RectList.append(AtlasRect(imageAbgr))
+
+                frameList.append(AtlasFrame(rectIndex, cropX, cropY))
+
+            self.FrameList.append(frameList)
+
+        self.__Pack(padding)
+
+    def __Pack(self, padding : int) -> None:
+        """ Packs the rectangles, the highest first. The atlas width is the power of two that gives a roughly square atlas.
+        """
+        rectList = [rect for rect in self.RectList if rect.Width > 0 and rect.Height > 0]
+
+        if len(rectList) == 0:
+            self.Width = 0
+            self.Height = 0
+            return
+
+        area = sum((rect.Width + padding) * (rect.Height + padding) for rect in rectList)
+        minWidth = max(rect.Width for rect in rectList) + padding
+        self.Width = 1 << (max(math.ceil(math.sqrt(area)), minWidth) - 1).bit_length()
+
+        packer = SkylinePacker(self.Width)
+
+        for rect in sorted(rectList, key = lambda rect: (-rect.Height, -rect.Width)):
+            rect.X, rect.Y = packer.Insert(rect.Width + padding, rect.Height + padding)
+
+        self.Height = packer.Height - padding
+
+    def RenderRgba(self) -> npt.NDArray[np.uint8]:
+        """ Renders the atlas image.
+
+        Returns:
+            npt.NDArray[np.uint8]: The RGBA atlas [Height, Width, 4].
+        """
+        atlasAbgr = np.zeros((self.Height, self.Width), np.dtype("<u4"))
+
+        for rect in self.RectList:
+            atlasAbgr[rect.Y : rect.Y + rect.Height, rect.X : rect.X + rect.Width] = rect.ImageAbgr
+
+        # little endian ABGR values are RGBA bytes
+        return atlasAbgr.view(np.uint8).reshape(self.Height, self.Width, 4)
+
+    def GetMetadata(self, imageFileName : str) -> dict[str, Any]:
+        """ Returns the atlas metadata for the JSON export.
+
+        Args:
+            imageFileName (str): The name of the atlas PNG file.
+
+        Returns:
+            dict[str, Any]: The metadata.
+        """
+        animations : list[Any] = []
+
+        for animation, frameList in zip(self.MobdFile.AnimationList, self.FrameList):
+            frames : list[Any] = []
+
+            for frame, atlasFrame in zip(animation.FrameList, frameList):
+                frames.append({
+                    "Rect": atlasFrame.RectIndex,
+                    "OffsetX": frame.OffsetX,
+                    "OffsetY": frame.OffsetY,
+                    "CropX": atlasFrame.CropX,
+                    "CropY": atlasFrame.CropY,
+                    "Width": frame.Width,
+                    "Height": frame.Height,
+                    "Points": [ { "Id": p.Id, "X": p.Px, "Y": p.Py } for p in frame.PointList ]
+                })
+
+            animations.append({
+                "Animation": animation.AnimationNumber,
+                "Rotational": animation.IsRotationalAnimation,
+                "Frames": frames
+            })
+
+        return {
+            "Image": imageFileName,
+            "Width": self.Width,
+            "Height": self.Height,
+            "MobdFileIndex": self.MobdFile.MobdFileIndex,
+            "MobdFileName": self.MobdFile.MobdFileName,
+            "TeamColor": self.TeamColorId,
+            "Rects": [ JsonFlatList([rect.X, rect.Y, rect.Width, rect.Height]) for rect in self.RectList ],
+            "Animations": animations
+        }
+
+    def Export(self, baseFileName : str, compressionLevel : int = 6) -> tuple[str, str]:
+        """ Writes the atlas PNG and the JSON metadata.
+
+        Args:
+            baseFileName (str): The file name without extension.
+            compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+
+        Returns:
+            str: The name of the PNG file.
+            str: The name of the JSON file.
+        """
+        pngFileName = baseFileName + ".png"
+        jsonFileName = baseFileName + ".json"
+
+        WritePngRgba(pngFileName, self.RenderRgba(), compressionLevel = compressionLevel)
+        ExportAsJsonFile(jsonFileName, self.GetMetadata(Path(pngFileName).name))
+
+        return pngFileName, jsonFileName
@@ -0,0 +1,110 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+# the number of RGB555 colors, the highest bit of the 16 bit words is not used
+RGB555_COLOR_COUNT = 32768
+
+def __CreateRgb555Lut(rounded : bool, order : str) -> npt.NDArray[np.uint32]:
+    """ Creates a lookup table that converts all RGB555 colors to 24 bit colors.
+
+    Args:
+        rounded (bool): True scales the 5 bit channels with round(c * 255 / 31) (team palette files),
+            False shifts them by 3 bits (MOBD and MAPD palettes).
+        order (str): The output format "rgb" (0xRRGGBB), "bgr" (0xBBGGRR) or "abgr" (opaque 0xFFBBGGRR).
+
+    Returns:
+        npt.NDArray[np.uint32]: The read-only lookup table with RGB555_COLOR_COUNT entries.
+    """
+    colors15 = np.arange(RGB555_COLOR_COUNT, dtype = np.uint32)
+    channels = [(colors15 >> 10) & 0x1F, (colors15 >> 5) & 0x1F, colors15 & 0x1F]
+
+    if rounded:
+        # integer math: round(c * 255 / 31) == (c * 255 + 15) // 31, c * 255 / 31 is never exactly x.5
+        red, green, blue = [(c * 255 + 15) // 31 for c in channels]
+    else:
+        red, green, blue = [c << 3 for c in channels]
+
+    if order == "rgb":
+        lut = (red << 16) | (green << 8) | blue
+    elif order == "bgr":
+        lut = (blue << 16) | (green << 8) | red
+    elif order == "abgr":
+        lut = np.uint32(0xFF000000) | (blue << 16) | (green << 8) | red
+    else:
+        raise Exception(f"Unknown color order {order}")
+
+    lut.setflags(write = False)
+    return lut
+
+# the RGB555 lookup tables with shifted channels (c << 3), used by the MOBD and MAPD palettes
+RGB555_TO_RGB_SHIFT = __CreateRgb555Lut(False, "rgb")
+RGB555_TO_BGR_SHIFT = __CreateRgb555Lut(False, "bgr")
+RGB555_TO_ABGR_SHIFT = __CreateRgb555Lut(False, "abgr")
+
+# the RGB555 lookup tables with rounded scaled channels (round(c * 255 / 31)), used by the team palette files
+RGB555_TO_RGB_ROUNDED = __CreateRgb555Lut(True, "rgb")
+RGB555_TO_BGR_ROUNDED = __CreateRgb555Lut(True, "bgr")
+RGB555_TO_ABGR_ROUNDED = __CreateRgb555Lut(True, "abgr")
+
+def ConvertRgb555(colors15 : npt.ArrayLike, lut : npt.NDArray[np.uint32]) -> npt.NDArray[np.uint32]:
+    """ Converts RGB555 colors with one of the lookup tables.
+
+    Args:
+        colors15 (npt.ArrayLike): The RGB555 colors.
+        lut (npt.NDArray[np.uint32]): The lookup table, e.g. RGB555_TO_RGB_SHIFT.
+
+    Returns:
+        npt.NDArray[np.uint32]: The converted colors.
+    """
+    return lut[np.asarray(colors15, dtype = np.uint32) & 0x7FFF]
+
+def ReadRgb555Colors(data : bytes | bytearray, position : int, numberOfColors : int, lut : npt.NDArray[np.uint32]) -> npt.NDArray[np.uint32]:
+    """ Reads and converts a block of little endian RGB555 colors.
+
+    Args:
+        data (bytes | bytearray): The raw data.
+        position (int): The position of the first color in the data buffer.
+        numberOfColors (int): The number of colors.
+        lut (npt.NDArray[np.uint32]): The lookup table, e.g. RGB555_TO_RGB_SHIFT.
+
+    Returns:
+        npt.NDArray[np.uint32]: The converted colors.
+    """
+    return lut[np.frombuffer(data, "<u2", numberOfColors, position) & 0x7FFF]
+
+def SwapRedAndBlue(colors : npt.ArrayLike) -> npt.NDArray[np.uint32]:
+    """ Converts 24 bit RGB colors to BGR colors and vice versa.
+
+    Args:
+        colors (npt.ArrayLike): The colors.
+
+    Returns:
+        npt.NDArray[np.uint32]: The converted colors.
+    """
+    colors = np.asarray(colors, dtype = np.uint32)
+    return ((colors & 0xFF) << 16) | (colors & 0xFF00) | ((colors >> 16) & 0xFF)
@@ -25,8 +25,12 @@ IN THE SOFTWARE.
 """
 
 from .DataBuffer import GetUInt32LE, GetInt32LE, GetUInt32BE, GetUInt16LE, GetUInt16BE, GetUInt8
+from .KkndCreatureProperties import CreaturePropertyIndex
 import math
-import wx # type: ignore
+import os
+from collections import OrderedDict
+import numpy as np
+import numpy.typing as npt
 
 MAGIC_FILE = 0x4B32434C
 MAGIC_ENTRY = 0x4B324352
@@ -58,6 +62,9 @@ class LibraryEntryProperty:
     # the property name
     Name : str
 
+    # the property type 1..7, only the types 1..3 have values
+    Type : int
+
     # the property values
     Values : dict[str, int]
 
@@ -82,6 +89,8 @@ class LibraryEntryProperty:
         propertyType = GetUInt8(data, pos)
         pos += 1
 
+        self.Type = propertyType
+
         if propertyType in (1, 2, 3):
             self.Metadata = data[pos : pos + 12]
             pos += 12
@@ -103,8 +112,64 @@ class LibraryEntryProperty:
         
         return pos
     
+class DecodedBitmap:
+    """ The decoded content of a BMP file embedded in the creature library.
+    """
+
+    # the BMP color palette (0x00RRGGBB)
+    Palette : list[int]
+
+    # the image as read-only RGBA array [Height, Width, 4]
+    ImageRgba : npt.NDArray[np.uint8]
+
+class BitmapCache:
+    """ A small LRU cache of decoded creature library bitmaps.
+        The cache is not thread-safe, a library must only be used by one thread at a time.
+    """
+
+    # the maximum number of decoded bitmaps
+    MaxBitmaps : int
+
+    __bitmaps : OrderedDict[int, DecodedBitmap]
+
+    def __init__(self, maxBitmaps : int = 64) -> None:
+        self.MaxBitmaps = maxBitmaps
+        self.__bitmaps = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__bitmaps)
+
+    def Get(self, bitmapOffset : int) -> DecodedBitmap | None:
+        """ Returns a decoded bitmap or None if it is not in the cache.
+
+        Args:
+            bitmapOffset (int): The position of the BMP file in the library data.
+        """
+        bitmap = self.__bitmaps.get(bitmapOffset)
+        if bitmap is not None:
+            self.__bitmaps.move_to_end(bitmapOffset)
+
+        return bitmap
+
+    def Add(self, bitmapOffset : int, bitmap : DecodedBitmap) -> None:
+        """ Adds a decoded bitmap and removes the least recently used bitmaps if the cache is full.
+
+        Args:
+            bitmapOffset (int): The position of the BMP file in the library data.
+            bitmap (DecodedBitmap): The decoded bitmap.
+        """
+        self.__bitmaps[bitmapOffset] = bitmap
+        self.__bitmaps.move_to_end(bitmapOffset)
+
+        while len(self.__bitmaps) > self.MaxBitmaps:
+            self.__bitmaps.popitem(last = False)
+
+    def Clear(self) -> None:
+        self.__bitmaps.clear()
+
 class LibraryEntry:
     """ Represents an entry in the creature library.
+        The embedded bitmap is not decoded when the library is read, only on first access of the image.
     """
     # the creature ID
     Id : int            
@@ -115,23 +180,62 @@ class LibraryEntry:
     # the creature name
     Name : str          
 
-    # the creature image
-    Image : wx.Image | None
-
     # unknown metadata
     Metadata : bytes    
 
-    Palette : list[int]
+    # the position and size of the embedded BMP file in the library data, size 0 if the entry has no image
+    BitmapOffset : int
+    BitmapSize : int
 
-    def __init__(self) -> None:
-        self.Palette = []
+    __data : bytes
+    __bitmapCache : BitmapCache
+
+    def __init__(self, bitmapCache : BitmapCache | None = None) -> None:
+        self.BitmapOffset = 0
+        self.BitmapSize = 0
+        self.__data = b""
+        self.__bitmapCache = bitmapCache if bitmapCache is not None else BitmapCache(1)
 
-    def ReadLibraryEntry(self, data : bytes, pos : int) -> int:
+    @property
+    def HasImage(self) -> bool:
+        """ True if the entry has an image.
+        """
+        return self.BitmapSize != 0
+
+    @property
+    def Image(self) -> npt.NDArray[np.uint8] | None:
+        """ The creature image as read-only RGBA array [Height, Width, 4], decoded on first access.
+        """
+        bitmap = self.__GetBitmap()
+        return None if bitmap is None else bitmap.ImageRgba
+
+    @property
+    def Palette(self) -> list[int]:
+        """ The color palette of the creature image, empty if the entry has no image.
+        """
+        bitmap = self.__GetBitmap()
+        return [] if bitmap is None else bitmap.Palette
+
+    def __GetBitmap(self) -> DecodedBitmap | None:
+        """ Returns the decoded bitmap from the cache or decodes it.
+        """
+        if not self.HasImage:
+            return None
+
+        bitmap = self.__bitmapCache.Get(self.BitmapOffset)
+        if bitmap is None:
+            bitmap = LibraryEntry.__ParseBitmap(self.__data, self.BitmapOffset)
+            self.__bitmapCache.Add(self.BitmapOffset, bitmap)
+
+        return bitmap
+
+    def ReadLibraryEntry(self, data : bytes, pos : int, propertyIndex : CreaturePropertyIndex | None = None) -> int:
         """ Reads a library entry.
 
         Args:
             data (bytes): The raw library file data.
             pos (int): The entry position in the file data.
+            propertyIndex (CreaturePropertyIndex | None, optional): Stores the entry properties. Defaults to None.
 
         Returns:
             int: The new position after the entry.
@@ -164,21 +268,36 @@ class LibraryEntry:
         numberOfProperties = GetUInt16LE(data, pos)
         pos += 2
 
+        if propertyIndex is not None:
+            propertyIndex.AddEntry(self.Id, self.Name)
+
         for _ in range(numberOfProperties):
             property = LibraryEntryProperty()
             pos = property.ReadProperty(data, pos)
 
+            if propertyIndex is not None:
+                propertyIndex.AddProperty(self.Id, property.Name, property.Type, property.Values)
+
         hasBmpFile = GetUInt8(data, pos)
         pos += 1
 
+        self.__data = data
+        self.BitmapOffset = pos
+        self.BitmapSize = 0
+
         if hasBmpFile != 0:
-            pos = self.__ParseBitmap(data, pos)
-        else:
-            self.Image = None
+            # only the size is read here, the bitmap is decoded on first use
+            magic = GetUInt16BE(data, pos)
+            if magic != MAGIC_BMP:
+                raise Exception(f"missing magic number at BMP start (position {pos})")
+
+            self.BitmapSize = GetUInt32LE(data, pos + 2)
+            pos += self.BitmapSize
 
         return pos
 
-    def __ParseBitmap(self, data : bytes, pos : int) -> int:
+    @staticmethod
+    def __ParseBitmap(data : bytes, pos : int) -> DecodedBitmap:
         """ Parses the bitmap.
 
         Args:
@@ -186,7 +305,7 @@ class LibraryEntry:
             pos (int): The bitmap position in the file data.
 
         Returns:
-            int: The new position after the image.
+            DecodedBitmap: The palette and the image.
         """
         startPos = pos
 
@@ -226,57 +345,54 @@ class LibraryEntry:
         if bitmapCompression != 0:
             raise Exception(f"Unsupported bitmap compression: {bitmapCompression}")
         
-        # read color palette
-        palette : list[int] = []
+        # read color palette, each entry is stored as 0x00RRGGBB
+        paletteRgb = np.frombuffer(data, "<u4", bitmapColorUsed, pos)
+        pos += bitmapColorUsed * 4
 
-        for _ in range(bitmapColorUsed):
-            colorRgb = GetUInt32LE(data, pos)
-            palette.append(colorRgb)
-            pos += 4
-        
-        self.Palette = palette
+        bitmap = DecodedBitmap()
+        bitmap.Palette = paletteRgb.tolist()
         
         if pos != startPos + pixelDataOffset:
             raise Exception(f"invalid BMP palette and header size")
         
-        # read pixel data
-        pixelData = data[pos : pos + bitmapSizeImage]
-        imgBuffer = bytearray()
-        alphaBuffer = bytearray()
-
-        for row in range(abs(bitmapHeight)):
+        # read pixel data: strip the row padding and flip bottom-up bitmaps
+        height = abs(bitmapHeight)
+        pixels = np.frombuffer(data, np.uint8, bitmapSizeImage, pos).reshape(height, bitmapRowWidthInBytes)[:, :bitmapWidth]
+        if bitmapHeight > 0:
+            pixels = pixels[::-1]
 
-            r = bitmapHeight - row - 1 if bitmapHeight > 0 else row
-            pixelDataRow = pixelData[r * bitmapRowWidthInBytes : (r + 1) * bitmapRowWidthInBytes]
+        paletteLut = np.stack([(paletteRgb >> 16) & 0xFF, (paletteRgb >> 8) & 0xFF, paletteRgb & 0xFF], axis = 1).astype(np.uint8)
 
-            for column in range(bitmapWidth):
-                pixel = pixelDataRow[column]
+        imageRgba = np.empty((height, bitmapWidth, 4), np.uint8)
+        imageRgba[..., 0:3] = paletteLut[pixels]
+        imageRgba[..., 3] = np.where(pixels != 0, 0xFF, 0x00)
 
-                color = palette[pixel]
-                alpha = 0xFF if pixel != 0 else 0x00
-
-                imgBuffer.append((color >> 16) & 0xFF)
-                imgBuffer.append((color >> 8) & 0xFF)
-                imgBuffer.append((color >> 0) & 0xFF)
-                alphaBuffer.append(alpha)
-        
-        self.Image = wx.ImageFromBuffer(bitmapWidth, bitmapHeight, imgBuffer, alphaBuffer) # type: ignore
+        imageRgba.setflags(write = False)
+        bitmap.ImageRgba = imageRgba
 
         pos += bitmapSizeImage
 
         if pos != startPos + fileSize:
             raise Exception(f"Invalid BMP file size: {fileSize}")
         
-        return pos
+        return bitmap
     
 class CreatureLibrary:
     """ The content of the creature library.
     """
 
     EntryList : dict[int, LibraryEntry]
+
+    # the decoded bitmaps of the entries
+    BitmapCache : BitmapCache
+
+    # the properties of all entries
+    Properties : CreaturePropertyIndex
     
-    def __init__(self) -> None:
+    def __init__(self, maxDecodedBitmaps : int = 64) -> None:
         self.EntryList = {}
+        self.BitmapCache = BitmapCache(maxDecodedBitmaps)
+        self.Properties = CreaturePropertyIndex()
 
     def ReadLibraryFile(self, fileName : str) -> None:
         """ Reads the content of the KKND2 creature library.
@@ -288,14 +404,40 @@ class CreatureLibrary:
         with open(fileName, "rb") as file:
             data = file.read()
 
-        self.EntryList = self.__ReadLibraryEntries(data)
+        self.BitmapCache.Clear()
+        self.Properties = CreaturePropertyIndex()
+        self.EntryList = self.__ReadLibraryEntries(data, self.BitmapCache, self.Properties)
+        self.Properties.Finish()
+
+    @staticmethod
+    def ReadPropertyIndex(fileName : str, cacheFileName : str) -> CreaturePropertyIndex:
+        """ Returns the creature properties from the cache file or reads the library and updates the cache file
+            if the library is newer.
+
+        Args:
+            fileName (str): The creature library file.
+            cacheFileName (str): The property cache file (*.npz).
+
+        Returns:
+            CreaturePropertyIndex: The creature properties.
+        """
+        if os.path.isfile(cacheFileName) and os.path.getmtime(cacheFileName) >= os.path.getmtime(fileName):
+            return CreaturePropertyIndex.LoadNpz(cacheFileName)
+
+        creatureLibrary = CreatureLibrary()
+        creatureLibrary.ReadLibraryFile(fileName)
+        creatureLibrary.Properties.SaveNpz(cacheFileName)
+
+        return creatureLibrary.Properties
 
     @staticmethod
-    def __ReadLibraryEntries(data : bytes) -> dict[int, LibraryEntry]:
+    def __ReadLibraryEntries(data : bytes, bitmapCache : BitmapCache, propertyIndex : CreaturePropertyIndex) -> dict[int, LibraryEntry]:
         """ Reads the library entries
 
         Args:
             data (bytes): The raw file data.
+            bitmapCache (BitmapCache): The cache for the decoded bitmaps.
+            propertyIndex (CreaturePropertyIndex): Stores the entry properties.
 
         Returns:
             list[LibraryEntry]: List of all creature library entries.
@@ -311,8 +453,8 @@ class CreatureLibrary:
         entryList : dict[int, LibraryEntry] = {}
 
         for _ in range(numberOfEntries):
-            entry = LibraryEntry()
-            pos = entry.ReadLibraryEntry(data, pos)
+            entry = LibraryEntry(bitmapCache)
+            pos = entry.ReadLibraryEntry(data, pos, propertyIndex)
 
             entryList[entry.Id] = entry
 
@@ -0,0 +1,237 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+# the item name index of properties without values
+NO_ITEM = -1
+
+class CreaturePropertyIndex:
+    """ The properties of all creature library entries in a compact store. All names are interned in one string table,
+        each property value is one row in integer column arrays. Properties without values have one row with RowItem NO_ITEM.
+    """
+
+    # the string table with the creature, property and item names
+    Strings : list[str]
+
+    # the creatures: ID and name (index into Strings)
+    EntryId : npt.NDArray[np.int32]
+    EntryName : npt.NDArray[np.int32]
+
+    # the property rows: creature ID, property name, property type, item name (indices into Strings) and value
+    RowEntryId : npt.NDArray[np.int32]
+    RowProperty : npt.NDArray[np.int32]
+    RowPropertyType : npt.NDArray[np.uint8]
+    RowItem : npt.NDArray[np.int32]
+    RowValue : npt.NDArray[np.int64]
+
+    def __init__(self) -> None:
+        self.Strings = []
+        self.__stringIndex : dict[str, int] = {}
+
+        # the rows are collected in lists while the library is read
+        self.__entries : list[tuple[int, int]] = []
+        self.__rows : list[tuple[int, int, int, int, int]] = []
+
+        self.__SetColumns()
+
+    def __len__(self) -> int:
+        return len(self.RowEntryId)
+
+    def __InternString(self, s : str) -> int:
+        """ Returns the index of a string in the string table, the string is added if it is new.
+        """
+        index = self.__stringIndex.get(s)
+        if index is None:
+            index = len(self.Strings)
+            self.Strings.append(s)
+            self.__stringIndex[s] = index
+
+        return index
+
+    def __FindString(self, s : str) -> int:
+        """ Returns the index of a string in the string table or -1 if the string is unknown.
+        """
+        return self.__stringIndex.get(s, -1)
+
+    def __SetColumns(self) -> None:
+        """ Converts the collected rows to the column arrays.
+        """
+        entries = np.array(self.__entries, np.int64).reshape(-1, 2)
+        rows = np.array(self.__rows, np.int64).reshape(-1, 5)
+
+        self.EntryId = entries[:, 0].astype(np.int32)
+        self.EntryName = entries[:, 1].astype(np.int32)
+
+        self.RowEntryId = rows[:, 0].astype(np.int32)
+        self.RowProperty = rows[:, 1].astype(np.int32)
+        self.RowPropertyType = rows[:, 2].astype(np.uint8)
+        self.RowItem = rows[:, 3].astype(np.int32)
+        self.RowValue = rows[:, 4]
+
+    def AddEntry(self, entryId : int, name : str) -> None:
+        """ Adds a creature, call Finish after all creatures and properties are added.
+
+        Args:
+            entryId (int): The creature ID.
+            name (str): The creature name.
+        """
+        self.__entries.append((entryId, self.__InternString(name)))
+
+    def AddProperty(self, entryId : int, name : str, propertyType : int, values : dict[str, int]) -> None:
+        """ Adds a property of a creature, call Finish after all creatures and properties are added.
+
+        Args:
+            entryId (int): The creature ID.
+            name (str): The property name.
+            propertyType (int): The property type.
+            values (dict[str, int]): The property values.
+        """
+        nameIndex = self.__InternString(name)
+
+        if len(values) == 0:
+            self.__rows.append((entryId, nameIndex, propertyType, NO_ITEM, 0))
+            return
+
+        for itemName, value in values.items():
+            self.__rows.append((entryId, nameIndex, propertyType, self.__InternString(itemName), value))
+
+    def Finish(self) -> None:
+        """ Builds the column arrays from the added creatures and properties.
+        """
+        self.__SetColumns()
+
+    def GetEntryName(self, entryId : int) -> str:
+        """ Returns the name of a creature.
+        """
+        indices = np.nonzero(self.EntryId == entryId)[0]
+        if len(indices) == 0:
+            raise Exception(f"Unknown creature ID {entryId}")
+
+        return self.Strings[self.EntryName[indices[0]]]
+
+    def GetPropertyNames(self) -> list[str]:
+        """ Returns the names of all properties.
+        """
+        return [self.Strings[index] for index in np.unique(self.RowProperty).tolist()]
+
+    def FindCreatures(self, propertyName : str, itemName : str | None = None, value : int | None = None) -> npt.NDArray[np.int32]:
+        """ Finds all creatures that have a property, optionally with an item and a value.
+
+        Args:
+            propertyName (str): The property name.
+            itemName (str | None, optional): The item name of the property value. Defaults to None for any item.
+            value (int | None, optional): The value of the item. Defaults to None for any value.
+
+        Returns:
+            npt.NDArray[np.int32]: The sorted IDs of the matching creatures.
+        """
+        mask = self.__SelectRows(propertyName, itemName)
+
+        if value is not None:
+            mask &= self.RowValue == value
+
+        return np.unique(self.RowEntryId[mask])
+
+    def GetValueTable(self, propertyName : str, itemName : str) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int64]]:
+        """ Returns the value of a property item for all creatures that have it, e.g. to compare creatures.
+
+        Args:
+            propertyName (str): The property name.
+            itemName (str): The item name of the property value.
+
+        Returns:
+            npt.NDArray[np.int32]: The creature IDs.
+            npt.NDArray[np.int64]: The values.
+        """
+        mask = self.__SelectRows(propertyName, itemName)
+        return self.RowEntryId[mask], self.RowValue[mask]
+
+    def GetProperties(self, entryId : int) -> dict[str, dict[str, int]]:
+        """ Returns all properties of a creature.
+
+        Args:
+            entryId (int): The creature ID.
+
+        Returns:
+            dict[str, dict[str, int]]: The property values by property name and item name.
+        """
+        properties : dict[str, dict[str, int]] = {}
+
+        for row in np.nonzero(self.RowEntryId == entryId)[0].tolist():
+            values = properties.setdefault(self.Strings[self.RowProperty[row]], {})
+            if self.RowItem[row] != NO_ITEM:
+                values[self.Strings[self.RowItem[row]]] = int(self.RowValue[row])
+
+        return properties
+
+    def __SelectRows(self, propertyName : str, itemName : str | None) -> npt.NDArray[np.bool_]:
+        """ Returns the mask of the rows of a property and item.
+        """
+        propertyIndex = self.__FindString(propertyName)
+        if propertyIndex < 0:
+            return np.zeros(len(self.RowProperty), np.bool_)
+
+        mask = self.RowProperty == propertyIndex
+
+        if itemName is not None:
+            itemIndex = self.__FindString(itemName)
+            if itemIndex < 0:
+                return np.zeros(len(self.RowProperty), np.bool_)
+
+            mask &= self.RowItem == itemIndex
+
+        return mask
+
+    def SaveNpz(self, fileName : str) -> None:
+        """ Saves the property index as compressed NumPy archive.
+            The file is written through a file object, so NumPy does not append ".npz" to the file name.
+        """
+        with open(fileName, "wb") as file:
+            np.savez_compressed(file, Strings = np.array(self.Strings, dtype = np.str_),
+                                EntryId = self.EntryId, EntryName = self.EntryName,
+                                RowEntryId = self.RowEntryId, RowProperty = self.RowProperty, RowPropertyType = self.RowPropertyType,
+                                RowItem = self.RowItem, RowValue = self.RowValue)
+
+    @staticmethod
+    def LoadNpz(fileName : str) -> "CreaturePropertyIndex":
+        """ Loads a property index saved with SaveNpz.
+        """
+        index = CreaturePropertyIndex()
+
+        with np.load(fileName, allow_pickle = False) as data:
+            for s in data["Strings"].tolist():
+                index.__InternString(s)
+
+            index.EntryId = data["EntryId"]
+            index.EntryName = data["EntryName"]
+            index.RowEntryId = data["RowEntryId"]
+            index.RowProperty = data["RowProperty"]
+            index.RowPropertyType = data["RowPropertyType"]
+            index.RowItem = data["RowItem"]
+            index.RowValue = data["RowValue"]
+
+        return index
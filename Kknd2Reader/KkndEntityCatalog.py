@@ -0,0 +1,270 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from Kknd2Reader.KkndMapPackage import MapPackage
+from Kknd2Reader.KkndCreatureLib import CreatureLibrary
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import csv
+import os
+import numpy as np
+import numpy.typing as npt
+
+# the entity IDs are stored in one byte
+NUMBER_OF_ENTITY_IDS = 256
+
+def ReadMapEntities(mapFileName : str) -> tuple[int, int, npt.NDArray[np.int32], npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """ Reads the map size and the entity positions of one map. This runs in the worker processes.
+
+    Args:
+        mapFileName (str): The map file (*.lpm or *.lps).
+
+    Returns:
+        int: The map width in pixels.
+        int: The map height in pixels.
+        npt.NDArray[np.int32]: The entity IDs.
+        npt.NDArray[np.int64]: The X coordinates in pixels.
+        npt.NDArray[np.int64]: The Y coordinates in pixels.
+    """
+    mapPackage = MapPackage(mapFileName)
+    mapWidth, mapHeight = mapPackage.GetMapSize()
+    cplcFile = mapPackage.GetCplcFile(None)
+
+    ids = np.array([entity.Id for entity in cplcFile.EntityList], dtype = np.int32)
+    x = np.array([entity.X for entity in cplcFile.EntityList], dtype = np.int64)
+    y = np.array([entity.Y for entity in cplcFile.EntityList], dtype = np.int64)
+
+    return mapWidth, mapHeight, ids, x, y
+
+def GetMapNames(mapFileList : list[str]) -> list[str]:
+    """ Returns a unique name for each map file: the file name without extension, e.g. "MULTI01",
+        or the path relative to the common directory of all maps if two maps have the same file name.
+
+    Args:
+        mapFileList (list[str]): The map files (*.lpm or *.lps).
+
+    Returns:
+        list[str]: The map names.
+    """
+    mapNames = [Path(mapFileName).stem for mapFileName in mapFileList]
+
+    if len(set(mapNames)) != len(mapNames):
+        filePaths = [os.path.abspath(mapFileName) for mapFileName in mapFileList]
+        rootDirectory = os.path.commonpath([os.path.dirname(filePath) for filePath in filePaths])
+        mapNames = [Path(os.path.relpath(filePath, rootDirectory)).as_posix() for filePath in filePaths]
+
+        if len(set(mapNames)) != len(mapNames):
+            raise Exception("The map file list contains the same map file more than once")
+
+    return mapNames
+
+class EntityCatalog:
+    """ The entities of many maps in one columnar table with the columns map, id, name, x, y and optional.
+        The map and creature names are stored once in string tables and referenced by index.
+    """
+
+    # the map names, e.g. "MULTI01" (string table for MapIndex)
+    MapNames : npt.NDArray[np.str_]
+
+    # the map sizes in pixels
+    MapWidth : npt.NDArray[np.int64]
+    MapHeight : npt.NDArray[np.int64]
+
+    # the creature names and optional flags for each entity ID
+    CreatureNames : npt.NDArray[np.str_]
+    CreatureIsOptional : npt.NDArray[np.bool_]
+
+    # the entity columns
+    MapIndex : npt.NDArray[np.int32]
+    Id : npt.NDArray[np.int32]
+    X : npt.NDArray[np.int64]
+    Y : npt.NDArray[np.int64]
+
+    def __init__(self) -> None:
+        self.MapNames = np.zeros(0, dtype = np.str_)
+        self.MapWidth = np.zeros(0, dtype = np.int64)
+        self.MapHeight = np.zeros(0, dtype = np.int64)
+        self.CreatureNames = np.array([""] * NUMBER_OF_ENTITY_IDS, dtype = np.str_)
+        self.CreatureIsOptional = np.zeros(NUMBER_OF_ENTITY_IDS, dtype = np.bool_)
+        self.MapIndex = np.zeros(0, dtype = np.int32)
+        self.Id = np.zeros(0, dtype = np.int32)
+        self.X = np.zeros(0, dtype = np.int64)
+        self.Y = np.zeros(0, dtype = np.int64)
+
+    def __len__(self) -> int:
+        return len(self.Id)
+
+    @property
+    def Name(self) -> npt.NDArray[np.str_]:
+        """ The creature name of each entity.
+        """
+        return self.CreatureNames[self.Id]
+
+    @property
+    def IsOptional(self) -> npt.NDArray[np.bool_]:
+        """ True for each entity that is not always visible on the map, e.g. tech bunkers.
+        """
+        return self.CreatureIsOptional[self.Id]
+
+    @property
+    def MapName(self) -> npt.NDArray[np.str_]:
+        """ The map name of each entity.
+        """
+        return self.MapNames[self.MapIndex]
+
+    def SetCreatureLibrary(self, creatureLibrary : CreatureLibrary) -> None:
+        """ Sets the creature names and optional flags from the creature library.
+
+        Args:
+            creatureLibrary (CreatureLibrary): The creature library.
+        """
+        names = [""] * NUMBER_OF_ENTITY_IDS
+        self.CreatureIsOptional = np.zeros(NUMBER_OF_ENTITY_IDS, dtype = np.bool_)
+
+        for entry in creatureLibrary.EntryList.values():
+            names[entry.Id] = entry.Name
+            self.CreatureIsOptional[entry.Id] = entry.IsOptional
+
+        self.CreatureNames = np.array(names, dtype = np.str_)
+
+    def GetMapIndex(self, mapName : str) -> int:
+        """ Returns the index of a map in MapNames.
+        """
+        indices = np.nonzero(self.MapNames == mapName)[0]
+        if len(indices) == 0:
+            raise Exception(f"Map {mapName} is not in the entity catalog")
+
+        return int(indices[0])
+
+    def CountByMap(self, entityId : int | None = None) -> npt.NDArray[np.int64]:
+        """ Counts the entities on each map.
+
+        Args:
+            entityId (int | None, optional): Count only entities with this ID. Defaults to None for all entities.
+
+        Returns:
+            npt.NDArray[np.int64]: The number of entities for each map in MapNames.
+        """
+        mapIndex = self.MapIndex if entityId is None else self.MapIndex[self.Id == entityId]
+        return np.bincount(mapIndex, minlength = len(self.MapNames))
+
+    def CountById(self, mapName : str | None = None) -> npt.NDArray[np.int64]:
+        """ Counts the entities of each ID.
+
+        Args:
+            mapName (str | None, optional): Count only the entities of this map. Defaults to None for all maps.
+
+        Returns:
+            npt.NDArray[np.int64]: The number of entities for each ID 0..255.
+        """
+        ids = self.Id if mapName is None else self.Id[self.MapIndex == self.GetMapIndex(mapName)]
+        return np.bincount(ids, minlength = NUMBER_OF_ENTITY_IDS)
+
+    def CountByMapAndId(self) -> npt.NDArray[np.int64]:
+        """ Counts the entities of each ID on each map.
+
+        Returns:
+            npt.NDArray[np.int64]: The counts [map index, entity ID].
+        """
+        counts = np.bincount(self.MapIndex.astype(np.int64) * NUMBER_OF_ENTITY_IDS + self.Id,
+                             minlength = len(self.MapNames) * NUMBER_OF_ENTITY_IDS)
+        return counts.reshape(len(self.MapNames), NUMBER_OF_ENTITY_IDS)
+
+    def Density(self, entityId : int | None = None, areaInPixels : int = 1000000) -> npt.NDArray[np.float64]:
+        """ Returns the entity density of each map.
+
+        Args:
+            entityId (int | None, optional): Count only entities with this ID. Defaults to None for all entities.
+            areaInPixels (int, optional): The reference area. Defaults to one million square pixels.
+
+        Returns:
+            npt.NDArray[np.float64]: The number of entities per reference area for each map in MapNames.
+        """
+        mapArea = np.maximum(self.MapWidth * self.MapHeight, 1)
+        return self.CountByMap(entityId) * (areaInPixels / mapArea)
+
+    def SaveNpz(self, fileName : str) -> None:
+        """ Saves the catalog as compressed NumPy archive.
+        """
+        np.savez_compressed(fileName,
+                            MapNames = self.MapNames, MapWidth = self.MapWidth, MapHeight = self.MapHeight,
+                            CreatureNames = self.CreatureNames, CreatureIsOptional = self.CreatureIsOptional,
+                            MapIndex = self.MapIndex, Id = self.Id, X = self.X, Y = self.Y)
+
+    @staticmethod
+    def LoadNpz(fileName : str) -> "EntityCatalog":
+        """ Loads a catalog saved with SaveNpz.
+        """
+        catalog = EntityCatalog()
+
+        with np.load(fileName, allow_pickle = False) as data:
+            for name in ("MapNames", "MapWidth", "MapHeight", "CreatureNames", "CreatureIsOptional", "MapIndex", "Id", "X", "Y"):
+                setattr(catalog, name, data[name])
+
+        return catalog
+
+    def SaveCsv(self, fileName : str) -> None:
+        """ Saves the catalog as CSV file with the columns map, id, name, x, y and optional.
+        """
+        with open(fileName, "w", newline = "") as file:
+            writer = csv.writer(file)
+            writer.writerow(["map", "id", "name", "x", "y", "optional"])
+            writer.writerows(zip(self.MapName.tolist(), self.Id.tolist(), self.Name.tolist(),
+                                 self.X.tolist(), self.Y.tolist(), self.IsOptional.astype(np.int32).tolist()))
+
+def BuildEntityCatalog(mapFileList : list[str], creatureLibrary : CreatureLibrary | None = None,
+                       maxWorkers : int | None = None) -> EntityCatalog:
+    """ Extracts the entities of all maps in parallel worker processes.
+
+    Args:
+        mapFileList (list[str]): The map files (*.lpm or *.lps).
+        creatureLibrary (CreatureLibrary | None, optional): The creature library for the names. Defaults to None.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to None for the number of CPUs.
+
+    Returns:
+        EntityCatalog: The entity catalog.
+    """
+    catalog = EntityCatalog()
+
+    if creatureLibrary is not None:
+        catalog.SetCreatureLibrary(creatureLibrary)
+
+    if len(mapFileList) == 0:
+        return catalog
+
+    with ProcessPoolExecutor(max_workers = maxWorkers) as executor:
+        results = list(executor.map(ReadMapEntities, mapFileList))
+
+    catalog.MapNames = np.array(GetMapNames(mapFileList), dtype = np.str_)
+    catalog.MapWidth = np.array([result[0] for result in results], dtype = np.int64)
+    catalog.MapHeight = np.array([result[1] for result in results], dtype = np.int64)
+
+    catalog.MapIndex = np.concatenate([np.full(len(result[2]), mapIndex, dtype = np.int32) for mapIndex, result in enumerate(results)])
+    catalog.Id = np.concatenate([result[2] for result in results])
+    catalog.X = np.concatenate([result[3] for result in results])
+    catalog.Y = np.concatenate([result[4] for result in results])
+
+    return catalog
@@ -0,0 +1,214 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+# the default edge length of one grid cell in pixels
+DEFAULT_CELL_SIZE = 128
+
+class EntitySpatialIndex:
+    """ Stores the entity positions of a map as columnar arrays and indexes them with a uniform grid.
+        All queries return indices into the columns (and so into the entity list the index was built from),
+        sorted in ascending order.
+    """
+
+    # the entity IDs
+    Id : npt.NDArray[np.int32]
+
+    # the X coordinates in pixels
+    X : npt.NDArray[np.int64]
+
+    # the Y coordinates in pixels
+    Y : npt.NDArray[np.int64]
+
+    # true if the entity is optional
+    IsOptional : npt.NDArray[np.bool_]
+
+    # the edge length of one grid cell in pixels
+    CellSize : int
+
+    # the number of grid cells in X and Y direction
+    GridWidth : int
+    GridHeight : int
+
+    # the entity indices sorted by grid cell
+    __sortedIndices : npt.NDArray[np.intp]
+
+    # start of each grid cell in __sortedIndices, the cell i spans [__cellStart[i], __cellStart[i + 1])
+    __cellStart : npt.NDArray[np.intp]
+
+    def __init__(self, ids : npt.ArrayLike, x : npt.ArrayLike, y : npt.ArrayLike, isOptional : npt.ArrayLike,
+                 cellSize : int = DEFAULT_CELL_SIZE) -> None:
+        """ Builds the grid index.
+
+        Args:
+            ids (npt.ArrayLike): The entity IDs.
+            x (npt.ArrayLike): The X coordinates in pixels.
+            y (npt.ArrayLike): The Y coordinates in pixels.
+            isOptional (npt.ArrayLike): The optional flags.
+            cellSize (int, optional): The edge length of one grid cell in pixels. Defaults to DEFAULT_CELL_SIZE.
+        """
+        if cellSize <= 0:
+            raise Exception(f"Invalid grid cell size {cellSize}!")
+
+        self.Id = np.asarray(ids, dtype = np.int32)
+        self.X = np.asarray(x, dtype = np.int64)
+        self.Y = np.asarray(y, dtype = np.int64)
+        self.IsOptional = np.asarray(isOptional, dtype = np.bool_)
+
+        count = len(self.Id)
+        if not (len(self.X) == count and len(self.Y) == count and len(self.IsOptional) == count):
+            raise Exception("The entity columns must have the same length!")
+
+        self.CellSize = cellSize
+
+        if count == 0:
+            self.GridWidth = 1
+            self.GridHeight = 1
+        else:
+            self.GridWidth = int(self.X.max()) // cellSize + 1
+            self.GridHeight = int(self.Y.max()) // cellSize + 1
+
+        cellIndices = (self.Y // cellSize) * self.GridWidth + (self.X // cellSize)
+
+        self.__sortedIndices = np.argsort(cellIndices, kind = "stable")
+
+        cellCounts = np.bincount(cellIndices, minlength = self.GridWidth * self.GridHeight)
+        self.__cellStart = np.zeros(len(cellCounts) + 1, dtype = np.intp)
+        np.cumsum(cellCounts, out = self.__cellStart[1:])
+
+    def __len__(self) -> int:
+        return len(self.Id)
+
+    def QueryRect(self, x0 : int, y0 : int, x1 : int, y1 : int) -> npt.NDArray[np.intp]:
+        """ Finds all entities inside a rectangle, e.g. the visible viewport.
+
+        Args:
+            x0 (int): The left edge in pixels (inclusive).
+            y0 (int): The top edge in pixels (inclusive).
+            x1 (int): The right edge in pixels (exclusive).
+            y1 (int): The bottom edge in pixels (exclusive).
+
+        Returns:
+            npt.NDArray[np.intp]: The indices of the entities inside the rectangle.
+        """
+        candidates = self.__GetCandidates(x0, y0, x1 - 1, y1 - 1)
+
+        x = self.X[candidates]
+        y = self.Y[candidates]
+        inside = (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+
+        return np.sort(candidates[inside])
+
+    def QueryRadius(self, x : int, y : int, radius : float) -> npt.NDArray[np.intp]:
+        """ Finds all entities within a distance of a point.
+
+        Args:
+            x (int): The X coordinate of the point in pixels.
+            y (int): The Y coordinate of the point in pixels.
+            radius (float): The maximum distance in pixels (inclusive).
+
+        Returns:
+            npt.NDArray[np.intp]: The indices of the entities within the radius.
+        """
+        r = int(np.ceil(radius))
+        candidates = self.__GetCandidates(x - r, y - r, x + r, y + r)
+
+        dx = self.X[candidates] - x
+        dy = self.Y[candidates] - y
+        inside = dx * dx + dy * dy <= radius * radius
+
+        return np.sort(candidates[inside])
+
+    def QueryNearest(self, x : int, y : int, maxDistance : float | None = None) -> int | None:
+        """ Finds the entity that is nearest to a point, e.g. for hit-testing under the mouse cursor.
+
+        Args:
+            x (int): The X coordinate of the point in pixels.
+            y (int): The Y coordinate of the point in pixels.
+            maxDistance (float | None, optional): Ignore entities farther away than this. Defaults to None.
+
+        Returns:
+            int | None: The index of the nearest entity or None if there is none.
+        """
+        if len(self.Id) == 0:
+            return None
+
+        # the largest distance at which an entity can be in the grid
+        gridExtent = max(self.GridWidth, self.GridHeight) * self.CellSize + abs(x) + abs(y)
+
+        radius = float(self.CellSize)
+        if maxDistance is not None:
+            radius = min(radius, maxDistance)
+
+        while True:
+            # every entity within the radius is found, so the nearest candidate is correct if it lies inside
+            candidates = self.QueryRadius(x, y, radius)
+            if len(candidates) > 0:
+                dx = self.X[candidates] - x
+                dy = self.Y[candidates] - y
+                return int(candidates[np.argmin(dx * dx + dy * dy)])
+
+            if (maxDistance is not None and radius >= maxDistance) or radius >= gridExtent:
+                return None
+
+            radius *= 2
+            if maxDistance is not None:
+                radius = min(radius, maxDistance)
+
+    def __GetCandidates(self, x0 : int, y0 : int, x1 : int, y1 : int) -> npt.NDArray[np.intp]:
+        """ Collects the entities of all grid cells touched by a rectangle.
+
+        Args:
+            x0 (int): The left edge in pixels (inclusive).
+            y0 (int): The top edge in pixels (inclusive).
+            x1 (int): The right edge in pixels (inclusive).
+            y1 (int): The bottom edge in pixels (inclusive).
+
+        Returns:
+            npt.NDArray[np.intp]: The candidate entity indices.
+        """
+        cellX0 = max(int(x0) // self.CellSize, 0)
+        cellY0 = max(int(y0) // self.CellSize, 0)
+        cellX1 = min(int(x1) // self.CellSize, self.GridWidth - 1)
+        cellY1 = min(int(y1) // self.CellSize, self.GridHeight - 1)
+
+        if cellX0 > cellX1 or cellY0 > cellY1:
+            return np.zeros(0, dtype = np.intp)
+
+        # the cells of one grid row are contiguous in the sorted indices
+        slices = []
+        for cellY in range(cellY0, cellY1 + 1):
+            rowStart = cellY * self.GridWidth
+            start = self.__cellStart[rowStart + cellX0]
+            end = self.__cellStart[rowStart + cellX1 + 1]
+            if end > start:
+                slices.append(self.__sortedIndices[start:end])
+
+        if len(slices) == 0:
+            return np.zeros(0, dtype = np.intp)
+
+        return np.concatenate(slices)
@@ -0,0 +1,161 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+from Kknd2Reader.KkndFileCplc import CplcFile
+from Kknd2Reader.KkndCreatureLib import CreatureLibrary
+
+# the radius of the marker drawn for entities without image
+ENTITY_MARKER_RADIUS = 10
+
+def CreateEntityMarkerRgba(radius : int = ENTITY_MARKER_RADIUS) -> npt.NDArray[np.uint8]:
+    """ Creates the marker for entities without image: a white disc with a black outline.
+
+    Args:
+        radius (int, optional): The radius in pixels. Defaults to ENTITY_MARKER_RADIUS.
+
+    Returns:
+        npt.NDArray[np.uint8]: The marker [2 * radius + 1, 2 * radius + 1, 4].
+    """
+    d = np.arange(-radius, radius + 1)
+    distance = np.sqrt(d[:, np.newaxis] ** 2 + d[np.newaxis, :] ** 2)
+
+    marker = np.zeros((2 * radius + 1, 2 * radius + 1, 4), np.uint8)
+    marker[distance <= radius + 0.5] = (0x00, 0x00, 0x00, 0xFF)
+    marker[distance <= radius - 0.5] = (0xFF, 0xFF, 0xFF, 0xFF)
+
+    marker.setflags(write = False)
+    return marker
+
+class EntitySpriteCache:
+    """ The RGBA images of the creatures by entity ID, each creature image is looked up only once.
+    """
+
+    __creatureLib : CreatureLibrary | None
+    __sprites : dict[int, npt.NDArray[np.uint8] | None]
+
+    def __init__(self, creatureLibrary : CreatureLibrary | None) -> None:
+        self.__creatureLib = creatureLibrary
+        self.__sprites = {}
+
+    def GetSprite(self, entityId : int) -> npt.NDArray[np.uint8] | None:
+        """ Returns the creature image of an entity ID.
+
+        Args:
+            entityId (int): The entity ID.
+
+        Returns:
+            npt.NDArray[np.uint8] | None: The RGBA image [Height, Width, 4] or None if there is no image for the ID.
+        """
+        if entityId not in self.__sprites:
+            sprite = None
+            if self.__creatureLib is not None and entityId in self.__creatureLib.EntryList:
+                sprite = self.__creatureLib.EntryList[entityId].Image
+
+            self.__sprites[entityId] = sprite
+
+        return self.__sprites[entityId]
+
+def CompositeRgba(target : npt.NDArray[np.uint8], sprite : npt.NDArray[np.uint8], x : int, y : int) -> None:
+    """ Alpha blends a sprite over the target image, the sprite is clipped at the image border.
+
+    Args:
+        target (npt.NDArray[np.uint8]): The RGBA target image [Height, Width, 4].
+        sprite (npt.NDArray[np.uint8]): The RGBA sprite [Height, Width, 4].
+        x (int): The X position of the upper left sprite corner in the target image.
+        y (int): The Y position of the upper left sprite corner in the target image.
+    """
+    targetHeight, targetWidth, _ = target.shape
+    spriteHeight, spriteWidth, _ = sprite.shape
+
+    x0 = max(x, 0)
+    y0 = max(y, 0)
+    x1 = min(x + spriteWidth, targetWidth)
+    y1 = min(y + spriteHeight, targetHeight)
+
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = sprite[y0 - y : y1 - y, x0 - x : x1 - x].astype(np.float32)
+    dst = target[y0 : y1, x0 : x1].astype(np.float32)
+
+    srcAlpha = src[..., 3:4] / 255.0
+    dstAlpha = dst[..., 3:4] / 255.0 * (1.0 - srcAlpha)
+    outAlpha = srcAlpha + dstAlpha
+
+    rgb = (src[..., 0:3] * srcAlpha + dst[..., 0:3] * dstAlpha) / np.maximum(outAlpha, 1e-6)
+
+    target[y0 : y1, x0 : x1, 0:3] = np.clip(np.rint(rgb), 0, 255).astype(np.uint8)
+    target[y0 : y1, x0 : x1, 3] = np.clip(np.rint(outAlpha[..., 0] * 255.0), 0, 255).astype(np.uint8)
+
+def RenderEntitiesRgba(cplcFile : CplcFile, spriteCache : EntitySpriteCache, width : int, height : int,
+                       viewport : tuple[int, int, int, int] | None = None) -> npt.NDArray[np.uint8]:
+    """ Renders the entities of a map on a transparent overlay. Each entity image is centered at the entity position,
+        entities without image are drawn as marker. Only entities that can touch the viewport are drawn.
+
+    Args:
+        cplcFile (CplcFile): The CPLC file with the entities.
+        spriteCache (EntitySpriteCache): The creature images.
+        width (int): The map width in pixels.
+        height (int): The map height in pixels.
+        viewport (tuple[int, int, int, int] | None, optional): The rendered part of the map (x, y, width, height).
+            Defaults to None for the whole map.
+
+    Returns:
+        npt.NDArray[np.uint8]: The RGBA overlay of the viewport [Height, Width, 4].
+    """
+    if viewport is None:
+        viewport = (0, 0, width, height)
+
+    viewX, viewY, viewWidth, viewHeight = viewport
+    overlay = np.zeros((viewHeight, viewWidth, 4), np.uint8)
+
+    spriteList = [spriteCache.GetSprite(entityId) for entityId in sorted(set(entity.Id for entity in cplcFile.EntityList))]
+    margin = max([max(sprite.shape[0], sprite.shape[1]) for sprite in spriteList if sprite is not None] + [4 * ENTITY_MARKER_RADIUS + 1])
+
+    marker = CreateEntityMarkerRgba()
+
+    # the spatial index returns the entities in the original drawing order
+    entityIndices = cplcFile.GetSpatialIndex().QueryRect(viewX - margin, viewY - margin,
+                                                        viewX + viewWidth + margin, viewY + viewHeight + margin)
+
+    for entityIndex in entityIndices:
+        entity = cplcFile.EntityList[entityIndex]
+        sprite = spriteCache.GetSprite(entity.Id)
+
+        if sprite is None:
+            # the marker is centered at (X - r, Y - r) like the former wx.DC.DrawCircle call
+            x = entity.X - 2 * ENTITY_MARKER_RADIUS
+            y = entity.Y - 2 * ENTITY_MARKER_RADIUS
+            CompositeRgba(overlay, marker, x - viewX, y - viewY)
+        else:
+            spriteHeight, spriteWidth, _ = sprite.shape
+            x = entity.X - spriteWidth // 2
+            y = entity.Y - spriteHeight // 2
+            CompositeRgba(overlay, sprite, x - viewX, y - viewY)
+
+    return overlay
@@ -37,8 +37,6 @@ class ContainerFile:
     FileOffset : int        # the offset of the corresponding file list
     FileLength : int        # length of the file in bytes
 
-    RawData : bytearray     # the raw file data
-    
     FileName : str          # Name of the file (optional), read from an additional JSON file
     
     def __init__(self, fileNumber : int, index : int, fileType : str) -> None:
@@ -49,7 +47,49 @@ class ContainerFile:
 
         self.FileOffset = 0
         self.FileLength = 0
-        self.RawData = bytearray()
+
+        self.__containerData : bytearray | None = None
+        self.__rawData : bytearray | None = bytearray()
+
+    @property
+    def RawData(self) -> bytearray:
+        """ The raw file data, copied from the container data on first access.
+        """
+        if self.__rawData is None:
+            assert self.__containerData is not None
+            self.__rawData = self.__containerData[self.FileOffset : self.FileOffset + self.FileLength]
+            self.__containerData = None
+
+        return self.__rawData
+
+    @RawData.setter
+    def RawData(self, rawData : bytearray) -> None:
+        self.__rawData = rawData
+        self.__containerData = None
+
+    def SetContainerData(self, containerData : bytearray) -> None:
+        """ Sets the container data the raw file data is copied from when it is needed.
+
+        Args:
+            containerData (bytearray): The uncompressed data of the file container.
+        """
+        self.__containerData = containerData
+        self.__rawData = None
+
+    def CreateStandaloneCopy(self) -> "ContainerFile":
+        """ Creates a copy that holds only the raw data of this file and not the whole container data,
+            e.g. to send the file to a worker process.
+
+        Returns:
+            ContainerFile: The copy.
+        """
+        file = ContainerFile(self.FileNumber, self.Index, self.FileType)
+        file.FileName = self.FileName
+        file.FileOffset = self.FileOffset
+        file.FileLength = self.FileLength
+        file.RawData = self.RawData
+
+        return file
 
 class ContainerFileType:
     """ This class represents one file type in the file container.
@@ -172,9 +212,9 @@ def __ReadFileList(data : bytearray, fileType : str, fileListOffset : int, fileL
         
         fileList[idx].FileLength = fileLength
 
-    # copy the file data from the buffer
+    # the file data is copied from the buffer on first access
     for file in fileList:
-        file.RawData = data[file.FileOffset : file.FileOffset + file.FileLength]
+        file.SetContainerData(data)
 
     return fileList
 
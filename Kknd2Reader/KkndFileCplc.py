@@ -25,10 +25,12 @@ IN THE SOFTWARE.
 """
 
 from .DataBuffer import GetUInt32LE, GetUInt8
-from .KkndCreatureLib import CreatureLibrary
+from .KkndCreatureLib import CreatureLibrary, LibraryEntry
 from Kknd2Reader.KkndFileCompression import UncompressFile
-from Kknd2Reader.KkndFileContainer import ReadFileTypeList
-import wx # type: ignore
+from Kknd2Reader.KkndFileContainer import ReadFileTypeList, ContainerFileType
+from Kknd2Reader.KkndEntityIndex import EntitySpatialIndex, DEFAULT_CELL_SIZE
+import numpy as np
+import numpy.typing as npt
 
 class CplcEntity:
     """ Represents one entity of the KKND2 map.
@@ -49,8 +51,14 @@ class CplcEntity:
     # the Y coordinate in pixels
     Y : int
 
-    # the entity image
-    Image : wx.Image | None
+    # the creature library entry of the entity, None if the ID is not in the library
+    LibraryEntry : LibraryEntry | None
+
+    @property
+    def Image(self) -> npt.NDArray[np.uint8] | None:
+        """ The entity image as read-only RGBA array [Height, Width, 4], decoded on first access.
+        """
+        return None if self.LibraryEntry is None else self.LibraryEntry.Image
 
 class CplcFile:
     """ A CPLC file in a KKND2 file container stores the unit data of a KKND2 map.
@@ -58,11 +66,15 @@ class CplcFile:
 
     __creatureLib : CreatureLibrary | None
 
+    # the spatial index of the entities, built on first use
+    __spatialIndex : EntitySpatialIndex | None
+
     # list of all entities on the map
     EntityList : list[CplcEntity]
 
     def __init__(self, creatureLibrary : CreatureLibrary | None) -> None:
         self.__creatureLib = creatureLibrary
+        self.__spatialIndex = None
         self.EntityList = []
         
     def ReadCplcFile(self, fileData : bytearray, fileOffset : int) -> None:
@@ -73,6 +85,7 @@ class CplcFile:
             fileOffset (int): The offset of the CPLC file in the file container.
         """
         self.EntityList = []
+        self.__spatialIndex = None
 
         entityPointer = GetUInt32LE(fileData, 4)
         while entityPointer != 0:
@@ -83,6 +96,24 @@ class CplcFile:
 
             entityPointer = GetUInt32LE(fileData, entityPos + 16)
 
+    def GetSpatialIndex(self, cellSize : int = DEFAULT_CELL_SIZE) -> EntitySpatialIndex:
+        """ Returns the spatial index of the entities for viewport culling and hit-testing.
+            The index is built on first use, its query results are indices into EntityList.
+
+        Args:
+            cellSize (int, optional): The edge length of one grid cell in pixels. Defaults to DEFAULT_CELL_SIZE.
+
+        Returns:
+            EntitySpatialIndex: The spatial index.
+        """
+        if self.__spatialIndex is None or self.__spatialIndex.CellSize != cellSize:
+            self.__spatialIndex = EntitySpatialIndex([entity.Id for entity in self.EntityList],
+                                                     [entity.X for entity in self.EntityList],
+                                                     [entity.Y for entity in self.EntityList],
+                                                     [entity.IsOptional for entity in self.EntityList],
+                                                     cellSize)
+        return self.__spatialIndex
+
     def __ParseEntity(self, fileData : bytearray, entityPos : int) -> CplcEntity:
         """ Parses the entity from the raw data.
 
@@ -103,11 +134,11 @@ class CplcFile:
             
             entity.IsOptional = creatureLibEntry.IsOptional
             entity.Name = creatureLibEntry.Name
-            entity.Image = creatureLibEntry.Image
+            entity.LibraryEntry = creatureLibEntry
         else:
             entity.IsOptional = False
             entity.Name = ""
-            entity.Image = None
+            entity.LibraryEntry = None
 
         entity.X = GetUInt32LE(fileData, entityPos + 5)
         entity.Y = GetUInt32LE(fileData, entityPos + 9)
@@ -125,8 +156,24 @@ def ReadCplcFile(fileName : str, creatureLibrary : CreatureLibrary | None) -> Cp
     """
 
     data, _, _ = UncompressFile(fileName)
-
     fileTypeList, _ = ReadFileTypeList(data)
+
+    cplcFile = ReadCplcFileFromContainer(fileTypeList, creatureLibrary)
+    if cplcFile is None:
+        raise Exception(f"No CPLC file found in file container {fileName}")
+    
+    return cplcFile
+
+def ReadCplcFileFromContainer(fileTypeList : list[ContainerFileType], creatureLibrary : CreatureLibrary | None) -> CplcFile | None:
+    """ Reads the first CPLC file from the file type list of an already uncompressed file container.
+
+    Args:
+        fileTypeList (list[ContainerFileType]): The file type list of the container.
+        creatureLibrary (CreatureLibrary | None): The creature library for the entity names and images.
+
+    Returns:
+        CplcFile | None: The CPLC file or None if the container has no CPLC file.
+    """
     for fileType in fileTypeList:
         if fileType.FileType != "CPLC":
             continue
@@ -137,6 +184,7 @@ def ReadCplcFile(fileName : str, creatureLibrary : CreatureLibrary | None) -> Cp
 
             return cplcFile
 
-    raise Exception(f"No CPLC file found in file container {fileName}")
+    return None
+
 
 
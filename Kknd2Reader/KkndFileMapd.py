@@ -23,12 +23,18 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 IN THE SOFTWARE.
 """
 
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
 import numpy as np
 import numpy.typing as npt
 from Kknd2Reader.KkndFileCompression import UncompressFile
-from Kknd2Reader.KkndFileContainer import ReadFileTypeList
-from Kknd2Reader.DataBuffer import GetStringReverse, GetUInt32LE, GetUInt16LE
-from Kknd2Reader.TerrainAttributes import ETerrainAttribute
+from Kknd2Reader.KkndFileContainer import ReadFileTypeList, ContainerFileType
+from Kknd2Reader.DataBuffer import GetStringReverse, GetUInt32LE
+from Kknd2Reader.TerrainAttributes import ETerrainAttribute, RenderTerrainAttributesRgba
+from Kknd2Reader.PngFile import WritePngIndexed
+from Kknd2Reader.KkndColors import ReadRgb555Colors, RGB555_TO_RGB_SHIFT, RGB555_TO_BGR_SHIFT, RGB555_TO_ABGR_SHIFT
 
 class MapdColorPalette:
     """ This class stores the color palette.
@@ -38,9 +44,17 @@ class MapdColorPalette:
     ColorsRGB : list[int]
     ColorsBGR : list[int]
 
+    # ABGR lookup table for rendering, color index 0 is transparent
+    ColorsABGR : npt.NDArray[np.uint32]
+
+    # hash of the palette colors, identifies the palette in the tile store
+    PaletteHash : bytes
+
     def __init__(self) -> None:
         self.ColorsRGB = []
         self.ColorsBGR = []
+        self.ColorsABGR = np.zeros(0, np.uint32)
+        self.PaletteHash = b""
 
     def ReadPalette(self, data : bytearray, palettePosition : int) -> None:
         """ Reads the color palette from the KKN2 data and stores it internally as a list of RGB values.
@@ -50,24 +64,17 @@ class MapdColorPalette:
             palettePosition (int): The position of the color palette in the data buffer.
         """
 
-        self.ColorsRGB = []
-        self.ColorsBGR = []
         numberOfColors = GetUInt32LE(data, palettePosition)
         colorPosition = palettePosition + 4
 
-        for _ in range(numberOfColors):
-            color16 = GetUInt16LE(data, colorPosition)
-            colorPosition += 2
-
-            red = ((color16 & 0x7C00) >> 7) & 0xFF
-            green = ((color16 & 0x03E0) >> 2) & 0xFF
-            blue = ((color16 & 0x001F) << 3) & 0xFF
+        self.ColorsRGB = ReadRgb555Colors(data, colorPosition, numberOfColors, RGB555_TO_RGB_SHIFT).tolist()
+        self.ColorsBGR = ReadRgb555Colors(data, colorPosition, numberOfColors, RGB555_TO_BGR_SHIFT).tolist()
 
-            colorRgb = (red << 16) | (green << 8) | blue
-            colorBgr = (blue << 16) | (green << 8) | red
+        self.ColorsABGR = ReadRgb555Colors(data, colorPosition, numberOfColors, RGB555_TO_ABGR_SHIFT)
+        if numberOfColors > 0:
+            self.ColorsABGR[0] = 0x00000000
 
-            self.ColorsRGB.append(colorRgb)
-            self.ColorsBGR.append(colorBgr)
+        self.PaletteHash = hashlib.blake2b(self.ColorsABGR.tobytes(), digest_size = 16).digest()
 
 class MapdTile:
     """ This class stores the pixel data of a tile.
@@ -82,8 +89,8 @@ class MapdTile:
     # the tile height in pixels
     Height : int
 
-    # the rendered tile as numpyarray
-    TileImage : npt.NDArray[np.uint32]
+    # hash of the tile size and pixel data, identifies the tile in the tile store
+    ContentHash : bytes
 
     def __init__(self, widthInPixels : int = 0, heightInPixels : int = 0) -> None:
         """ Creates a new tile.
@@ -95,6 +102,23 @@ class MapdTile:
         self.Pixels = bytearray(widthInPixels * heightInPixels)
         self.Width = widthInPixels
         self.Height = heightInPixels
+        self.ContentHash = MapdTile.CalculateContentHash(self.Pixels, widthInPixels, heightInPixels)
+
+    @staticmethod
+    def CalculateContentHash(pixels : bytearray | bytes, width : int, height : int) -> bytes:
+        """ Calculates the hash of the tile content.
+
+        Args:
+            pixels (bytearray | bytes): The tile pixel data.
+            width (int): The tile width in pixels.
+            height (int): The tile height in pixels.
+
+        Returns:
+            bytes: The content hash.
+        """
+        hash = hashlib.blake2b(pixels, digest_size = 16)
+        hash.update(width.to_bytes(4, "little") + height.to_bytes(4, "little"))
+        return hash.digest()
 
     def GetPixel(self, column : int, row : int) -> int:
         """ Returns one pixel.
@@ -120,28 +144,110 @@ class MapdTile:
         self.Width = tileWidth
         self.Height = tileHeight
         self.Pixels = fileData[tileOffset : tileOffset + tileWidth * tileHeight]
+        self.ContentHash = MapdTile.CalculateContentHash(self.Pixels, tileWidth, tileHeight)
+
+    def CreateTileImageUInt32Abgr(self, colorPalette : MapdColorPalette) -> npt.NDArray[np.uint32]:
+        """ Creates the ABGR tile image.
+
+        Args:
+            colorPalette (MapdColorPalette): The color palette.
+
+        Returns:
+            npt.NDArray[np.uint32]: The tile ABGR data in a 2D array [Width, Height].
+        """
+        colorsAbgr = colorPalette.ColorsABGR
+        pixels = np.frombuffer(self.Pixels, np.uint8, self.Width * self.Height)
+
+        if len(pixels) > 0 and int(pixels.max()) >= len(colorsAbgr):
+            raise Exception(f"Can not render imager, invalid pixel value: {int(pixels.max())}")
+
+        # pixel is transparent if pixel value is 0 (index 0 of the lookup table)
+        return colorsAbgr[pixels].reshape(self.Height, self.Width).transpose()
+
+class MapdTileStore:
+    """ Process wide store of the tiles of all loaded maps.
+        Maps of the same theatre share most of their tile graphics. The store keeps every tile
+        content only once and caches the rendered tiles for each palette.
+        The tiles are held weakly: a tile is removed when no loaded map uses it any more.
+        The tiles are shared, so they must not hold any per-render state.
+    """
+
+    # maximum number of rendered tiles in the cache
+    MaxRenderedTiles : int
 
-    def RenderTileUInt32Abgr(self, colorPalette : MapdColorPalette) -> None:
-        """ Renders the tile as ABGR data.
+    # number of rendered tile requests that were served from the cache
+    RenderedTileHits : int
+
+    # number of rendered tile requests that had to be rendered
+    RenderedTileMisses : int
+
+    def __init__(self, maxRenderedTiles : int = 8192) -> None:
+        self.MaxRenderedTiles = maxRenderedTiles
+        self.RenderedTileHits = 0
+        self.RenderedTileMisses = 0
+
+        self.__tiles : weakref.WeakValueDictionary[bytes, MapdTile] = weakref.WeakValueDictionary()
+        self.__renderedTiles : OrderedDict[tuple[bytes, bytes], npt.NDArray[np.uint32]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__tiles)
+
+    def GetTile(self, tile : MapdTile) -> MapdTile:
+        """ Returns the stored tile with the same content, the tile is stored if it is new.
+
+        Args:
+            tile (MapdTile): The tile.
+
+        Returns:
+            MapdTile: The stored tile with the same content.
         """
+        with self.__lock:
+            return self.__tiles.setdefault(tile.ContentHash, tile)
 
-        colorsBgr = colorPalette.ColorsBGR
-        pixels = np.zeros((self.Width, self.Height), np.uint32)
-        pixelIdx = 0
+    def GetRenderedTile(self, tile : MapdTile, colorPalette : MapdColorPalette) -> npt.NDArray[np.uint32]:
+        """ Returns the rendered tile from the cache or renders it.
 
-        for tilePixelRow in range(self.Height):
-            for tilePixelColumn in range(self.Width):
-                pixel = self.Pixels[pixelIdx]
-                pixelIdx += 1
-                if pixel >= len(colorsBgr):
-                    raise Exception(f"Can not render imager, invalid pixel value: {pixel}")
+        Args:
+            tile (MapdTile): The tile.
+            colorPalette (MapdColorPalette): The color palette.
 
-                # pixel is transparent if pixel value is 0
-                
-                pixelAbgrColor = (colorsBgr[pixel] | 0xFF000000) if pixel != 0 else 0x00000000
-                pixels[tilePixelColumn, tilePixelRow] = pixelAbgrColor
+        Returns:
+            npt.NDArray[np.uint32]: The read only tile ABGR data in a 2D array [Width, Height].
+        """
+        key = (tile.ContentHash, colorPalette.PaletteHash)
 
-        self.TileImage = pixels
+        with self.__lock:
+            tileImage = self.__renderedTiles.get(key)
+
+            if tileImage is not None:
+                self.__renderedTiles.move_to_end(key)
+                self.RenderedTileHits += 1
+                return tileImage
+
+        tileImage = tile.CreateTileImageUInt32Abgr(colorPalette)
+        tileImage.flags.writeable = False
+
+        with self.__lock:
+            self.RenderedTileMisses += 1
+            self.__renderedTiles[key] = tileImage
+
+            while len(self.__renderedTiles) > self.MaxRenderedTiles:
+                self.__renderedTiles.popitem(last = False)
+
+        return tileImage
+
+    def Clear(self) -> None:
+        """ Removes all tiles and rendered tiles from the store.
+        """
+        with self.__lock:
+            self.__tiles = weakref.WeakValueDictionary()
+            self.__renderedTiles = OrderedDict()
+            self.RenderedTileHits = 0
+            self.RenderedTileMisses = 0
+
+# the tile store shared by all maps of the process
+TileStore = MapdTileStore()
 
 class MapdTerrainAttributes:
     """ This class stores the terrain attributes for the layer tiles.
@@ -156,10 +262,14 @@ class MapdTerrainAttributes:
     # The terrain attributes of the layer tiles
     TerrainAttributes : list[ETerrainAttribute]
 
+    # The terrain attributes of the layer tiles in a 2D array [MapHeightInTiles, MapWidthInTiles]
+    TerrainAttributeMap : npt.NDArray[np.uint8]
+
     def __init__(self) -> None:
         self.MapWidthInTiles = 0
         self.MapHeightInTiles = 0
         self.TerrainAttributes = []
+        self.TerrainAttributeMap = np.zeros((0, 0), np.uint8)
 
     def GetTerrainAttribute(self, column : int, row : int) -> ETerrainAttribute:
         """ Returns the terrain attribute for a position.
@@ -185,13 +295,12 @@ class MapdTerrainAttributes:
 
         self.MapWidthInTiles = mapWidthInTiles
         self.MapHeightInTiles = mapHeightInTiles
-        self.TerrainAttributes = []
 
         numberOfTiles = mapWidthInTiles * mapHeightInTiles
 
-        for idx in range(numberOfTiles):
-            terrainAttribute = fileData[terrainAttributesOffset + idx]
-            self.TerrainAttributes.append( ETerrainAttribute(terrainAttribute) )
+        attributes = np.frombuffer(fileData, np.uint8, numberOfTiles, terrainAttributesOffset)
+        self.TerrainAttributeMap = attributes.reshape(mapHeightInTiles, mapWidthInTiles).copy()
+        self.TerrainAttributes = [ ETerrainAttribute(terrainAttribute) for terrainAttribute in attributes.tolist() ]
 
 class MapdLayer:
     """ This class stores the tiles of a layer.
@@ -257,7 +366,7 @@ class MapdLayer:
             fileOffset (int): The offset of the file in the container.
             layerOffset (int): The offset of the layer in the file.
         """
-        self.__ReadLayerHeader(fileData, layerOffset)
+        self.ReadLayerHeader(fileData, layerOffset)
         self.__ReadTerrainAttributes(fileData, fileOffset, layerOffset)
         self.__ReadLayerTiles(fileData, fileOffset, layerOffset + 32)
 
@@ -289,7 +398,7 @@ class MapdLayer:
         self.TileList = {}
 
         # add empty tile
-        self.TileList[0] = MapdTile(self.TileWidthInPixels, self.TileHeightInPixels)
+        self.TileList[0] = TileStore.GetTile(MapdTile(self.TileWidthInPixels, self.TileHeightInPixels))
 
         for _ in range(numberOfTiles):
             tileOffset = GetUInt32LE(fileData, pos) & 0xFFFFFFFC
@@ -300,10 +409,12 @@ class MapdLayer:
             if tileOffset not in self.TileList:
                 tile = MapdTile()
                 tile.ReadTile(fileData, tileOffset - fileOffset, self.TileWidthInPixels, self.TileHeightInPixels)
-                self.TileList[tileOffset] = tile
 
-    def __ReadLayerHeader(self, fileData : bytearray, layerOffset : int) -> None:
-        """ Reads the layer header information.
+                # tiles with the same content share one tile object, also across maps
+                self.TileList[tileOffset] = TileStore.GetTile(tile)
+
+    def ReadLayerHeader(self, fileData : bytearray, layerOffset : int) -> None:
+        """ Reads the layer header information, the tiles are not read.
 
         Args:
             fileData (bytearray): The raw file data.
@@ -333,21 +444,42 @@ class MapdLayer:
             npt.NDArray[np.uint32]: The layer ARGB data in a 2D array [Width, Height].
         """
 
+        tileOffsetList = list(self.TileList.keys())
+        tileImageList = []
+
         for tile in self.TileList.values():
-            tile.RenderTileUInt32Abgr(colorPalette)
+            tileImageList.append(TileStore.GetRenderedTile(tile, colorPalette))
+
+        # gather the rendered tiles [TileColumn, TileRow, PixelColumn, PixelRow] -> [Width, Height]
+        tileIndexByOffset = { tileOffset: idx for idx, tileOffset in enumerate(tileOffsetList) }
+        tileIndexMap = np.array([tileIndexByOffset[tileOffset] for tileOffset in self.TileMap], np.intp)
+        tileIndexMap = tileIndexMap.reshape(self.MapHeightInTiles, self.MapWidthInTiles).transpose()
+
+        tiles = np.stack(tileImageList)[tileIndexMap]
+        pixels = tiles.transpose(0, 2, 1, 3).reshape(self.MapWidthInPixels, self.MapHeightInPixels)
+
+        return pixels
+
+    def RenderImageIndexed(self) -> npt.NDArray[np.uint8]:
+        """ Renders the layer as palette indices, e.g. for the export as 8 bit PNG.
 
-        pixels = np.zeros((self.MapWidthInPixels, self.MapHeightInPixels), np.uint32)
+        Returns:
+            npt.NDArray[np.uint8]: The layer color indices in a 2D array [Height, Width].
+        """
         tileWidth = self.TileWidthInPixels
         tileHeight = self.TileHeightInPixels
-        
-        for tileRow in range(self.MapHeightInTiles):
-            layerPixelRow = tileRow * tileHeight
 
-            for tileColumn in range(self.MapWidthInTiles):
-                layerPixelColumn = tileColumn * tileWidth
-                tile = self.GetTile(tileColumn, tileRow)
+        tileOffsetList = list(self.TileList.keys())
+        tilePixelList = [np.frombuffer(tile.Pixels, np.uint8, tileWidth * tileHeight).reshape(tileHeight, tileWidth)
+                         for tile in self.TileList.values()]
 
-                pixels[layerPixelColumn : layerPixelColumn + tileWidth, layerPixelRow : layerPixelRow + tileHeight] = tile.TileImage
+        # gather the tiles [TileRow, TileColumn, PixelRow, PixelColumn] -> [Height, Width]
+        tileIndexByOffset = { tileOffset: idx for idx, tileOffset in enumerate(tileOffsetList) }
+        tileIndexMap = np.array([tileIndexByOffset[tileOffset] for tileOffset in self.TileMap], np.intp)
+        tileIndexMap = tileIndexMap.reshape(self.MapHeightInTiles, self.MapWidthInTiles)
+
+        tiles = np.stack(tilePixelList)[tileIndexMap]
+        pixels = tiles.transpose(0, 2, 1, 3).reshape(self.MapHeightInPixels, self.MapWidthInPixels)
 
         return pixels
 
@@ -405,9 +537,8 @@ class MapdFile:
         colors = palette.ColorsRGB
 
         for tile in layer.TileList.values():
-            for pixel in tile.Pixels:
-                if pixel < 0 or pixel >= len(colors):
-                    raise Exception("Image invalid pixel data")
+            if len(tile.Pixels) > 0 and max(tile.Pixels) >= len(colors):
+                raise Exception("Image invalid pixel data")
             
     def RenderLayerUint32Abgr(self, layerIndex : int) -> npt.NDArray[np.uint32]:
         """ Renders the layer as ABGR color data.
@@ -420,6 +551,41 @@ class MapdFile:
         """
         return self.LayerList[layerIndex].RenderImageUInt32Abgr(self.ColorPalette)
 
+    def RenderLayerIndexed(self, layerIndex : int) -> npt.NDArray[np.uint8]:
+        """ Renders the layer as color indices of the map color palette.
+
+        Args:
+            layerIndex (int): The layer with the index in the list of layers to be rendered.
+
+        Returns:
+            npt.NDArray[np.uint8]: The layer color indices in a 2D array [Height, Width].
+        """
+        return self.LayerList[layerIndex].RenderImageIndexed()
+
+    def ExportLayerPng(self, layerIndex : int, fileName : str, compressionLevel : int = 6, filterStrategy : str = "none") -> None:
+        """ Exports the layer as 8 bit palette PNG, color index 0 is transparent.
+
+        Args:
+            layerIndex (int): The layer with the index in the list of layers to be exported.
+            fileName (str): The name of the PNG file.
+            compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+            filterStrategy (str, optional): The PNG row filter or "adaptive". Defaults to "none".
+        """
+        WritePngIndexed(fileName, self.RenderLayerIndexed(layerIndex), self.ColorPalette.ColorsRGB,
+                        compressionLevel = compressionLevel, filterStrategy = filterStrategy)
+
+    def RenderTerrainAttributesRgba(self, terrainAttributeIcons : npt.NDArray[np.uint8]) -> npt.NDArray[np.uint8]:
+        """ Renders the terrain attributes of the bottom layer as RGBA overlay.
+
+        Args:
+            terrainAttributeIcons (npt.NDArray[np.uint8]): The icons from TerrainAttributes.LoadTerrainAttributeIcons().
+
+        Returns:
+            npt.NDArray[np.uint8]: The RGBA overlay in a 3D array [Height, Width, 4].
+        """
+        layerBottom = self.LayerList[0]
+        return RenderTerrainAttributesRgba(layerBottom.TerrainAttributes.TerrainAttributeMap, terrainAttributeIcons)
+
 def ReadMaps(fileName : str) -> list[MapdFile]:
     """ Reads all MAPD files from a KKND2 asset file container.
 
@@ -431,9 +597,41 @@ def ReadMaps(fileName : str) -> list[MapdFile]:
     """
 
     data, _, _ = UncompressFile(fileName)
+    fileTypeList, _ = ReadFileTypeList(data)
+
+    return ReadMapdFiles(fileTypeList)
+
+def ReadMapdMapSize(fileData : bytearray, fileOffset : int) -> tuple[int, int]:
+    """ Reads the map size from the header of the first layer of a MAPD file, the tiles are not decoded.
+
+    Args:
+        fileData (bytearray): The raw MAPD file data.
+        fileOffset (int): The offset of the MAPD file in the file container.
+
+    Returns:
+        int: The map width in pixels.
+        int: The map height in pixels.
+    """
+    numberOfLayers = GetUInt32LE(fileData, 4)
+    if numberOfLayers == 0:
+        raise Exception("MAPD file has no layers")
+
+    layer = MapdLayer()
+    layer.ReadLayerHeader(fileData, GetUInt32LE(fileData, 8) - fileOffset)
+
+    return layer.MapWidthInPixels, layer.MapHeightInPixels
+
+def ReadMapdFiles(fileTypeList : list[ContainerFileType]) -> list[MapdFile]:
+    """ Reads all MAPD files from the file type list of an already uncompressed file container.
+
+    Args:
+        fileTypeList (list[ContainerFileType]): The file type list of the container.
+
+    Returns:
+        list[MapdFile]: List of MAPD files.
+    """
     mapdFileList : list[MapdFile] = []
 
-    fileTypeList, _ = ReadFileTypeList(data)
     for fileType in fileTypeList:
         if fileType.FileType != "MAPD":
             continue
@@ -28,10 +28,17 @@ import numpy.typing as npt
 from Kknd2Reader.DataBuffer import GetInt32LE, GetUInt32LE, GetUInt16LE, GetUInt8, GetStringReverse
 from Kknd2Reader.KkndFileContainer import ContainerFile
 from Kknd2Reader import KkndPalette
-from typing import Any
+from Kknd2Reader.PngFile import WritePngIndexed
+from Kknd2Reader.KkndColors import ConvertRgb555, ReadRgb555Colors, SwapRedAndBlue, RGB555_TO_RGB_SHIFT, RGB555_TO_BGR_SHIFT, RGB555_TO_ABGR_SHIFT
 import colorsys
 
-MobdFileStructure : dict[int, str] = {}
+# the pixel run modes of the compressed images: one pixel per byte, two pixels per byte, high nibble only
+RUN_BYTES = 0
+RUN_NIBBLE_PAIRS = 1
+RUN_HIGH_NIBBLES = 2
+
+# the number of team colors of the KKND2 palettes
+NUMBER_OF_TEAM_COLORS = 8
 
 FactionNameById : dict[int, str] = {
     0: "Survivors",
@@ -45,15 +52,27 @@ FactionIdByJsonPrefix : dict[str, int] = {
     "R": 2,
 }
 
-def SaveMobdFileStructureInfo(fileName : str) -> None:
-    """ Exports the Mobd file structure of the last loaded file.
+class MobdParseContext:
+    """ Optional bookkeeping while a MOBD file is parsed: what is stored at which position of the file.
+        Without a context nothing is recorded, so several files can be parsed at the same time.
+    """
+
+    # the description of the data at each position of the MOBD file
+    FileStructure : dict[int, str]
+
+    def __init__(self) -> None:
+        self.FileStructure = {}
+
+def SaveMobdFileStructureInfo(fileName : str, context : MobdParseContext) -> None:
+    """ Exports the Mobd file structure recorded while parsing a file.
 
     Args:
         fileName (str): The filename.
+        context (MobdParseContext): The parse context of the file.
     """
     with open(fileName, "w") as file:
-        for offset in sorted(MobdFileStructure):
-            file.write(f"{offset:06} {MobdFileStructure[offset]}\n")
+        for offset in sorted(context.FileStructure):
+            file.write(f"{offset:06} {context.FileStructure[offset]}\n")
 
 def ConvertColorsFromRgbToBgr(colorsRgb : list[int]) -> list[int]:
     """ Converts RGB colors to BGR colors.
@@ -65,13 +84,7 @@ def ConvertColorsFromRgbToBgr(colorsRgb : list[int]) -> list[int]:
         list[int]: The BGR colors
     """
     
-    colorsBgr = [0] * len(colorsRgb)
-
-    for idx in range(len(colorsRgb)):
-        c = colorsRgb[idx]
-        colorsBgr[idx] = ((c & 0xFF) << 16) | (c & 0xFF00) | ((c & 0xFF0000) >> 16)
-
-    return colorsBgr
+    return SwapRedAndBlue(colorsRgb).tolist()
 
 def GetFactionIdFromMobdIndex(mobdIndex : int) -> int | None:
     """Returns the faction id for a MOBD index according to the table found in Kknd2.exe.
@@ -173,9 +186,6 @@ class MobdColorPalette:
     """ This class stores the color palette.
     """
 
-    # all color palettes of the Mobd file
-    MobdColorPalettes : dict[int, Any] = {}
-
     # 4 byte RGB color read from MOBD file
     # this color palette is not valid for buildings
     ColorsRgb : list[int]
@@ -184,6 +194,11 @@ class MobdColorPalette:
     # this color palette is not valid for buildings
     ColorsBgr : list[int]
 
+    # the colors as NumPy lookup tables: RGB, BGR and ABGR (opaque, color 0 is transparent)
+    ColorsRgbArray : npt.NDArray[np.uint32]
+    ColorsBgrArray : npt.NDArray[np.uint32]
+    ColorsAbgr : npt.NDArray[np.uint32]
+
     # the animation index in the animation list
     AnimationIndex : int
 
@@ -199,6 +214,9 @@ class MobdColorPalette:
     def __init__(self, animationIndex : int, frameIndex : int) -> None:
         self.ColorsRgb = []
         self.ColorsBgr = []
+        self.ColorsRgbArray = np.zeros(0, np.uint32)
+        self.ColorsBgrArray = np.zeros(0, np.uint32)
+        self.ColorsAbgr = np.zeros(0, np.uint32)
         self.AnimationIndex = animationIndex
         self.FrameIndex = frameIndex
         self.NumberOfColors = 0
@@ -216,43 +234,35 @@ class MobdColorPalette:
 
         return b
     
-    def ReadPalette(self, data : bytearray, palettePosition : int) -> None:
+    def ReadPalette(self, data : bytearray, palettePosition : int, context : MobdParseContext | None = None) -> None:
         """ Reads the color palette from the KKN2 data and stores it internally as a list of RGB values.
 
         Args:
             data (bytearray): The raw KKND2 data.
             palettePosition (int): The position of the color palette in the data buffer.
+            context (MobdParseContext | None, optional): Records the file structure. Defaults to None.
         """
 
-        MobdFileStructure[palettePosition] = f"MobdColorPalette animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
-        MobdColorPalette.MobdColorPalettes[palettePosition] = self
+        if context is not None:
+            context.FileStructure[palettePosition] = f"MobdColorPalette animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
         self.PalettePosition = palettePosition
 
-        self.ColorsRgb = []
-        self.ColorsBgr = []
         numberOfColors = GetUInt16LE(data, palettePosition + 12)
         self.NumberOfColors = numberOfColors
 
-        colorPosition = palettePosition + 14
-
-        for _ in range(numberOfColors):
-            color16 = GetUInt16LE(data, colorPosition)
-            colorPosition += 2
+        # convert all RGB555 colors at once
+        self.ColorsRgbArray = ReadRgb555Colors(data, palettePosition + 14, numberOfColors, RGB555_TO_RGB_SHIFT)
+        self.ColorsBgrArray = ReadRgb555Colors(data, palettePosition + 14, numberOfColors, RGB555_TO_BGR_SHIFT)
 
-            self.ColorsRgb.append(MobdColorPalette.ConvertRgb15To24(color16))
+        self.ColorsAbgr = ReadRgb555Colors(data, palettePosition + 14, numberOfColors, RGB555_TO_ABGR_SHIFT)
+        if numberOfColors > 0:
+            self.ColorsAbgr[0] = 0x00000000
 
-        self.__CreateBgrPalette()
-
-    def __CreateBgrPalette(self) -> None:
-        """ Creates the BGR palette from the RGB palette.
-        """
-        self.ColorsBgr = []
+        for colors in (self.ColorsRgbArray, self.ColorsBgrArray, self.ColorsAbgr):
+            colors.setflags(write = False)
 
-        for rgb in self.ColorsRgb:
-            red   = (rgb >> 16) & 0xFF
-            green = (rgb >>  8) & 0xFF
-            blue  = (rgb >>  0) & 0xFF
-            self.ColorsBgr.append((blue << 16) | (green << 8) | red)
+        self.ColorsRgb = self.ColorsRgbArray.tolist()
+        self.ColorsBgr = self.ColorsBgrArray.tolist()
 
     @staticmethod
     def ConvertRgb15To24(color15 : int) -> int:
@@ -264,11 +274,7 @@ class MobdColorPalette:
         Returns:
             int: 24 RGB value (8 bit per color channel)
         """
-        red   = ((color15 & 0x7C00) >> 7) & 0xFF
-        green = ((color15 & 0x03E0) >> 2) & 0xFF
-        blue  = ((color15 & 0x001F) << 3) & 0xFF
-
-        return (red << 16) | (green << 8) | blue
+        return int(ConvertRgb555(color15, RGB555_TO_RGB_SHIFT))
     
     @staticmethod
     def ConvertRgb24To15(color24 : int) -> int:
@@ -353,15 +359,31 @@ class MobdImage:
         """
         return self.Pixels[column + row * self.Width]
     
-    def ReadImage(self, data : bytearray, imagePosition : int, flags : int) -> None:
+    def GetPixelArray(self) -> npt.NDArray[np.uint8]:
+        """ Returns the pixels as array, missing pixels are 0.
+
+        Returns:
+            npt.NDArray[np.uint8]: The palette indices in a 2D array [Height, Width].
+        """
+        size = self.Width * self.Height
+        pixels = np.zeros(size, np.uint8)
+
+        count = min(size, len(self.Pixels))
+        pixels[:count] = np.frombuffer(self.Pixels, np.uint8, count)
+
+        return pixels.reshape(self.Height, self.Width)
+
+    def ReadImage(self, data : bytearray, imagePosition : int, flags : int, context : MobdParseContext | None = None) -> None:
         """ Read the image from the raw data.
 
         Args:
             data (bytearray): The raw data.
             imagePosition (int): The image position in the data buffer.
             flags (int): Image flags read from the raw data.
+            context (MobdParseContext | None, optional): Records the file structure. Defaults to None.
         """
-        MobdFileStructure[imagePosition] = f"MobdImage animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
+        if context is not None:
+            context.FileStructure[imagePosition] = f"MobdImage animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
 
         self.Pixels = bytearray()
 
@@ -410,6 +432,7 @@ class MobdImage:
     @staticmethod
     def __DecompressImageData(data : bytearray, pixelDataPosition : int, width : int, height : int, has256Colors : bool) -> bytearray:
         """ Decompress the image data.
+            The row and run structure is scanned first, then all runs are unpacked with one NumPy gather.
 
         Args:
             data (bytearray): The raw image data.
@@ -423,10 +446,25 @@ class MobdImage:
         """
 
         size = width * height
-        pixels = bytearray()
         position = pixelDataPosition
 
-        while len(pixels) < size:
+        # the pixel runs: target position, source position, number of pixels and run mode
+        runDst : list[int] = []
+        runSrc : list[int] = []
+        runCount : list[int] = []
+        runMode : list[int] = []
+
+        def AddRun(dst : int, src : int, count : int, mode : int) -> None:
+            if count > 0:
+                runDst.append(dst)
+                runSrc.append(src)
+                runCount.append(count)
+                runMode.append(mode)
+
+        # the number of pixels written so far, zero runs are only skipped
+        cursor = 0
+
+        while cursor < size:
 
             if has256Colors:
                 compressedSize = GetUInt16LE(data, position)
@@ -437,24 +475,18 @@ class MobdImage:
 
             if compressedSize == 0:
                 # store empty row
-                pixels.extend([0] * width)
+                cursor += width
 
             elif (not has256Colors) and (compressedSize > 0x80):
+                # two pixels per byte until the row is full, then only the high nibble of each byte
                 pixelCount = compressedSize - 0x80
-                cnt = 0
+                pairCount = min(pixelCount, width // 2)
 
-                for _ in range(pixelCount):
-                    twoPixels = GetUInt8(data, position)
-                    position += 1
+                AddRun(cursor, position, 2 * pairCount, RUN_NIBBLE_PAIRS)
+                AddRun(cursor + 2 * pairCount, position + pairCount, pixelCount - pairCount, RUN_HIGH_NIBBLES)
 
-                    # store first pixel
-                    pixels.append((twoPixels & 0xF0) >> 4)
-                    cnt += 1
-
-                    # store second pixel
-                    if cnt < width:
-                        pixels.append(twoPixels & 0x0F)
-                        cnt += 1
+                cursor += pairCount + pixelCount
+                position += pixelCount
                 
             else:
                 lineEndOffset = position + compressedSize
@@ -463,31 +495,51 @@ class MobdImage:
                     position += 1
 
                     if chunkSize < 0x80:
-                        pixels.extend([0] * chunkSize)
+                        cursor += chunkSize
                     else:
                         pixelCount = chunkSize - 0x80
 
                         if has256Colors:
-                            pixels.extend(data[position : position + pixelCount])
+                            count = max(min(pixelCount, len(data) - position), 0)
+                            AddRun(cursor, position, count, RUN_BYTES)
+                            cursor += count
                             position += pixelCount
 
                         else:
-                            numBytes = pixelCount // 2 + pixelCount % 2
+                            AddRun(cursor, position, pixelCount, RUN_NIBBLE_PAIRS)
+                            cursor += pixelCount
+                            position += pixelCount // 2 + pixelCount % 2
 
-                            for idx in range(numBytes):
-                                twoPixels = GetUInt8(data, position)
-                                position += 1
+            cursor += (width - cursor % width) % width
 
-                                pixels.append((twoPixels & 0xF0) >> 4)
+        pixels = np.zeros(cursor, np.uint8)
 
-                                if (idx + 1 < numBytes) or (pixelCount % 2 == 0):
-                                    pixels.append(twoPixels & 0x0F)
+        if len(runCount) > 0:
+            counts = np.array(runCount, np.int64)
+            modes = np.repeat(np.array(runMode, np.int64), counts)
 
-            cnt = (width - len(pixels) % width) % width
-            if cnt > 0:
-                pixels.extend([0] * cnt)
-        
-        return pixels
+            # index of each pixel inside its run
+            runStart = np.cumsum(counts) - counts
+            j = np.arange(int(counts.sum()), dtype = np.int64) - np.repeat(runStart, counts)
+
+            isPair = modes == RUN_NIBBLE_PAIRS
+            srcIndex = np.repeat(np.array(runSrc, np.int64), counts) + np.where(isPair, j // 2, j)
+            source = np.frombuffer(data, np.uint8)
+
+            # nibble runs of a truncated stream read zeros past the end of the data, like GetUInt8
+            padding = int(srcIndex.max()) + 1 - len(source)
+            if padding > 0:
+                source = np.concatenate((source, np.zeros(padding, np.uint8)))
+
+            values = source[srcIndex]
+
+            # the high nibble is the first pixel of a pair
+            isHigh = (modes == RUN_HIGH_NIBBLES) | (isPair & (j % 2 == 0))
+            values = np.where(modes == RUN_BYTES, values, np.where(isHigh, values >> 4, values & 0x0F))
+
+            pixels[np.repeat(np.array(runDst, np.int64), counts) + j] = values
+
+        return bytearray(pixels.tobytes())
     
     @staticmethod
     def __FlipImagePixels(pixels : bytearray, width : int, height : int) -> bytearray:
@@ -501,19 +553,25 @@ class MobdImage:
         Returns:
             bytearray: The flipped pixel data.
         """
+        if width <= 0 or height <= 0:
+            return bytearray()
 
-        flippedPixels = bytearray()
+        rowCount = min(height, len(pixels) // width)
+        rows = np.frombuffer(pixels, np.uint8, rowCount * width).reshape(rowCount, width)
 
-        for rowIdx in range(height):
-            row = pixels[rowIdx * width : (rowIdx + 1) * width]
-            row.reverse()
+        flippedPixels = bytearray(rows[:, ::-1].tobytes())
 
+        # a truncated last row is flipped on its own
+        if rowCount < height:
+            row = pixels[rowCount * width : (rowCount + 1) * width]
+            row.reverse()
             flippedPixels.extend(row)
 
         return flippedPixels
 
 class MobdFrame:
     """ This is one frame of the animation. This is an image with its color palette.
+        The image and the color palette are decoded on first access.
     """
 
     # The sprite offset from the center point of the image:
@@ -525,13 +583,9 @@ class MobdFrame:
     # Points are required for turrets, muzzles and projectile launch offsets.
     PointList : list[ModbPoint]
 
-    # The image colors.
-    ColorPalette : MobdColorPalette
-
-    # The image pixel data.
-    Image : MobdImage
-
-    Bitmap : Any
+    # The image size in pixels, read without decoding the image.
+    Width : int = 0
+    Height : int = 0
 
     # the raw file data
     RawFrameData : bytes
@@ -554,9 +608,13 @@ class MobdFrame:
 
     def __init__(self, animationIndex : int, frameIndex : int, mobdFileIndex : int | None = None, mobdFileName : str = "", factionId : int | None = None) -> None:
         self.PointList = []
-        self.Bitmap = None
-        self.ColorPalette = MobdColorPalette(animationIndex, frameIndex)
-        self.Image = MobdImage(animationIndex, frameIndex, mobdFileIndex, mobdFileName, factionId)
+        self.__image : MobdImage | None = None
+        self.__colorPalette : MobdColorPalette | None = None
+        self.__data : bytearray | None = None
+        self.__renderFlagsPosition = 0
+        self.__fileOffset = 0
+        self.__paletteCache : dict[int, MobdColorPalette] | None = None
+        self.__context : MobdParseContext | None = None
         self.AnimationIndex = animationIndex
         self.FrameIndex = frameIndex
         self.MobdFileIndex = mobdFileIndex
@@ -564,14 +622,21 @@ class MobdFrame:
         self.FactionId = factionId
         self.FactionName = GetFactionName(factionId)
     
-    def ReadFrame(self, data : bytearray, framePosition : int, fileOffset : int) -> None:
+    def ReadFrame(self, data : bytearray, framePosition : int, fileOffset : int, paletteCache : dict[int, MobdColorPalette] | None = None,
+                  context : MobdParseContext | None = None) -> None:
         """ Reads one frame from the animation.
 
         Args:
             data (bytearray): The raw data of the MOBD file.
             framePosition (int): The position(=offset) of the frame in the MOBD file.
+            fileOffset (int): The offset of the MOBD file in the file container.
+            paletteCache (dict[int, MobdColorPalette] | None, optional): The palettes of the MOBD file by position,
+                shared by all frames of the file. Defaults to None.
+            context (MobdParseContext | None, optional): Records the file structure, also when the frame is decoded later. Defaults to None.
         """
-        MobdFileStructure[framePosition] = f"MobdFrame animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
+        self.__context = context
+        if context is not None:
+            context.FileStructure[framePosition] = f"MobdFrame animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
 
         self.OffsetX = GetInt32LE(data, framePosition + 0)
         self.OffsetY = GetInt32LE(data, framePosition + 4)
@@ -588,51 +653,120 @@ class MobdFrame:
         if pointListOffset > 0:
             self.PointList = self.__ReadPointList(data, pointListOffset - fileOffset)
 
+        self.__image = None
+        self.__colorPalette = None
+        self.__data = None
+        self.Width = 0
+        self.Height = 0
+
         if renderFlagsOffset > 0:
-            self.Image, self.ColorPalette = self.__ReadImageAndColorPalette(data, renderFlagsOffset - fileOffset, fileOffset)
+            # only the image size is read here, the image and the palette are decoded on first use
+            self.__data = data
+            self.__renderFlagsPosition = renderFlagsOffset - fileOffset
+            self.__fileOffset = fileOffset
+            self.__paletteCache = paletteCache
+
+            imagePosition = GetUInt32LE(data, self.__renderFlagsPosition + 12) - fileOffset
+            self.Width = GetInt32LE(data, imagePosition + 0)
+            self.Height = GetInt32LE(data, imagePosition + 4)
 
         if boxListOffset > 0:
             self.__ReadBoxList(data, boxListOffset - fileOffset)
 
+    @property
+    def IsDecoded(self) -> bool:
+        """ True if the image and the color palette are decoded.
+        """
+        return self.__image is not None
+
+    @property
+    def Image(self) -> MobdImage:
+        """ The image pixel data.
+        """
+        self.Decode()
+
+        assert self.__image is not None
+        return self.__image
+
+    @property
+    def ColorPalette(self) -> MobdColorPalette:
+        """ The image colors.
+        """
+        self.Decode()
+
+        assert self.__colorPalette is not None
+        return self.__colorPalette
+
+    def Decode(self) -> None:
+        """ Decodes the image and the color palette if they are not decoded yet.
+        """
+        if self.IsDecoded:
+            return
+
+        if self.__data is None:
+            self.__image = MobdImage(self.AnimationIndex, self.FrameIndex, self.MobdFileIndex, self.MobdFileName, self.FactionId)
+            self.__colorPalette = MobdColorPalette(self.AnimationIndex, self.FrameIndex)
+            return
+
+        self.__image, self.__colorPalette = self.__ReadImageAndColorPalette(self.__data, self.__renderFlagsPosition, self.__fileOffset)
+
+        # the raw data is not needed anymore
+        self.__data = None
+
     def RenderFrameUInt32Abgr(self, teamColorId : int | None = 0) -> npt.NDArray[np.uint32]:
-        """ Renders the tile as ABGR data.
+        """ Renders the frame as ABGR data with one lookup table gather.
+            Pixel values outside the palette get a debug color and are reported.
 
         teamColorId=None renders with the local MOBD palette.
+
+        Returns:
+            npt.NDArray[np.uint32]: The ABGR pixels in a 2D array [Height, Width].
         """
 
-        img = self.Image
-        colorsBgr = self.__GetRenderColorsBgr(teamColorId)
-        pixels = np.zeros((img.Width, img.Height), np.uint32)
-        unknownPixels : dict[int, int] = {}
+        return self.RenderTeamColorsUInt32Abgr([teamColorId])[0]
+
+    def RenderTeamColorsUInt32Abgr(self, teamColorIds : list[int | None]) -> npt.NDArray[np.uint32]:
+        """ Renders the frame in several team colors at once: the lookup tables of all team colors are stacked
+            and the indexed pixels are gathered once, so all team colors cost about as much as a single render.
+            Pixel values outside the palette get a debug color and are reported.
+
+        Args:
+            teamColorIds (list[int | None]): The team colors, None renders with the local MOBD palette.
 
-        for row in range(img.Height):
-            for column in range(img.Width):
-                pixelValue = img.GetPixel(column, row)
+        Returns:
+            npt.NDArray[np.uint32]: The ABGR pixels [len(teamColorIds), Height, Width].
+        """
 
-                if pixelValue >= len(colorsBgr):
-                    # raise Exception(f"Can not render imager, invalid pixel value: {pixel}")
-                    pixelAbgrColor = 0xFF00FF00 | (pixelValue & 0xFF)
-                    # pixelAbgrColor = 0xFFD000FF
-                    unknownPixels[pixelValue] = unknownPixels[pixelValue] + 1 if pixelValue in unknownPixels else 1
+        luts = np.empty((len(teamColorIds), 256), np.uint32)
+        minColorCount = 256
 
-                else:
-                    # pixel is transparent if pixel value is 0
-                    pixelAbgrColor = (colorsBgr[pixelValue] | 0xFF000000) if pixelValue != 0 else 0x00000000
+        for lutIdx, teamColorId in enumerate(teamColorIds):
+            colorsAbgr = self.__GetRenderColorsAbgr(teamColorId)
+            colorCount = min(len(colorsAbgr), 256)
 
-                pixels[column, row] = pixelAbgrColor
-        
-        if len(unknownPixels) > 0:
+            # unknown pixel values get a debug color
+            luts[lutIdx] = np.uint32(0xFF00FF00) | np.arange(256, dtype = np.uint32)
+            luts[lutIdx, :colorCount] = colorsAbgr[:colorCount]
+
+            minColorCount = min(minColorCount, colorCount)
+
+        pixelArray = self.Image.GetPixelArray()
+        pixels = luts[:, pixelArray]
+
+        unknownPixels = np.bincount(pixelArray[pixelArray >= minColorCount], minlength = 256)
+
+        if unknownPixels.any():
             print("Unknown pixels:")
-            for pixelValue in unknownPixels.keys():
+            for pixelValue in np.nonzero(unknownPixels)[0].tolist():
                 print(f"pixel {pixelValue}: count {unknownPixels[pixelValue]}")
-            pass
 
         return pixels
 
-    def GetRenderColorsRgb(self, teamColorId : int | None = 0) -> list[int]:
+    def GetRenderColorsRgb(self, teamColorId : int | None = 0) -> list[int] | npt.NDArray[np.uint32]:
         """Returns the RGB palette used for rendering or exporting this frame.
 
         teamColorId=None returns the local MOBD palette.
+        The team palettes are read-only views into the KkndPalette arrays.
         """
 
         img = self.Image
@@ -649,14 +783,40 @@ class MobdFrame:
         """Returns the render palette as little endian RGB byte array.
         """
 
-        b = bytearray()
+        return bytearray(np.asarray(self.GetRenderColorsRgb(teamColorId), "<u4").tobytes())
 
-        for color in self.GetRenderColorsRgb(teamColorId):
-            b.extend(color.to_bytes(4, "little"))
+    def ExportPng(self, fileName : str, teamColorId : int | None = 0, compressionLevel : int = 6, filterStrategy : str = "none") -> None:
+        """ Exports the frame as 8 bit palette PNG, color index 0 is transparent.
+            Pixel values outside the render palette get the same debug color as in RenderFrameUInt32Abgr().
 
-        return b
+        Args:
+            fileName (str): The name of the PNG file.
+            teamColorId (int | None, optional): The team color, None for the local MOBD palette. Defaults to 0.
+            compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+            filterStrategy (str, optional): The PNG row filter or "adaptive". Defaults to "none".
+        """
+        colorsRgb = list(self.GetRenderColorsRgb(teamColorId))[:256]
+        colorsRgb.extend([0x00FF00 | (pixelValue << 16) for pixelValue in range(len(colorsRgb), 256)])
+
+        WritePngIndexed(fileName, self.Image.GetPixelArray(), colorsRgb,
+                        compressionLevel = compressionLevel, filterStrategy = filterStrategy)
+
+    def __GetRenderColorsAbgr(self, teamColorId : int | None = 0) -> npt.NDArray[np.uint32]:
+        """Returns the opaque ABGR palette used for rendering this frame, color 0 is transparent.
+        """
+
+        img = self.Image
 
-    def __GetRenderColorsBgr(self, teamColorId : int | None = 0) -> list[int]:
+        if teamColorId is None or not img.CanUseTeamPalette or img.FactionId is None:
+            return self.ColorPalette.ColorsAbgr
+
+        colorsAbgr = np.array(self.__GetRenderColorsBgr(teamColorId), np.uint32) | np.uint32(0xFF000000)
+        if len(colorsAbgr) > 0:
+            colorsAbgr[0] = 0x00000000
+
+        return colorsAbgr
+
+    def __GetRenderColorsBgr(self, teamColorId : int | None = 0) -> list[int] | npt.NDArray[np.uint32]:
         """Returns the palette used for rendering this frame.
         """
 
@@ -693,7 +853,8 @@ class MobdFrame:
         Returns:
             tuple[MobdImage, MobdPalette]: The image and the color palette.
         """
-        MobdFileStructure[position] = f"MobdFrame animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
+        if self.__context is not None:
+            self.__context.FileStructure[position] = f"MobdFrame animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
 
         frameType = GetStringReverse(data, position + 0, 4)
         if frameType != "SPRC" and frameType != "SPNS":
@@ -703,11 +864,19 @@ class MobdFrame:
         paletteOffset = GetUInt32LE(data, position + 8)
         imageOffset = GetUInt32LE(data, position + 12)
 
-        palette = MobdColorPalette(self.AnimationIndex, self.FrameIndex)
-        palette.ReadPalette(data, paletteOffset - fileOffset)
+        # many frames share the same palette, it is read only once per file
+        palettePosition = paletteOffset - fileOffset
+        palette = self.__paletteCache.get(palettePosition) if self.__paletteCache is not None else None
+
+        if palette is None:
+            palette = MobdColorPalette(self.AnimationIndex, self.FrameIndex)
+            palette.ReadPalette(data, palettePosition, self.__context)
+
+            if self.__paletteCache is not None:
+                self.__paletteCache[palettePosition] = palette
 
         image = MobdImage(self.AnimationIndex, self.FrameIndex, self.MobdFileIndex, self.MobdFileName, self.FactionId)
-        image.ReadImage(data, imageOffset - fileOffset, flags)
+        image.ReadImage(data, imageOffset - fileOffset, flags, self.__context)
         image.UpdateTeamPaletteInfo(palette)
 
         # MobdFrame.__CheckImage(image, palette)
@@ -733,7 +902,8 @@ class MobdFrame:
         Returns:
             list[ModbPoint]: The pointlist read from the raw data.
         """
-        MobdFileStructure[position] = f"Point list animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
+        if self.__context is not None:
+            self.__context.FileStructure[position] = f"Point list animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
 
         pointList : list[ModbPoint] = []
 
@@ -749,7 +919,8 @@ class MobdFrame:
         return pointList
     
     def __ReadBoxList(self, data : bytearray, position : int) -> None:
-        MobdFileStructure[position] = f"Box list animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
+        if self.__context is not None:
+            self.__context.FileStructure[position] = f"Box list animation {self.AnimationIndex:03} frame {self.FrameIndex:03}"
 
         # TODO: read the boxes ???
         pass
@@ -797,23 +968,27 @@ class MobdAnimation:
         height = 0
 
         for frame in self.FrameList:
-            width = max(width, frame.Image.Width)
-            height = max(height, frame.Image.Height)
+            width = max(width, frame.Width)
+            height = max(height, frame.Height)
 
         return width, height
     
-    def ReadAnimation(self, data : bytearray, position : int, fileOffset : int) -> tuple[int, int]:
+    def ReadAnimation(self, data : bytearray, position : int, fileOffset : int, paletteCache : dict[int, MobdColorPalette] | None = None,
+                      context : MobdParseContext | None = None) -> tuple[int, int]:
         """ Read one animation from the data file.
 
         Args:
             data (bytearray): The raw data of the MOBD file.
             position (int): The position(=offset) of the animation in the data file.
             fileOffset (int): The offset of the MOBD file in the file container.
+            paletteCache (dict[int, MobdColorPalette] | None, optional): The palettes of the MOBD file by position. Defaults to None.
+            context (MobdParseContext | None, optional): Records the file structure. Defaults to None.
 
         Returns:
             tuple[int, bool]: Position after this animation, True if animation is valid.
         """
-        MobdFileStructure[position] = f"MobdAnimation {self.AnimationNumber:03}"
+        if context is not None:
+            context.FileStructure[position] = f"MobdAnimation {self.AnimationNumber:03}"
 
         self.FrameList = []
 
@@ -840,7 +1015,7 @@ class MobdAnimation:
                 raise Exception(f"Invalid frame position: {framePosition} (0x{framePosition:08X}) corrected: {framePositionCorrected} (0x{framePositionCorrected:08X})")
             
             frame = MobdFrame(self.AnimationNumber, frameCount, self.MobdFileIndex, self.MobdFileName, self.FactionId)
-            frame.ReadFrame(data, framePositionCorrected, fileOffset)
+            frame.ReadFrame(data, framePositionCorrected, fileOffset, paletteCache, context)
             frameCount += 1
             offsetFirstFrame = min(offsetFirstFrame, framePositionCorrected)
 
@@ -867,6 +1042,9 @@ class MobdFile:
 
     AnimationList : list[MobdAnimation]
 
+    # the color palettes of the file by position, shared by the frames
+    ColorPalettes : dict[int, MobdColorPalette]
+
     # the MOBD file index in gamesprt.lpk
     MobdFileIndex : int | None
 
@@ -877,8 +1055,15 @@ class MobdFile:
     FactionId : int | None
     FactionName : str | None
 
-    def __init__(self, file : ContainerFile | None = None) -> None:
+    def __init__(self, file : ContainerFile | None = None, context : MobdParseContext | None = None) -> None:
+        """ Reads a MOBD file.
+
+        Args:
+            file (ContainerFile | None, optional): The MOBD file. Defaults to None.
+            context (MobdParseContext | None, optional): Records the file structure, e.g. for SaveMobdFileStructureInfo. Defaults to None.
+        """
         self.AnimationList = []
+        self.ColorPalettes = {}
         self.MobdFileIndex = None
         self.MobdFileName = ""
         self.FactionId = None
@@ -889,14 +1074,22 @@ class MobdFile:
             self.MobdFileName = file.FileName
             self.FactionId = GetFactionIdFromMobdFile(file)
             self.FactionName = GetFactionName(self.FactionId)
-            self.ReadAnimations(file.RawData, file.FileOffset)
+            self.ReadAnimations(file.RawData, file.FileOffset, context)
     
-    def ReadAnimations(self, data : bytearray, fileOffset : int) -> None:
+    def DecodeFrames(self) -> None:
+        """ Decodes the images and color palettes of all frames, normally they are decoded on first access.
+        """
+        for animation in self.AnimationList:
+            for frame in animation.FrameList:
+                frame.Decode()
+
+    def ReadAnimations(self, data : bytearray, fileOffset : int, context : MobdParseContext | None = None) -> None:
         """ Reads animations from a MOBD file.
 
         Args:
             data (bytearray): The raw data of the MOBD file.
             fileOffset (int): The offset of the MOBD file in the file container.
+            context (MobdParseContext | None, optional): Records the file structure. Defaults to None.
         """
 
         """
@@ -908,9 +1101,7 @@ class MobdFile:
         ...
         4 bytes     0x00000000          no further animations
         """
-        global MobdFileStructure
-        MobdFileStructure = {}
-        MobdColorPalette.MobdColorPalettes = {}
+        self.ColorPalettes = {}
 
         animationNumber = 0
         position = 0
@@ -927,7 +1118,7 @@ class MobdFile:
             animationOffset = position
 
             animation = MobdAnimation(animationNumber, self.MobdFileIndex, self.MobdFileName, self.FactionId)
-            position, animationOffsetFirstFrame = animation.ReadAnimation(data, position, fileOffset)
+            position, animationOffsetFirstFrame = animation.ReadAnimation(data, position, fileOffset, self.ColorPalettes, context)
 
             if len(animation.FrameList) > 0:
                 # print(f"Animation {animationNumber}")
@@ -951,7 +1142,63 @@ class MobdFile:
             if offset in animationOffsetDict:
                 animationOffsetDict[offset].IsRotationalAnimation = True
 
-        MobdFileStructure[len(data)] = f"MobdFile size"
+        if context is not None:
+            context.FileStructure[len(data)] = f"MobdFile size"
+
+class MobdFileCache:
+    """ Parses each MOBD file of a file list only once, e.g. when many exports need animations of the same files.
+        The frames are decoded on first access, so only the frames of the requested animations are decoded.
+    """
 
+    # the MOBD files of the sprite container
+    FileList : list[ContainerFile]
 
-        
+    # the parsed MOBD files by index in FileList
+    __mobdFiles : dict[int, MobdFile]
+
+    def __init__(self, fileList : list[ContainerFile]) -> None:
+        self.FileList = fileList
+        self.__mobdFiles = {}
+
+    def GetMobdFile(self, fileIdx : int) -> MobdFile:
+        """ Returns a parsed MOBD file, the file is parsed on first access.
+
+        Args:
+            fileIdx (int): The index of the file in FileList.
+
+        Returns:
+            MobdFile: The MOBD file.
+        """
+        mobdFile = self.__mobdFiles.get(fileIdx)
+        if mobdFile is None:
+            mobdFile = MobdFile(self.FileList[fileIdx])
+            self.__mobdFiles[fileIdx] = mobdFile
+
+        return mobdFile
+
+    def GetAnimation(self, fileIdx : int, animationIdx : int) -> MobdAnimation:
+        """ Returns one animation of a MOBD file.
+
+        Args:
+            fileIdx (int): The index of the file in FileList.
+            animationIdx (int): The index of the animation in the animation list of the file.
+
+        Returns:
+            MobdAnimation: The animation.
+        """
+        animationList = self.GetMobdFile(fileIdx).AnimationList
+        if not 0 <= animationIdx < len(animationList):
+            raise Exception(f"MOBD file {fileIdx} has no animation {animationIdx}")
+
+        return animationList[animationIdx]
+
+    def GetAnimations(self, animationKeys : list[tuple[int, int]]) -> list[MobdAnimation]:
+        """ Returns several animations, each MOBD file is parsed only once.
+
+        Args:
+            animationKeys (list[tuple[int, int]]): The (file index, animation index) pairs.
+
+        Returns:
+            list[MobdAnimation]: The animations in the order of the keys.
+        """
+        return [self.GetAnimation(fileIdx, animationIdx) for fileIdx, animationIdx in animationKeys]
@@ -0,0 +1,129 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from Kknd2Reader.KkndFileCompression import UncompressFile
+from Kknd2Reader.KkndFileContainer import ReadFileTypeList, ContainerFileType, ContainerFile
+from Kknd2Reader.KkndFileMapd import MapdFile, ReadMapdFiles, ReadMapdMapSize
+from Kknd2Reader.KkndFileCplc import CplcFile, ReadCplcFileFromContainer
+from Kknd2Reader.KkndCreatureLib import CreatureLibrary
+
+class MapPackage:
+    """ A KKND2 map file (*.lpm or *.lps). The file container is uncompressed and indexed only once,
+        the MAPD and CPLC files and all other files are read from the same buffer when they are needed.
+    """
+
+    # the name of the map file
+    FileName : str
+
+    # the container version and timestamp
+    Version : int
+    Timestamp : int
+
+    # the file types and files in the container
+    FileTypeList : list[ContainerFileType]
+
+    def __init__(self, fileName : str) -> None:
+        """ Uncompresses the map file and reads the table of contents.
+
+        Args:
+            fileName (str): The name of the map file.
+        """
+        self.FileName = fileName
+
+        data, self.Version, self.Timestamp = UncompressFile(fileName)
+        self.FileTypeList, _ = ReadFileTypeList(data)
+
+        self.__mapdFiles : list[MapdFile] | None = None
+
+        # the CPLC file read for the creature library, replaced when it is requested for another library
+        self.__cplcFile : tuple[CreatureLibrary | None, CplcFile] | None = None
+
+    def GetFileTypes(self) -> list[str]:
+        """ Returns the file types in the container, e.g. MAPD, CPLC.
+        """
+        return [fileType.FileType for fileType in self.FileTypeList]
+
+    def GetFiles(self, fileType : str) -> list[ContainerFile]:
+        """ Returns the files of a file type. The raw file data is copied from the container on first access.
+
+        Args:
+            fileType (str): The file type, e.g. MAPD.
+
+        Returns:
+            list[ContainerFile]: The files, empty if the container has no files of this type.
+        """
+        for containerFileType in self.FileTypeList:
+            if containerFileType.FileType == fileType:
+                return containerFileType.FileList
+
+        return []
+
+    @property
+    def MapdFiles(self) -> list[MapdFile]:
+        """ The MAPD files with the map layers, read on first access.
+        """
+        if self.__mapdFiles is None:
+            self.__mapdFiles = ReadMapdFiles(self.FileTypeList)
+
+        return self.__mapdFiles
+
+    def GetMap(self) -> MapdFile:
+        """ Returns the first MAPD file.
+        """
+        if len(self.MapdFiles) == 0:
+            raise Exception(f"No MAPD file found in file container {self.FileName}")
+
+        return self.MapdFiles[0]
+
+    def GetMapSize(self) -> tuple[int, int]:
+        """ Returns the map size from the first MAPD file without reading the map tiles.
+
+        Returns:
+            int: The map width in pixels.
+            int: The map height in pixels.
+        """
+        mapdFileList = self.GetFiles("MAPD")
+        if len(mapdFileList) == 0:
+            raise Exception(f"No MAPD file found in file container {self.FileName}")
+
+        return ReadMapdMapSize(mapdFileList[0].RawData, mapdFileList[0].FileOffset)
+
+    def GetCplcFile(self, creatureLibrary : CreatureLibrary | None) -> CplcFile:
+        """ Returns the CPLC file with the entities, read on first access.
+
+        Args:
+            creatureLibrary (CreatureLibrary | None): The creature library for the entity names and images.
+
+        Returns:
+            CplcFile: The CPLC file.
+        """
+        if self.__cplcFile is None or self.__cplcFile[0] is not creatureLibrary:
+            cplcFile = ReadCplcFileFromContainer(self.FileTypeList, creatureLibrary)
+            if cplcFile is None:
+                raise Exception(f"No CPLC file found in file container {self.FileName}")
+            
+            self.__cplcFile = (creatureLibrary, cplcFile)
+
+        return self.__cplcFile[1]
@@ -0,0 +1,117 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+from Kknd2Reader.KkndFileMapd import MapdFile, MapdLayer, MapdColorPalette
+from Kknd2Reader.PngFile import WritePngRgba
+
+def __RenderLayerBlocks(layer : MapdLayer, colorPalette : MapdColorPalette, samples : int) -> npt.NDArray[np.float32]:
+    """ Calculates the average color of samples x samples blocks of each tile and gathers them through the tile map.
+        Only the unique tiles of the layer are averaged, the full resolution layer is never built.
+
+    Args:
+        layer (MapdLayer): The layer.
+        colorPalette (MapdColorPalette): The map color palette.
+        samples (int): Number of blocks per tile row and column.
+
+    Returns:
+        npt.NDArray[np.float32]: RGB and coverage (0..1) in a 3D array [MapHeightInTiles * samples, MapWidthInTiles * samples, 4].
+    """
+    tileWidth = layer.TileWidthInPixels
+    tileHeight = layer.TileHeightInPixels
+    blockWidth = tileWidth // samples
+    blockHeight = tileHeight // samples
+
+    tileOffsetList = list(layer.TileList.keys())
+    tilePixels = np.stack([np.frombuffer(tile.Pixels, np.uint8, tileWidth * tileHeight) for tile in layer.TileList.values()])
+    tilePixels = tilePixels.reshape(-1, samples, blockHeight, samples, blockWidth)
+
+    # RGB of each pixel, pixel value 0 is transparent
+    colorsRgb = np.array(colorPalette.ColorsRGB, np.uint32)
+    colorsRgb = np.stack([(colorsRgb >> 16) & 0xFF, (colorsRgb >> 8) & 0xFF, colorsRgb & 0xFF], axis = 1).astype(np.float32)
+    opaque = (tilePixels != 0).astype(np.float32)
+
+    # sum over the pixels of each block -> [Tile, BlockRow, BlockColumn]
+    opaqueCount = opaque.sum(axis = (2, 4))
+    colorSum = (colorsRgb[tilePixels] * opaque[..., np.newaxis]).sum(axis = (2, 4))
+
+    blocks = np.zeros(opaqueCount.shape + (4,), np.float32)
+    blocks[..., 0:3] = colorSum / np.maximum(opaqueCount, 1)[..., np.newaxis]
+    blocks[..., 3] = opaqueCount / (blockWidth * blockHeight)
+
+    # gather [TileRow, TileColumn, BlockRow, BlockColumn, 4] -> [Rows, Columns, 4]
+    tileIndexByOffset = { tileOffset: idx for idx, tileOffset in enumerate(tileOffsetList) }
+    tileIndexMap = np.array([tileIndexByOffset[tileOffset] for tileOffset in layer.TileMap], np.intp)
+    tileIndexMap = tileIndexMap.reshape(layer.MapHeightInTiles, layer.MapWidthInTiles)
+
+    mapBlocks = blocks[tileIndexMap].transpose(0, 2, 1, 3, 4)
+    return mapBlocks.reshape(layer.MapHeightInTiles * samples, layer.MapWidthInTiles * samples, 4)
+
+def RenderMinimapRgba(map : MapdFile, samples : int = 1) -> npt.NDArray[np.uint8]:
+    """ Renders a minimap with one pixel per tile (samples = 1) or samples x samples pixels per tile.
+        The top layer is blended over the bottom layer.
+
+    Args:
+        map (MapdFile): The map.
+        samples (int, optional): Number of pixels per tile row and column, e.g. 1, 2 or 4. Defaults to 1.
+
+    Returns:
+        npt.NDArray[np.uint8]: The RGBA minimap in a 3D array [MapHeightInTiles * samples, MapWidthInTiles * samples, 4].
+    """
+    layerBottom = map.LayerList[0]
+
+    if samples < 1 or layerBottom.TileWidthInPixels % samples != 0 or layerBottom.TileHeightInPixels % samples != 0:
+        raise Exception(f"Invalid number of minimap samples: {samples}")
+
+    result : npt.NDArray[np.float32] | None = None
+
+    for layer in map.LayerList:
+        blocks = __RenderLayerBlocks(layer, map.ColorPalette, samples)
+
+        if result is None:
+            result = blocks
+            continue
+
+        # alpha blend the upper layer over the result
+        alpha = blocks[..., 3:4]
+        result[..., 0:3] = blocks[..., 0:3] * alpha + result[..., 0:3] * (1.0 - alpha)
+        result[..., 3:4] = alpha + result[..., 3:4] * (1.0 - alpha)
+
+    assert result is not None
+
+    result[..., 3] *= 255.0
+    return np.clip(np.rint(result), 0, 255).astype(np.uint8)
+
+def ExportMinimapPng(map : MapdFile, fileName : str, samples : int = 1) -> None:
+    """ Exports the minimap as PNG file.
+
+    Args:
+        map (MapdFile): The map.
+        fileName (str): The name of the PNG file.
+        samples (int, optional): Number of pixels per tile row and column, e.g. 1, 2 or 4. Defaults to 1.
+    """
+    WritePngRgba(fileName, RenderMinimapRgba(map, samples), compressionLevel = 9)
@@ -1,38 +1,29 @@
 from pathlib import Path
+import numpy as np
+from Kknd2Reader.KkndColors import ConvertRgb555, SwapRedAndBlue, RGB555_TO_RGB_ROUNDED
 
 def rgb555_to_rgb24(value: int) -> int:
-    r5 = (value >> 10) & 0x1F
-    g5 = (value >> 5) & 0x1F
-    b5 = value & 0x1F
-
-    r8 = round(r5 * 255.0 / 31.0)
-    g8 = round(g5 * 255.0 / 31.0)
-    b8 = round(b5 * 255.0 / 31.0)
-
-    return (r8 << 16) | (g8 << 8) | b8
+    return int(ConvertRgb555(value, RGB555_TO_RGB_ROUNDED))
 
 def rgb24_to_bgr24(value: int) -> int:
     return ((value & 0xFF) << 16) | (value & 0xFF00) | ((value & 0xFF0000) >> 16)
 
-def rgb_distance_squared(left: int, right: int) -> int:
-    lr = (left >> 16) & 0xFF
-    lg = (left >>  8) & 0xFF
-    lb = (left >>  0) & 0xFF
-
-    rr = (right >> 16) & 0xFF
-    rg = (right >>  8) & 0xFF
-    rb = (right >>  0) & 0xFF
-
-    return (lr - rr) ** 2 + (lg - rg) ** 2 + (lb - rb) ** 2
+def read_palette_file(path: str, block_count: int, block_size: int) -> np.ndarray:
+    """
+    Reads a whole team palette file at once:
+        3 factions * block_count blocks * block_size RGB555 colors
 
+    Returns the RGB24 colors as read-only array [faction, block, color].
+    """
+    color_count = 3 * block_count * block_size
 
-def read_rgb555_words(path: str) -> list[int]:
-    data = Path(path).read_bytes()
-    return [
-        int.from_bytes(data[i:i + 2], "little")
-        for i in range(0, len(data), 2)
-    ]
+    words = np.fromfile(path, dtype="<u2")
+    if len(words) < color_count:
+        raise ValueError(f"invalid {Path(path).name} size")
 
+    colors = ConvertRgb555(words[:color_count], RGB555_TO_RGB_ROUNDED).reshape(3, block_count, block_size)
+    colors.setflags(write=False)
+    return colors
 
 def read_spriteb_palette(levels_dir: str, faction_id: int, team_color_id: int) -> list[int]:
     """
@@ -44,16 +35,7 @@ def read_spriteb_palette(levels_dir: str, faction_id: int, team_color_id: int) -
     if not 0 <= team_color_id < 8:
         raise ValueError("team_color_id must be 0..7")
 
-    words = read_rgb555_words(f"{levels_dir}/spriteb.pal")
-
-    block_index = faction_id * 8 + team_color_id
-    start = block_index * 256
-    block = words[start:start + 256]
-
-    if len(block) != 256:
-        raise ValueError("invalid spriteb.pal size")
-
-    return [rgb555_to_rgb24(color) for color in block]
+    return read_palette_file(f"{levels_dir}/spriteb.pal", 8, 256)[faction_id, team_color_id].tolist()
 
 
 def read_spritet_palette(levels_dir: str, faction_id: int, team_color_id: int) -> list[int]:
@@ -61,16 +43,7 @@ def read_spritet_palette(levels_dir: str, faction_id: int, team_color_id: int) -
     spritet.pal:
         3 factions * 8 team colors * 64 RGB555 colors
     """
-    words = read_rgb555_words(f"{levels_dir}/spritet.pal")
-
-    block_index = faction_id * 8 + team_color_id
-    start = block_index * 64
-    block = words[start:start + 64]
-
-    if len(block) != 64:
-        raise ValueError("invalid spritet.pal size")
-
-    return [rgb555_to_rgb24(color) for color in block]
+    return read_palette_file(f"{levels_dir}/spritet.pal", 8, 64)[faction_id, team_color_id].tolist()
 
 def read_blit_palette(levels_dir: str, faction_id: int, team_color_id: int, variant_id: int = 0) -> list[int]:
     """
@@ -88,28 +61,29 @@ def read_blit_palette(levels_dir: str, faction_id: int, team_color_id: int, vari
     if not 0 <= variant_id < 2:
         raise ValueError("variant_id must be 0..1")
 
-    words = read_rgb555_words(f"{levels_dir}/blit.pal")
+    return read_palette_file(f"{levels_dir}/blit.pal", 16, 16)[faction_id, variant_id * 8 + team_color_id].tolist()
 
-    block_index = faction_id * 16 + team_color_id + variant_id * 8
-    start = block_index * 16
-    block = words[start:start + 16]
-
-    if len(block) != 16:
-        raise ValueError("invalid blit.pal size")
+class KkndPalette:
+    """
+    The team palettes of one faction as read-only views into the palette
+    files, the BGR colors are converted once when the palettes are loaded.
 
-    return [rgb555_to_rgb24(color) for color in block]
+        spriteb_palettes:   [team color, 256 colors]
+        spritet_palettes:   [team color, 64 colors]
+        blit_palettes:      [variant, team color, 16 colors]
+    """
+    def __init__(self, spriteb_palettes: np.ndarray, spritet_palettes: np.ndarray, blit_palettes: np.ndarray):
 
-class KkndPalette:
-    def __init__(self, levels_dir: str, faction_id: int):
-        
-        self.spriteb_palettes = [read_spriteb_palette(levels_dir, faction_id, team_color_id) for team_color_id in range(8)]
+        self.spriteb_palettes = spriteb_palettes
+        self.spritet_palettes = spritet_palettes
+        self.blit_palettes = blit_palettes
 
-        self.spritet_palettes = [read_spritet_palette(levels_dir, faction_id, team_color_id) for team_color_id in range(8)]
+        self.spriteb_palettes_bgr = SwapRedAndBlue(spriteb_palettes)
+        self.spritet_palettes_bgr = SwapRedAndBlue(spritet_palettes)
+        self.blit_palettes_bgr = SwapRedAndBlue(blit_palettes)
 
-        self.blit_palettes = [
-            [read_blit_palette(levels_dir, faction_id, team_color_id, variant_id) for team_color_id in range(8)]
-            for variant_id in range(2)
-        ]
+        for palettes in (self.spriteb_palettes_bgr, self.spritet_palettes_bgr, self.blit_palettes_bgr):
+            palettes.setflags(write=False)
 
 
 
@@ -120,14 +94,18 @@ palette_series9 : KkndPalette | None = None
 def load_palettes(levels_dir: str):
     global palette_survivers, palette_mutants, palette_series9
 
-    palette_survivers = KkndPalette(levels_dir, 0)
-    palette_mutants = KkndPalette(levels_dir, 1)
-    palette_series9 = KkndPalette(levels_dir, 2)
+    # each file is read once for all factions
+    spriteb = read_palette_file(f"{levels_dir}/spriteb.pal", 8, 256)
+    spritet = read_palette_file(f"{levels_dir}/spritet.pal", 8, 64)
+    blit = read_palette_file(f"{levels_dir}/blit.pal", 16, 16).reshape(3, 2, 8, 16)
 
-def get_team_palette_rgb(faction_id: int, team_color_id: int, palette_name: str | None) -> list[int]:
-    if not 0 <= team_color_id < 8:
-        raise ValueError("team_color_id must be 0..7")
+    palette_survivers = KkndPalette(spriteb[0], spritet[0], blit[0])
+    palette_mutants = KkndPalette(spriteb[1], spritet[1], blit[1])
+    palette_series9 = KkndPalette(spriteb[2], spritet[2], blit[2])
 
+    remapped_palettes.clear()
+
+def get_faction_palettes(faction_id: int) -> KkndPalette:
     faction_palettes = {
         0: palette_survivers,
         1: palette_mutants,
@@ -140,7 +118,15 @@ def get_team_palette_rgb(faction_id: int, team_color_id: int, palette_name: str
     palettes = faction_palettes[faction_id]
     if palettes is None:
         raise RuntimeError("team palettes are not loaded; call KkndPalette.load_palettes(levels_dir) first")
-    
+
+    return palettes
+
+def get_team_palette_rgb(faction_id: int, team_color_id: int, palette_name: str | None) -> np.ndarray:
+    if not 0 <= team_color_id < 8:
+        raise ValueError("team_color_id must be 0..7")
+
+    palettes = get_faction_palettes(faction_id)
+
     if palette_name == "spritet.pal":
         return palettes.spritet_palettes[team_color_id]
 
@@ -149,66 +135,89 @@ def get_team_palette_rgb(faction_id: int, team_color_id: int, palette_name: str
     
     return palettes.spriteb_palettes[team_color_id]
 
-def get_team_palette_bgr(faction_id: int, team_color_id: int, palette_name: str | None) -> list[int]:
-    return [rgb24_to_bgr24(color) for color in get_team_palette_rgb(faction_id, team_color_id, palette_name)]
+def get_team_palette_bgr(faction_id: int, team_color_id: int, palette_name: str | None) -> np.ndarray:
+    if not 0 <= team_color_id < 8:
+        raise ValueError("team_color_id must be 0..7")
+
+    palettes = get_faction_palettes(faction_id)
+
+    if palette_name == "spritet.pal":
+        return palettes.spritet_palettes_bgr[team_color_id]
+
+    if palette_name == "blit.pal":
+        return palettes.blit_palettes_bgr[0][team_color_id]
+
+    return palettes.spriteb_palettes_bgr[team_color_id]
 
-def get_blit_palette_rgb(faction_id: int, team_color_id: int, variant_id: int = 0) -> list[int]:
+def get_blit_palette_rgb(faction_id: int, team_color_id: int, variant_id: int = 0) -> np.ndarray:
     if not 0 <= team_color_id < 8:
         raise ValueError("team_color_id must be 0..7")
     if not 0 <= variant_id < 2:
         raise ValueError("variant_id must be 0..1")
 
-    faction_palettes = {
-        0: palette_survivers,
-        1: palette_mutants,
-        2: palette_series9,
-    }
+    return get_faction_palettes(faction_id).blit_palettes[variant_id][team_color_id]
 
-    if faction_id not in faction_palettes:
-        raise ValueError("faction_id must be 0..2")
+def get_blit_palette_bgr(faction_id: int, team_color_id: int, variant_id: int = 0) -> np.ndarray:
+    if not 0 <= team_color_id < 8:
+        raise ValueError("team_color_id must be 0..7")
+    if not 0 <= variant_id < 2:
+        raise ValueError("variant_id must be 0..1")
 
-    palettes = faction_palettes[faction_id]
-    if palettes is None:
-        raise RuntimeError("team palettes are not loaded; call KkndPalette.load_palettes(levels_dir) first")
+    return get_faction_palettes(faction_id).blit_palettes_bgr[variant_id][team_color_id]
+
+# the largest squared RGB distance of a local color to a team color that is still remapped
+max_remap_distance_squared = 2500
 
-    return palettes.blit_palettes[variant_id][team_color_id]
+# the remapped palettes by (local palette, faction, team color)
+remapped_palettes : dict[tuple[tuple[int, ...], int, int], list[int]] = {}
 
-def get_blit_palette_bgr(faction_id: int, team_color_id: int, variant_id: int = 0) -> list[int]:
-    return [rgb24_to_bgr24(color) for color in get_blit_palette_rgb(faction_id, team_color_id, variant_id)]
+def rgb_to_channels(colors_rgb: list[int]) -> np.ndarray:
+    """
+    Splits RGB24 colors into an (N, 3) array of the red, green and blue channels.
+    """
+    colors = np.asarray(colors_rgb, dtype=np.int64).reshape(-1)
+    return np.stack(((colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF), axis=1)
 
 def remap_team_colors_rgb(local_palette_rgb: list[int], faction_id: int, team_color_id: int) -> list[int]:
+    """
+    Replaces the local colors that are close to a team color of team 0 by the
+    same color of the requested team. The distances of all local colors to all
+    team colors are computed at once, the results are memoized per palette.
+    """
     if team_color_id == 0:
         return local_palette_rgb.copy()
 
-    remapped_palette = local_palette_rgb.copy()
-    source_palettes = [
-        get_team_palette_rgb(faction_id, 0, "spritet.pal"),
-    ]
-    target_palettes = [
-        get_team_palette_rgb(faction_id, team_color_id, "spritet.pal"),
-    ]
+    key = (tuple(local_palette_rgb), faction_id, team_color_id)
+    remapped_palette = remapped_palettes.get(key)
 
-    max_distance_squared = 2500
+    if remapped_palette is None:
+        source_palette = np.asarray(get_team_palette_rgb(faction_id, 0, "spritet.pal"), dtype=np.int64)
+        target_palette = np.asarray(get_team_palette_rgb(faction_id, team_color_id, "spritet.pal"), dtype=np.int64)
 
-    for local_color_index, local_color in enumerate(local_palette_rgb):
-        best_distance = max_distance_squared + 1
-        best_target_color : int | None = None
+        color_count = min(len(source_palette), len(target_palette))
+        source_palette = source_palette[:color_count]
+        target_palette = target_palette[:color_count]
 
-        for palette_index in range(len(source_palettes)):
-            source_palette = source_palettes[palette_index]
-            target_palette = target_palettes[palette_index]
+        # colors that are the same in both teams are not team colors
+        is_team_color = source_palette != target_palette
 
-            for color_index in range(min(len(source_palette), len(target_palette))):
-                if source_palette[color_index] == target_palette[color_index]:
-                    continue
+        remapped = np.asarray(local_palette_rgb, dtype=np.int64).copy()
 
-                distance = rgb_distance_squared(local_color, source_palette[color_index])
-                if distance < best_distance:
-                    best_distance = distance
-                    best_target_color = target_palette[color_index]
+        if len(remapped) > 0 and is_team_color.any():
+            source_palette = source_palette[is_team_color]
+            target_palette = target_palette[is_team_color]
 
-        if best_target_color is not None:
-            remapped_palette[local_color_index] = best_target_color
+            # squared distances [local color, team color], argmin keeps the first of equal distances
+            difference = rgb_to_channels(remapped)[:, np.newaxis, :] - rgb_to_channels(source_palette)[np.newaxis, :, :]
+            distances = (difference * difference).sum(axis=2)
 
-    return remapped_palette
-    
+            best_index = distances.argmin(axis=1)
+            best_distance = distances[np.arange(len(remapped)), best_index]
+
+            is_close = best_distance <= max_remap_distance_squared
+            remapped[is_close] = target_palette[best_index[is_close]]
+
+        remapped_palette = remapped.tolist()
+        remapped_palettes[key] = remapped_palette
+
+    return remapped_palette.copy()
@@ -0,0 +1,225 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from Kknd2Reader.KkndFileContainer import ContainerFile
+from Kknd2Reader.KkndFileMobd import MobdFile
+from Kknd2Reader.PngFile import WritePngRgba
+from Kknd2Reader import KkndPalette
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import time
+import numpy as np
+
+# the image formats: RGBA PNG or 8 bit palette PNG
+IMAGE_FORMAT_PNG = "png"
+IMAGE_FORMAT_PNG8 = "png8"
+IMAGE_FORMATS = (IMAGE_FORMAT_PNG, IMAGE_FORMAT_PNG8)
+
+# the file with the already exported MOBD files in the output directory
+MANIFEST_FILE_NAME = "manifest.json"
+
+def GetTeamColorName(teamColorId : int | None) -> str:
+    """ Returns the team color name used in the image file names.
+    """
+    return "local" if teamColorId is None else f"team{teamColorId}"
+
+def InitExportWorker(palettesDir : str | None) -> None:
+    """ Loads the team palettes in a worker process.
+
+    Args:
+        palettesDir (str | None): The directory with the team palettes, None if only the local MOBD palettes are used.
+    """
+    if palettesDir is not None:
+        KkndPalette.load_palettes(palettesDir)
+
+def ExportMobdFileImages(file : ContainerFile, outDir : str, teamColorIds : list[int | None],
+                         imageFormat : str = IMAGE_FORMAT_PNG) -> tuple[list[str], int, int]:
+    """ Exports all frames of a MOBD file in all team colors. This runs in the worker processes.
+
+    Args:
+        file (ContainerFile): The MOBD file.
+        outDir (str): The output directory, the images are written to a sub directory per MOBD file.
+        teamColorIds (list[int | None]): The team colors, None for the local MOBD palette.
+        imageFormat (str, optional): IMAGE_FORMAT_PNG or IMAGE_FORMAT_PNG8. Defaults to IMAGE_FORMAT_PNG.
+
+    Returns:
+        list[str]: The image files relative to the output directory.
+        int: The number of frames.
+        int: The number of written bytes.
+    """
+    mobdFile = MobdFile(file)
+
+    fileDir = f"{file.Index:03}_{file.FileName}"
+    os.makedirs(os.path.join(outDir, fileDir), exist_ok = True)
+
+    imageFileList : list[str] = []
+    frameCount = 0
+    byteCount = 0
+
+    for animationIdx, animation in enumerate(mobdFile.AnimationList):
+        for frameIdx, frame in enumerate(animation.FrameList):
+            fileNames = [os.path.join(fileDir, f"{animationIdx:03}_{frameIdx:03}_{GetTeamColorName(teamColorId)}.png") for teamColorId in teamColorIds]
+
+            if imageFormat == IMAGE_FORMAT_PNG8:
+                for fileName, teamColorId in zip(fileNames, teamColorIds):
+                    frame.ExportPng(os.path.join(outDir, fileName), teamColorId)
+            else:
+                # all team colors are rendered in one pass, little endian ABGR values are RGBA bytes
+                images = frame.RenderTeamColorsUInt32Abgr(teamColorIds).astype("<u4")
+                for fileName, image in zip(fileNames, images):
+                    WritePngRgba(os.path.join(outDir, fileName), image.view(np.uint8).reshape(frame.Height, frame.Width, 4))
+
+            for fileName in fileNames:
+                byteCount += os.path.getsize(os.path.join(outDir, fileName))
+
+            imageFileList.extend(fileNames)
+            frameCount += 1
+
+    return imageFileList, frameCount, byteCount
+
+class SpriteExportManifest:
+    """ The MOBD files that are already exported, so an interrupted export can be resumed.
+    """
+
+    # the manifest file
+    FileName : str
+
+    # the export settings, the manifest is valid only for the same settings
+    ImageFormat : str
+    TeamColorIds : list[int | None]
+
+    # the exported MOBD files by file index: name, frames, bytes and image files
+    Files : dict[str, dict]
+
+    def __init__(self, outDir : str, imageFormat : str, teamColorIds : list[int | None], resume : bool = True) -> None:
+        """ Reads the manifest of the output directory if it was written with the same settings.
+
+        Args:
+            outDir (str): The output directory.
+            imageFormat (str): The image format.
+            teamColorIds (list[int | None]): The team colors.
+            resume (bool, optional): False ignores an existing manifest. Defaults to True.
+        """
+        self.FileName = os.path.join(outDir, MANIFEST_FILE_NAME)
+        self.ImageFormat = imageFormat
+        self.TeamColorIds = list(teamColorIds)
+        self.Files = {}
+
+        if not resume or not os.path.isfile(self.FileName):
+            return
+
+        with open(self.FileName, "r", encoding = "utf-8") as file:
+            manifest = json.load(file)
+
+        if manifest.get("Format") == imageFormat and manifest.get("TeamColors") == self.TeamColorIds:
+            self.Files = manifest.get("Files", {})
+
+    def IsExported(self, file : ContainerFile, outDir : str) -> bool:
+        """ Returns True if the MOBD file is in the manifest and all its images exist.
+        """
+        entry = self.Files.get(str(file.Index))
+        if entry is None:
+            return False
+
+        return all(os.path.isfile(os.path.join(outDir, fileName)) for fileName in entry["Images"])
+
+    def Add(self, file : ContainerFile, imageFileList : list[str], frameCount : int, byteCount : int) -> None:
+        """ Adds an exported MOBD file.
+        """
+        self.Files[str(file.Index)] = {
+            "Name": file.FileName,
+            "Frames": frameCount,
+            "Bytes": byteCount,
+            "Images": imageFileList
+        }
+
+    def Save(self) -> None:
+        """ Writes the manifest, the old manifest is replaced only by a complete file.
+        """
+        tempFileName = self.FileName + ".tmp"
+
+        with open(tempFileName, "w", encoding = "utf-8") as file:
+            json.dump({ "Format": self.ImageFormat, "TeamColors": self.TeamColorIds, "Files": self.Files }, file, indent = 1)
+
+        os.replace(tempFileName, self.FileName)
+
+def ExportSprites(mobdFileList : list[ContainerFile], outDir : str, teamColorIds : list[int | None],
+                  imageFormat : str = IMAGE_FORMAT_PNG, palettesDir : str | None = None,
+                  maxWorkers : int | None = None, resume : bool = True) -> None:
+    """ Exports the frames of all MOBD files in parallel worker processes. The finished MOBD files are recorded
+        in a manifest, an interrupted export continues with the missing files.
+
+    Args:
+        mobdFileList (list[ContainerFile]): The MOBD files.
+        outDir (str): The output directory.
+        teamColorIds (list[int | None]): The team colors, None for the local MOBD palette.
+        imageFormat (str, optional): IMAGE_FORMAT_PNG or IMAGE_FORMAT_PNG8. Defaults to IMAGE_FORMAT_PNG.
+        palettesDir (str | None, optional): The directory with the team palettes. Defaults to None.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to None for the number of CPUs.
+        resume (bool, optional): False exports all files again. Defaults to True.
+    """
+    if imageFormat not in IMAGE_FORMATS:
+        raise Exception(f"Unknown image format {imageFormat}")
+
+    if any(teamColorId is not None for teamColorId in teamColorIds) and palettesDir is None:
+        raise Exception("The team colors need the team palettes directory")
+
+    startTime = time.perf_counter()
+    os.makedirs(outDir, exist_ok = True)
+
+    manifest = SpriteExportManifest(outDir, imageFormat, teamColorIds, resume)
+    pendingFileList = [file for file in mobdFileList if not manifest.IsExported(file, outDir)]
+    skippedCount = len(mobdFileList) - len(pendingFileList)
+
+    if skippedCount > 0:
+        print(f"{skippedCount} files already exported")
+
+    frameCount = 0
+    imageCount = 0
+    byteCount = 0
+
+    if len(pendingFileList) > 0:
+        with ProcessPoolExecutor(max_workers = maxWorkers, initializer = InitExportWorker, initargs = (palettesDir,)) as executor:
+            # the workers get only the raw data of their file and not the whole container
+            futures = { executor.submit(ExportMobdFileImages, file.CreateStandaloneCopy(), outDir, teamColorIds, imageFormat): file
+                        for file in pendingFileList }
+
+            for future in as_completed(futures):
+                file = futures[future]
+                imageFileList, fileFrameCount, fileByteCount = future.result()
+
+                manifest.Add(file, imageFileList, fileFrameCount, fileByteCount)
+                manifest.Save()
+
+                frameCount += fileFrameCount
+                imageCount += len(imageFileList)
+                byteCount += fileByteCount
+                print(f"{file.Index:03} {file.FileName}: {fileFrameCount} frames")
+
+    seconds = time.perf_counter() - startTime
+    print(f"{len(pendingFileList)} files, {frameCount} frames, {imageCount} images, {byteCount / 1e6:.1f} MB in {seconds:.1f} s"
+          f" ({imageCount / max(seconds, 1e-6):.0f} images/s, {byteCount / 1e6 / max(seconds, 1e-6):.1f} MB/s)")
@@ -0,0 +1,339 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import struct
+import zlib
+import numpy as np
+import numpy.typing as npt
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+PNG_COLOR_TYPE_RGB = 2
+PNG_COLOR_TYPE_PALETTE = 3
+PNG_COLOR_TYPE_RGBA = 6
+
+def __ReadChunks(data : bytes) -> list[tuple[bytes, bytes]]:
+    """ Splits the PNG data into chunks.
+
+    Args:
+        data (bytes): The PNG file data.
+
+    Returns:
+        list[tuple[bytes, bytes]]: List of chunk type and chunk data.
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise Exception("Not a PNG file: missing signature")
+
+    chunkList : list[tuple[bytes, bytes]] = []
+    pos = 8
+
+    while pos + 8 <= len(data):
+        chunkLength, chunkType = struct.unpack(">I4s", data[pos : pos + 8])
+        chunkList.append((chunkType, data[pos + 8 : pos + 8 + chunkLength]))
+        pos += chunkLength + 12
+
+        if chunkType == b"IEND":
+            break
+
+    return chunkList
+
+def __Paeth(a : int, b : int, c : int) -> int:
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+
+    if pa <= pb and pa <= pc:
+        return a
+
+    if pb <= pc:
+        return b
+
+    return c
+
+def __UnfilterRows(rawData : bytes, height : int, rowLength : int, bytesPerPixel : int) -> npt.NDArray[np.uint8]:
+    """ Reverses the PNG row filters.
+
+    Args:
+        rawData (bytes): The inflated IDAT data.
+        height (int): The image height in pixels.
+        rowLength (int): The length of one row in bytes without the filter type byte.
+        bytesPerPixel (int): Number of bytes per pixel.
+
+    Returns:
+        npt.NDArray[np.uint8]: The unfiltered rows [Height, RowLength].
+    """
+    filtered = np.frombuffer(rawData, np.uint8, height * (rowLength + 1)).reshape(height, rowLength + 1)
+    rows = np.zeros((height, rowLength), np.uint8)
+    prevRow = np.zeros(rowLength, np.uint8)
+
+    for rowIdx in range(height):
+        filterType = int(filtered[rowIdx, 0])
+        row = filtered[rowIdx, 1:]
+
+        if filterType == 0:
+            rows[rowIdx] = row
+
+        elif filterType == 1:
+            # sub: running sum of the same channel to the left
+            sums = np.cumsum(row.reshape(-1, bytesPerPixel).astype(np.uint32), axis = 0)
+            rows[rowIdx] = (sums & 0xFF).astype(np.uint8).reshape(-1)
+
+        elif filterType == 2:
+            rows[rowIdx] = row + prevRow
+
+        elif filterType in (3, 4):
+            # average and paeth depend on the already decoded left pixel
+            current = bytearray(row.tobytes())
+            up = prevRow.tobytes()
+
+            for idx in range(rowLength):
+                left = current[idx - bytesPerPixel] if idx >= bytesPerPixel else 0
+
+                if filterType == 3:
+                    current[idx] = (current[idx] + ((left + up[idx]) >> 1)) & 0xFF
+                else:
+                    upLeft = up[idx - bytesPerPixel] if idx >= bytesPerPixel else 0
+                    current[idx] = (current[idx] + __Paeth(left, up[idx], upLeft)) & 0xFF
+
+            rows[rowIdx] = np.frombuffer(current, np.uint8)
+
+        else:
+            raise Exception(f"Unsupported PNG filter type: {filterType}")
+
+        prevRow = rows[rowIdx]
+
+    return rows
+
+def ReadPngRgba(fileName : str) -> npt.NDArray[np.uint8]:
+    """ Reads a PNG file without any GUI toolkit.
+        Supported are non interlaced 8 bit RGB, RGBA and palette images.
+
+    Args:
+        fileName (str): The name of the PNG file.
+
+    Returns:
+        npt.NDArray[np.uint8]: The RGBA pixels in a 3D array [Height, Width, 4].
+    """
+    with open(fileName, "rb") as file:
+        data = file.read()
+
+    chunkList = __ReadChunks(data)
+
+    if len(chunkList) == 0 or chunkList[0][0] != b"IHDR":
+        raise Exception(f"Invalid PNG file {fileName}: missing IHDR")
+
+    width, height, bitDepth, colorType, _, _, interlace = struct.unpack(">IIBBBBB", chunkList[0][1])
+
+    if bitDepth != 8 or interlace != 0:
+        raise Exception(f"Unsupported PNG file {fileName}: bit depth {bitDepth} interlace {interlace}")
+
+    channelsByColorType = { PNG_COLOR_TYPE_RGB: 3, PNG_COLOR_TYPE_PALETTE: 1, PNG_COLOR_TYPE_RGBA: 4 }
+    if colorType not in channelsByColorType:
+        raise Exception(f"Unsupported PNG color type: {colorType}")
+
+    channels = channelsByColorType[colorType]
+
+    idat = b"".join([chunkData for chunkType, chunkData in chunkList if chunkType == b"IDAT"])
+    rows = __UnfilterRows(zlib.decompress(idat), height, width * channels, channels)
+    pixels = rows.reshape(height, width, channels)
+
+    if colorType == PNG_COLOR_TYPE_RGBA:
+        return pixels
+
+    rgba = np.full((height, width, 4), 0xFF, np.uint8)
+
+    if colorType == PNG_COLOR_TYPE_RGB:
+        rgba[:, :, 0:3] = pixels
+        return rgba
+
+    # palette image
+    paletteRgba = np.full((256, 4), 0xFF, np.uint8)
+
+    for chunkType, chunkData in chunkList:
+        if chunkType == b"PLTE":
+            plte = np.frombuffer(chunkData, np.uint8).reshape(-1, 3)
+            paletteRgba[: len(plte), 0:3] = plte
+        elif chunkType == b"tRNS":
+            paletteRgba[: len(chunkData), 3] = np.frombuffer(chunkData, np.uint8)
+
+    return paletteRgba[pixels[:, :, 0]]
+
+def __CreateChunk(chunkType : bytes, chunkData : bytes) -> bytes:
+    """ Creates a PNG chunk with length and CRC.
+    """
+    crc = zlib.crc32(chunkType + chunkData) & 0xFFFFFFFF
+    return struct.pack(">I", len(chunkData)) + chunkType + chunkData + struct.pack(">I", crc)
+
+# the PNG row filters, "adaptive" selects the best filter for each row
+PNG_FILTERS : dict[str, int] = { "none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4 }
+PNG_FILTER_ADAPTIVE = "adaptive"
+
+def __FilterRows(rows : npt.NDArray[np.uint8], bytesPerPixel : int, filterStrategy : str) -> npt.NDArray[np.uint8]:
+    """ Applies the PNG row filter to all rows at once.
+
+    Args:
+        rows (npt.NDArray[np.uint8]): The raw pixel rows [Height, RowLength].
+        bytesPerPixel (int): Number of bytes per pixel.
+        filterStrategy (str): One of the PNG_FILTERS names or "adaptive".
+
+    Returns:
+        npt.NDArray[np.uint8]: The filtered rows with the leading filter type byte [Height, RowLength + 1].
+    """
+    if filterStrategy != PNG_FILTER_ADAPTIVE and filterStrategy not in PNG_FILTERS:
+        raise Exception(f"Unknown PNG filter strategy: {filterStrategy}")
+
+    height, rowLength = rows.shape
+    current = rows.astype(np.int16)
+
+    left = np.zeros_like(current)
+    left[:, bytesPerPixel:] = current[:, :-bytesPerPixel]
+
+    up = np.zeros_like(current)
+    up[1:] = current[:-1]
+
+    upLeft = np.zeros_like(current)
+    upLeft[:, bytesPerPixel:] = up[:, :-bytesPerPixel]
+
+    def Paeth() -> npt.NDArray[np.int16]:
+        p = left + up - upLeft
+        pa = np.abs(p - left)
+        pb = np.abs(p - up)
+        pc = np.abs(p - upLeft)
+        return np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upLeft))
+
+    predictors = {
+        "none": lambda: 0,
+        "sub": lambda: left,
+        "up": lambda: up,
+        "average": lambda: (left + up) >> 1,
+        "paeth": Paeth
+    }
+
+    filterNames = list(PNG_FILTERS.keys()) if filterStrategy == PNG_FILTER_ADAPTIVE else [filterStrategy]
+    candidates = np.stack([((current - predictors[name]()) & 0xFF).astype(np.uint8) for name in filterNames])
+
+    if len(filterNames) == 1:
+        bestFilterIdx = np.zeros(height, np.intp)
+    else:
+        # usual heuristic: minimum sum of absolute values as signed bytes
+        costs = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis = 2)
+        bestFilterIdx = np.argmin(costs, axis = 0)
+
+    filtered = np.empty((height, rowLength + 1), np.uint8)
+    filtered[:, 0] = np.array([PNG_FILTERS[name] for name in filterNames], np.uint8)[bestFilterIdx]
+    filtered[:, 1:] = candidates[bestFilterIdx, np.arange(height)]
+
+    return filtered
+
+def __WritePng(fileName : str, width : int, height : int, colorType : int, rows : npt.NDArray[np.uint8], bytesPerPixel : int,
+               extraChunks : list[tuple[bytes, bytes]], compressionLevel : int, filterStrategy : str, zlibStrategy : int) -> None:
+    """ Writes the PNG file.
+
+    Args:
+        fileName (str): The name of the PNG file.
+        width (int): The image width in pixels.
+        height (int): The image height in pixels.
+        colorType (int): The PNG color type.
+        rows (npt.NDArray[np.uint8]): The raw pixel rows [Height, RowLength].
+        bytesPerPixel (int): Number of bytes per pixel.
+        extraChunks (list[tuple[bytes, bytes]]): Chunks written between IHDR and IDAT.
+        compressionLevel (int): The zlib compression level 0..9.
+        filterStrategy (str): The PNG row filter.
+        zlibStrategy (int): The zlib compression strategy, e.g. zlib.Z_RLE.
+    """
+    filtered = __FilterRows(rows, bytesPerPixel, filterStrategy)
+
+    compressor = zlib.compressobj(compressionLevel, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlibStrategy)
+    idat = compressor.compress(filtered.tobytes()) + compressor.flush()
+
+    header = struct.pack(">IIBBBBB", width, height, 8, colorType, 0, 0, 0)
+
+    with open(fileName, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(__CreateChunk(b"IHDR", header))
+
+        for chunkType, chunkData in extraChunks:
+            file.write(__CreateChunk(chunkType, chunkData))
+
+        file.write(__CreateChunk(b"IDAT", idat))
+        file.write(__CreateChunk(b"IEND", b""))
+
+def WritePngRgba(fileName : str, pixels : npt.NDArray[np.uint8], compressionLevel : int = 6,
+                 filterStrategy : str = PNG_FILTER_ADAPTIVE, zlibStrategy : int = zlib.Z_DEFAULT_STRATEGY) -> None:
+    """ Writes RGBA pixels to a PNG file without any GUI toolkit.
+
+    Args:
+        fileName (str): The name of the PNG file.
+        pixels (npt.NDArray[np.uint8]): The RGBA pixels in a 3D array [Height, Width, 4].
+        compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+        filterStrategy (str, optional): The PNG row filter or "adaptive". Defaults to "adaptive".
+        zlibStrategy (int, optional): The zlib compression strategy. Defaults to zlib.Z_DEFAULT_STRATEGY.
+    """
+    height, width, _ = pixels.shape
+    rows = np.ascontiguousarray(pixels, np.uint8).reshape(height, width * 4)
+
+    __WritePng(fileName, width, height, PNG_COLOR_TYPE_RGBA, rows, 4, [], compressionLevel, filterStrategy, zlibStrategy)
+
+def WritePngIndexed(fileName : str, pixels : npt.NDArray[np.uint8], paletteRgb : list[int] | npt.NDArray[np.uint32],
+                    transparentIndex : int | None = 0, compressionLevel : int = 6,
+                    filterStrategy : str = "none", zlibStrategy : int = zlib.Z_DEFAULT_STRATEGY) -> None:
+    """ Writes palette indexed pixels to an 8 bit PNG file.
+        Missing palette entries for pixel values outside the palette are written as black.
+
+    Args:
+        fileName (str): The name of the PNG file.
+        pixels (npt.NDArray[np.uint8]): The palette indices in a 2D array [Height, Width].
+        paletteRgb (list[int] | npt.NDArray[np.uint32]): The palette as 0xRRGGBB values, at most 256 colors.
+        transparentIndex (int | None, optional): The transparent palette index (tRNS chunk). Defaults to 0.
+        compressionLevel (int, optional): The zlib compression level 0..9. Defaults to 6.
+        filterStrategy (str, optional): The PNG row filter or "adaptive". Defaults to "none".
+        zlibStrategy (int, optional): The zlib compression strategy. Defaults to zlib.Z_DEFAULT_STRATEGY.
+    """
+    height, width = pixels.shape
+    rows = np.ascontiguousarray(pixels, np.uint8)
+
+    palette = np.asarray(paletteRgb, np.uint32)[:256]
+    numberOfColors = max(len(palette), int(rows.max()) + 1 if rows.size > 0 else 1)
+
+    if transparentIndex is not None:
+        numberOfColors = max(numberOfColors, transparentIndex + 1)
+
+    colors = np.zeros(numberOfColors, np.uint32)
+    colors[: len(palette)] = palette
+
+    plte = np.empty((numberOfColors, 3), np.uint8)
+    plte[:, 0] = (colors >> 16) & 0xFF
+    plte[:, 1] = (colors >> 8) & 0xFF
+    plte[:, 2] = colors & 0xFF
+
+    extraChunks = [(b"PLTE", plte.tobytes())]
+
+    if transparentIndex is not None:
+        trns = bytearray(b"\xFF" * (transparentIndex + 1))
+        trns[transparentIndex] = 0
+        extraChunks.append((b"tRNS", bytes(trns)))
+
+    __WritePng(fileName, width, height, PNG_COLOR_TYPE_PALETTE, rows, 1, extraChunks, compressionLevel, filterStrategy, zlibStrategy)
@@ -23,7 +23,11 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 IN THE SOFTWARE.
 """
 
+import os
 from enum import IntEnum
+import numpy as np
+import numpy.typing as npt
+from Kknd2Reader.PngFile import ReadPngRgba
 
 class ETerrainAttribute(IntEnum):
     OPEN = 0
@@ -69,3 +73,60 @@ class ETerrainAttribute(IntEnum):
 
     UNDERGROUND = 35
 
+
+# number of terrain attribute icons in the icon file
+NUMBER_OF_TERRAIN_ATTRIBUTES = len(ETerrainAttribute)
+
+# the icon file with one 32x32 icon per terrain attribute
+TerrainAttributeIconsFileName = os.path.join(os.path.dirname(__file__), "TerrainAttributeIcons.png")
+
+def LoadTerrainAttributeIcons(fileName : str = TerrainAttributeIconsFileName, tileWidth : int = 32, tileHeight : int = 32) -> npt.NDArray[np.uint8]:
+    """ Reads the terrain attribute icons that are stored side by side in one PNG file.
+        The icon of the attribute OPEN is always transparent.
+
+    Args:
+        fileName (str, optional): The name of the PNG file with the terrain attribute icons.
+        tileWidth (int, optional): The tile width in pixels, the icons are cropped or padded to this width. Defaults to 32.
+        tileHeight (int, optional): The tile height in pixels, the icons are cropped or padded to this height. Defaults to 32.
+
+    Returns:
+        npt.NDArray[np.uint8]: The RGBA icons in a 4D array [Attribute, TileHeight, TileWidth, 4].
+    """
+    iconImage = ReadPngRgba(fileName)
+    iconHeight = iconImage.shape[0]
+    iconWidth = iconImage.shape[1] // NUMBER_OF_TERRAIN_ATTRIBUTES
+
+    # split the image into the single icons
+    iconImage = iconImage[:, : iconWidth * NUMBER_OF_TERRAIN_ATTRIBUTES]
+    icons = iconImage.reshape(iconHeight, NUMBER_OF_TERRAIN_ATTRIBUTES, iconWidth, 4).transpose(1, 0, 2, 3)
+
+    iconList = np.zeros((NUMBER_OF_TERRAIN_ATTRIBUTES, tileHeight, tileWidth, 4), np.uint8)
+    h = min(iconHeight, tileHeight)
+    w = min(iconWidth, tileWidth)
+    iconList[:, :h, :w] = icons[:, :h, :w]
+
+    iconList[ETerrainAttribute.OPEN] = 0
+
+    return iconList
+
+def RenderTerrainAttributesRgba(attributeMap : npt.NDArray[np.uint8], icons : npt.NDArray[np.uint8]) -> npt.NDArray[np.uint8]:
+    """ Renders the terrain attribute overlay with one gather over the icon list.
+
+    Args:
+        attributeMap (npt.NDArray[np.uint8]): The terrain attribute of each tile in a 2D array [MapHeightInTiles, MapWidthInTiles].
+        icons (npt.NDArray[np.uint8]): The icons from LoadTerrainAttributeIcons().
+
+    Returns:
+        npt.NDArray[np.uint8]: The RGBA overlay in a 3D array [MapHeightInPixels, MapWidthInPixels, 4].
+    """
+    mapHeightInTiles, mapWidthInTiles = attributeMap.shape
+    _, tileHeight, tileWidth, _ = icons.shape
+
+    if attributeMap.size > 0 and int(attributeMap.max()) >= len(icons):
+        raise Exception(f"Invalid terrain attribute: {int(attributeMap.max())}")
+
+    # [TileRow, TileColumn, PixelRow, PixelColumn, 4] -> [TileRow, PixelRow, TileColumn, PixelColumn, 4]
+    tiles = icons[attributeMap]
+    overlay = tiles.transpose(0, 2, 1, 3, 4).reshape(mapHeightInTiles * tileHeight, mapWidthInTiles * tileWidth, 4)
+
+    return overlay
@@ -0,0 +1,135 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from Kknd2Reader.KkndFileCompression import UncompressFile
+from Kknd2Reader.KkndFileContainer import ReadFileTypeList, ContainerFile
+from Kknd2Reader.KkndFileMobd import MobdFile, NUMBER_OF_TEAM_COLORS
+from Kknd2Reader.KkndAtlas import SpriteAtlas, DEFAULT_ATLAS_PADDING
+from Kknd2Reader.KkndSpriteExport import ExportSprites, IMAGE_FORMATS, IMAGE_FORMAT_PNG
+from Kknd2Reader import KkndPalette
+
+import argparse
+import os
+import time
+
+# the team color argument for the local MOBD palette
+LOCAL_PALETTE_ARGUMENT = "local"
+
+def LoadMobdFiles(containerFileName : str, contentJsonFileName : str | None = None) -> list[ContainerFile]:
+    """ Reads the MOBD files of a sprite container.
+
+    Args:
+        containerFileName (str): The sprite container, e.g. gamesprt.lpk.
+        contentJsonFileName (str | None, optional): A JSON file with the names of the MOBD files. Defaults to None.
+
+    Returns:
+        list[ContainerFile]: The MOBD files.
+    """
+    containerData, _, _ = UncompressFile(containerFileName)
+    fileTypeList, _ = ReadFileTypeList(containerData, contentJsonFileName)
+
+    if len(fileTypeList) != 1 or fileTypeList[0].FileType != "MOBD":
+        raise Exception("Unexpected file type")
+
+    return fileTypeList[0].FileList
+
+def ParseTeamColor(teamColor : str) -> int | None:
+    """ Converts the team color argument, "local" is the local MOBD palette.
+    """
+    return None if teamColor == LOCAL_PALETTE_ARGUMENT else int(teamColor)
+
+def ExportAtlases(mobdFileList : list[ContainerFile], outDir : str, teamColorId : int | None = 0,
+                  padding : int = DEFAULT_ATLAS_PADDING) -> None:
+    """ Packs the frames of each MOBD file into a texture atlas and writes it as PNG + JSON.
+
+    Args:
+        mobdFileList (list[ContainerFile]): The MOBD files.
+        outDir (str): The output directory.
+        teamColorId (int | None, optional): The team color, None for the local MOBD palette. Defaults to 0.
+        padding (int, optional): The number of transparent pixels between the frames. Defaults to DEFAULT_ATLAS_PADDING.
+    """
+    startTime = time.perf_counter()
+    os.makedirs(outDir, exist_ok = True)
+
+    frameCount = 0
+    rectCount = 0
+
+    for file in mobdFileList:
+        atlas = SpriteAtlas(MobdFile(file), teamColorId, padding)
+        pngFileName, _ = atlas.Export(os.path.join(outDir, f"{file.Index:03}_{file.FileName}"))
+
+        frameCount += sum(len(frameList) for frameList in atlas.FrameList)
+        rectCount += len(atlas.RectList)
+        print(f"{pngFileName} {atlas.Width}x{atlas.Height}")
+
+    print(f"{len(mobdFileList)} atlases, {frameCount} frames, {rectCount} unique images in {time.perf_counter() - startTime:.1f} s")
+
+def Main() -> None:
+    parser = argparse.ArgumentParser(description = "KKND2 sprite tool")
+    parser.add_argument("--container", default = os.path.join("assets", "spritesheets", "gamesprt.lpk"), help = "sprite container (*.lpk)")
+    parser.add_argument("--names", default = os.path.join("Kknd2Reader", "gamesprt.lpk.json"), help = "JSON file with the MOBD file names")
+    parser.add_argument("--palettes", default = os.path.join("assets", "palettes"), help = "directory with the team palettes (*.pal)")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    teamColorChoices = [LOCAL_PALETTE_ARGUMENT] + [str(i) for i in range(NUMBER_OF_TEAM_COLORS)]
+
+    commandAtlas = commands.add_parser("atlas", help = "pack the frames of each MOBD file into a texture atlas (PNG + JSON)")
+    commandAtlas.add_argument("files", nargs = "*", type = int, help = "MOBD file indices, default all")
+    commandAtlas.add_argument("--out", default = "atlas", help = "output directory")
+    commandAtlas.add_argument("--team", default = "0", choices = teamColorChoices, help = "team color or the local MOBD palette")
+    commandAtlas.add_argument("--padding", type = int, default = DEFAULT_ATLAS_PADDING, help = "transparent pixels between the frames")
+
+    commandExport = commands.add_parser("export", help = "export the frames of all MOBD files in parallel as PNG files")
+    commandExport.add_argument("files", nargs = "*", type = int, help = "MOBD file indices, default all")
+    commandExport.add_argument("--out", default = "sprites", help = "output directory")
+    commandExport.add_argument("--teams", nargs = "+", default = ["0"], choices = teamColorChoices, help = "team colors or the local MOBD palette")
+    commandExport.add_argument("--format", default = IMAGE_FORMAT_PNG, choices = IMAGE_FORMATS, help = "RGBA PNG or 8 bit palette PNG")
+    commandExport.add_argument("--workers", type = int, default = None, help = "number of worker processes")
+    commandExport.add_argument("--restart", action = "store_true", help = "export all files again instead of resuming from the manifest")
+
+    args = parser.parse_args()
+
+    names = args.names if os.path.isfile(args.names) else None
+    mobdFileList = LoadMobdFiles(args.container, names)
+
+    if len(args.files) > 0:
+        mobdFileList = [file for file in mobdFileList if file.Index in args.files]
+
+    if args.command == "atlas":
+        teamColorId = ParseTeamColor(args.team)
+        if teamColorId is not None:
+            KkndPalette.load_palettes(args.palettes)
+
+        ExportAtlases(mobdFileList, args.out, teamColorId, args.padding)
+
+    elif args.command == "export":
+        teamColorIds = [ParseTeamColor(teamColor) for teamColor in args.teams]
+        palettesDir = args.palettes if any(teamColorId is not None for teamColorId in teamColorIds) else None
+
+        ExportSprites(mobdFileList, args.out, teamColorIds, args.format, palettesDir, args.workers, not args.restart)
+
+if __name__ == "__main__":
+    
+    Main()
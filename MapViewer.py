@@ -31,24 +31,36 @@ import wx.lib.scrolledpanel as wxls
 import os
 import threading
 from pathlib import Path
+import numpy as np
+import numpy.typing as npt
 
 import Kknd2Reader.KkndFileMapd as mapd
 import Kknd2Reader.TerrainAttributes as ta
 import Kknd2Reader.KkndFileCplc as cplc
 import Kknd2Reader.PrettyJson as pjson
+import Kknd2Reader.PngFile as png
 from Kknd2Reader.KkndCreatureLib import CreatureLibrary
+from Kknd2Reader.ExportTiled import ExportTiledMap
+from Kknd2Reader.KkndMapPackage import MapPackage
+from Kknd2Reader.KkndEntityRender import EntitySpriteCache, RenderEntitiesRgba
+from WxAdapter import BitmapFromRgba, BitmapFromUInt32Abgr
 
 class FrameMain(wx.Frame):
     """ The main window.
     """
 
     __creatureLibrary : CreatureLibrary | None
+    __entitySprites : EntitySpriteCache
+    __cplcFile : cplc.CplcFile | None
 
     BitmapBottom : wx.Bitmap
     BitmapTop : wx.Bitmap
     BitmapAttributes : wx.Bitmap
     BitmapEntities : wx.Bitmap
 
+    # the maximum distance in pixels between the mouse cursor and an entity to select it
+    ENTITY_HIT_DISTANCE = 16
+
     def __init__(self):
         super().__init__(None, title = "KKND2 Map Viewer", size = (1000, 800))
 
@@ -57,28 +69,23 @@ class FrameMain(wx.Frame):
 
         self.__terrainAttributeIconList = FrameMain.__LoadTerrainAttributeIcons(terrainIconsPath)
         self.__creatureLibrary = FrameMain.__LoadCreatureLib(creatureLibPath)
+        self.__entitySprites = EntitySpriteCache(self.__creatureLibrary)
+        self.__cplcFile = None
 
         self.__CreateMenuBar()
         self.__CreateWidgets()
 
     @staticmethod
-    def __LoadTerrainAttributeIcons(fileName : str) -> list[wx.Bitmap]:
+    def __LoadTerrainAttributeIcons(fileName : str) -> npt.NDArray[np.uint8]:
         """ Reads the terrain attribute icons that are stored in one PNG file.
 
         Args:
             fileName (str): The name of the PNG file with the terrain attribute icons.
 
         Returns:
-            list[wx.Bitmap]: The terrain aatribute icons.
+            npt.NDArray[np.uint8]: The terrain attribute icons [Attribute, Height, Width, 4].
         """
-        terrainAttributeIcons = wx.Bitmap(fileName)
-        terrainAttributeIconList : list[wx.Bitmap] = []
-
-        for idx in range(36):
-            icon = terrainAttributeIcons.GetSubBitmap(wx.Rect(idx * 32, 0, 32, 32))
-            terrainAttributeIconList.append(icon)
-
-        return terrainAttributeIconList
+        return ta.LoadTerrainAttributeIcons(fileName)
 
     @staticmethod
     def __LoadCreatureLib(fileName : str) -> CreatureLibrary | None:
@@ -108,6 +115,7 @@ class FrameMain(wx.Frame):
         scrollPanel.SetupScrolling()
 
         self.__imageControl = wx.StaticBitmap(scrollPanel)
+        self.__imageControl.Bind(wx.EVT_MOTION, self.OnMouseMoveOverMap)
 
         scrollPanelSizer = wx.BoxSizer(wx.VERTICAL)
         scrollPanelSizer.Add(self.__imageControl)
@@ -122,6 +130,8 @@ class FrameMain(wx.Frame):
         self.__scrollPanelSizer = scrollPanelSizer
         self.__scrollPanel = scrollPanel
 
+        self.CreateStatusBar()
+
     def __CreateMenuBar(self) -> None:
         """ Creates the main menu.
         """
@@ -143,6 +153,7 @@ class FrameMain(wx.Frame):
 
         menuExport = wx.Menu()
         itemExportMap = menuExport.Append(-1, "Export map to JSON + PNG")
+        itemExportTiledMap = menuExport.Append(-1, "Export map to Tiled (TMX)")
 
         menu = wx.MenuBar()
         menu.Append(menuFile, "File")
@@ -159,6 +170,7 @@ class FrameMain(wx.Frame):
         self.Bind(wx.EVT_MENU, self.OnVisibleLayerChanged, self.__itemViewEntities)
 
         self.Bind(wx.EVT_MENU, self.OnExportMap, itemExportMap)
+        self.Bind(wx.EVT_MENU, self.OnExportTiledMap, itemExportTiledMap)
 
     def OnOpenMapFile(self, event):
         """ Loads a map file.
@@ -182,6 +194,25 @@ class FrameMain(wx.Frame):
         """
         self.__UpdateViewLayersAndAttributes()
 
+    def OnMouseMoveOverMap(self, event):
+        """ Shows the entity under the mouse cursor in the status bar.
+        """
+        event.Skip()
+
+        if self.__cplcFile is None or not self.__itemViewEntities.IsChecked():
+            self.SetStatusText("")
+            return
+
+        pos = event.GetPosition()
+        index = self.__cplcFile.GetSpatialIndex().QueryNearest(pos.x, pos.y, FrameMain.ENTITY_HIT_DISTANCE)
+
+        if index is None:
+            self.SetStatusText(f"{pos.x}, {pos.y}")
+            return
+
+        entity = self.__cplcFile.EntityList[index]
+        self.SetStatusText(f"{pos.x}, {pos.y}: {entity.Name} (ID {entity.Id}) at {entity.X}, {entity.Y}")
+
     def OnExportMap(self, event):
         """ Exports the map data to JSON + PNG.
         """
@@ -192,6 +223,16 @@ class FrameMain(wx.Frame):
         dlg.ShowModal()
         dlg.Destroy()
 
+    def OnExportTiledMap(self, event):
+        """ Exports the map for the Tiled map editor.
+        """
+        baseFileName = str(Path(self.__mapFileName).with_suffix(""))
+        fileNameTmx = ExportTiledMap(self.__map, baseFileName)
+
+        dlg = wx.MessageDialog(None, f"Map exported to {fileNameTmx}", "Export finished", wx.OK | wx.ICON_INFORMATION)
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def ShowError(self, err : str) -> None:
         """ Shows an error message.
 
@@ -210,14 +251,14 @@ class FrameMain(wx.Frame):
         """
         try:
             with wx.BusyInfo("Please wait, loading ...", self):
-                maps = mapd.ReadMaps(mapFileName)
-                map = maps[0]
-                cplcFile = cplc.ReadCplcFile(mapFileName, self.__creatureLibrary)
+                mapPackage = MapPackage(mapFileName)
+                map = mapPackage.GetMap()
+                cplcFile = mapPackage.GetCplcFile(self.__creatureLibrary)
 
                 self.BitmapBottom = FrameMain.RenderBitmapFromLayer(map, 0)
                 self.BitmapTop = FrameMain.RenderBitmapFromLayer(map, 1)
                 self.BitmapAttributes = FrameMain.RenderBitmapFromTerrainAttributes(map, self.__terrainAttributeIconList)
-                self.BitmapEntities = FrameMain.RenderBitmapFromEntities(map, cplcFile)
+                self.BitmapEntities = FrameMain.RenderBitmapFromEntities(map, cplcFile, self.__entitySprites)
 
                 self.__UpdateViewLayersAndAttributes()
 
@@ -240,83 +281,42 @@ class FrameMain(wx.Frame):
         Returns:
             wx.Bitmap: The rendered bitmap.
         """
-        layer = map.LayerList[layerIndex]
         imageData = map.RenderLayerUint32Abgr(layerIndex)
-        data = imageData.transpose().tobytes()
-
-        bitmap = wx.Bitmap.FromBufferRGBA(layer.MapWidthInPixels, layer.MapHeightInPixels, data)
-        return bitmap
+        return BitmapFromUInt32Abgr(imageData.transpose())
 
     @staticmethod
-    def RenderBitmapFromTerrainAttributes(map : mapd.MapdFile, terrainAttributeIcons : list[wx.Bitmap]) -> wx.Bitmap:
+    def RenderBitmapFromTerrainAttributes(map : mapd.MapdFile, terrainAttributeIcons : npt.NDArray[np.uint8]) -> wx.Bitmap:
         """ Renders the tile attributes view in a bitmap.
 
         Args:
             map (mapd.MapdFile): The map with the layers and tile attributes.
-            terrainAttributeIcons (list[wx.Bitmap]): The tile attribute icons.
+            terrainAttributeIcons (npt.NDArray[np.uint8]): The tile attribute icons.
 
         Returns:
             wx.Bitmap: The attribute bitmap for the whole map.
         """
-
-        layerBottom = map.LayerList[0]
-        tileWidth = layerBottom.TileWidthInPixels
-        tileHeight = layerBottom.TileHeightInPixels
-
-        bmp = wx.Bitmap(layerBottom.MapWidthInPixels, layerBottom.MapHeightInPixels, 32)
-
-        dc = wx.MemoryDC()
-        dc.SelectObject(bmp)
-        dc.SetBackground(wx.Brush(wx.WHITE, wx.BRUSHSTYLE_TRANSPARENT))
-        dc.Clear()
-
-        for tileRow in range(layerBottom.MapHeightInTiles):
-           for tileColumn in range(layerBottom.MapWidthInTiles):
-               attribute = layerBottom.TerrainAttributes.GetTerrainAttribute(tileColumn, tileRow)
-
-               if attribute != ta.ETerrainAttribute.OPEN:
-                   attributeIcon = terrainAttributeIcons[attribute]
-                   dc.DrawBitmap(attributeIcon, tileColumn * tileWidth, tileRow * tileHeight)
-
-        dc.SelectObject(wx.NullBitmap)
-        return bmp
+        overlay = map.RenderTerrainAttributesRgba(terrainAttributeIcons)
+        return BitmapFromRgba(overlay)
 
     @staticmethod
-    def RenderBitmapFromEntities(map : mapd.MapdFile, cplcFile : cplc.CplcFile) -> wx.Bitmap:
-        """ Renders the tile attributes view in a bitmap.
+    def RenderBitmapFromEntities(map : mapd.MapdFile, cplcFile : cplc.CplcFile, spriteCache : EntitySpriteCache) -> wx.Bitmap:
+        """ Renders the entities view in a bitmap.
 
         Args:
             map (mapd.MapdFile): The map with the layers and tile attributes.
             cplcFile (cplc.CplcFile): The CPLC file with the entities.
+            spriteCache (EntitySpriteCache): The creature images.
 
         Returns:
-            wx.Bitmap: The attribute bitmap for the whole map.
+            wx.Bitmap: The entities bitmap for the whole map.
         """
 
         layerBottom = map.LayerList[0]
+        width = layerBottom.MapWidthInPixels
+        height = layerBottom.MapHeightInPixels
 
-        bmp = wx.Bitmap(layerBottom.MapWidthInPixels, layerBottom.MapHeightInPixels, 32)
-
-        dc = wx.MemoryDC()
-        dc.SelectObject(bmp)
-        dc.SetBackground(wx.Brush(wx.WHITE, wx.BRUSHSTYLE_TRANSPARENT))
-        dc.Clear()
-
-        for entity in cplcFile.EntityList:
-            if entity.Image is None:
-                r = 10
-                x = entity.X - r
-                y = entity.Y - r
-                dc.DrawCircle(x, y, r)
-            else:
-                entityBmp = wx.Bitmap(entity.Image)
-                x = entity.X - entity.Image.Width // 2
-                y = entity.Y - entity.Image.Height // 2
-            
-                dc.DrawBitmap(entityBmp, x, y)
-
-        dc.SelectObject(wx.NullBitmap)
-        return bmp
+        overlay = RenderEntitiesRgba(cplcFile, spriteCache, width, height)
+        return BitmapFromRgba(overlay)
 
     def __RenderLayerView(self, bottomLayerVisible : bool, topLayerVisible : bool, attributesVisible : bool,
                           entitiesVisible : bool, transparentBackground : bool) -> wx.Bitmap:
@@ -375,35 +375,35 @@ class FrameMain(wx.Frame):
 
     def ExportMap(self, baseFileName : str) -> None:
         """ Exports the currently loaded map for use in other programs.
-            Creates 3 files:
+            Creates 4 files:
 
-                map_bottom.png   -> the bottem layer
-                map_top.png      -> the top layer
-                map.json         -> map informations
+                map_bottom.png      -> the bottem layer
+                map_top.png         -> the top layer
+                map_attributes.png  -> the terrain attributes
+                map.json            -> map informations
 
         Args:
-            baseFileName (str): The base filename for the 3 created files.
+            baseFileName (str): The base filename for the 4 created files.
         """
 
-        # export bottom layer as PNG
+        # export bottom layer as 8 bit palette PNG
         fileNameBottomLayer = baseFileName + "_bottom.png"
-        bmpBottom = self.__RenderLayerView(True, False, False, False, True)
-        bmpBottom.SaveFile(fileNameBottomLayer, wx.BITMAP_TYPE_PNG)
+        self.__map.ExportLayerPng(0, fileNameBottomLayer)
 
-        # export top layer as PNG
+        # export top layer as 8 bit palette PNG
         fileNameTopLayer = baseFileName + "_top.png"
-        bmpTop = self.__RenderLayerView(False, True, False, False, True)
-        bmpTop.SaveFile(fileNameTopLayer, wx.BITMAP_TYPE_PNG)
+        self.__map.ExportLayerPng(1, fileNameTopLayer)
+
+        # export terrain attributes as PNG
+        fileNameAttributes = baseFileName + "_attributes.png"
+        overlay = self.__map.RenderTerrainAttributesRgba(self.__terrainAttributeIconList)
+        png.WritePngRgba(fileNameAttributes, overlay)
 
         layer = self.__map.LayerList[0]
 
         # create tile terrain attribute map
-        attributeMapRows = []
-        for tileRow in range(layer.MapHeightInTiles):
-            row = []
-            for tileColumn in range(layer.MapHeightInTiles):
-                row.append(int(layer.TerrainAttributes.GetTerrainAttribute(tileColumn, tileRow)))
-            attributeMapRows.append(pjson.JsonFlatList(row))
+        attributeMap = layer.TerrainAttributes.TerrainAttributeMap
+        attributeMapRows = [pjson.JsonFlatList(row) for row in attributeMap.tolist()]
 
         # create entity list
         cplcFile = self.__cplcFile
@@ -423,6 +423,7 @@ class FrameMain(wx.Frame):
         info = {
             "BottomLayer" : str(Path(fileNameBottomLayer).name),
             "TopLayer" : str(Path(fileNameTopLayer).name),
+            "AttributeLayer" : str(Path(fileNameAttributes).name),
             "TileWidthInPixels" : layer.TileWidthInPixels,
             "TileHeightInPixels" : layer.TileHeightInPixels,
             "MapWidthInTiles" : layer.MapWidthInTiles,
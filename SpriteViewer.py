@@ -30,8 +30,9 @@ import wx.lib.scrolledpanel as wxls
 
 from Kknd2Reader.KkndFileCompression import UncompressFile
 from Kknd2Reader.KkndFileContainer import ReadFileTypeList, ContainerFile
-from Kknd2Reader.KkndFileMobd import MobdFile, SaveMobdFileStructureInfo, MobdColorPalette
+from Kknd2Reader.KkndFileMobd import MobdFile, MobdParseContext, SaveMobdFileStructureInfo, MobdColorPalette, NUMBER_OF_TEAM_COLORS
 from Kknd2Reader import KkndPalette
+from WxAdapter import BitmapFromUInt32Abgr
 
 from pathlib import Path
 from termcolor import cprint
@@ -46,12 +47,26 @@ class FrameMain(wx.Frame):
     __teamColorId : int | None
     __teamColorMenuItemIds : dict[int, int | None]
 
+    # the selected sprite, it is parsed and rendered only once
+    __mobdFileIdx : int | None
+    __mobdFile : MobdFile | None
+
+    # the frame bitmaps of the selected sprite in all team colors (None = local MOBD palette)
+    __frameBitmaps : dict[int | None, list[wx.Bitmap]]
+
+    # the animations image of the selected sprite for each team color shown so far
+    __spriteBitmaps : dict[int | None, wx.Bitmap]
+
     def __init__(self):
         super().__init__(None, title = "KKND2 Sprite Viewer", size = (1000, 800)) 
 
         self.__mobdFileList = FrameMain.__LoadSprites()
         self.__teamColorId = 0
         self.__teamColorMenuItemIds = {}
+        self.__mobdFileIdx = None
+        self.__mobdFile = None
+        self.__frameBitmaps = {}
+        self.__spriteBitmaps = {}
 
         self.__CreateMenuBar()
         self.__CreateWidgets()
@@ -102,7 +117,7 @@ class FrameMain(wx.Frame):
         itemTeamColorLocal = menuTeamColor.AppendRadioItem(-1, "Local MOBD palette")
         self.__teamColorMenuItemIds[itemTeamColorLocal.GetId()] = None
 
-        for teamColorId in range(8):
+        for teamColorId in range(NUMBER_OF_TEAM_COLORS):
             itemTeamColor = menuTeamColor.AppendRadioItem(-1, f"Team color {teamColorId}")
             self.__teamColorMenuItemIds[itemTeamColor.GetId()] = teamColorId
 
@@ -137,22 +152,29 @@ class FrameMain(wx.Frame):
         idx = int(self.__listBox.Selection)
 
         mobdFile = MobdFile(self.__mobdFileList[idx])
-        FrameMain.__UpdateBitmap(mobdFile, self.__teamColorId)
 
         animationIdx = 0
         for animation in mobdFile.AnimationList:
             frameIdx = 0
             for frame in animation.FrameList:
-                bmp = frame.Bitmap
-                bmp.SaveFile(f"export image{idx}_{animationIdx}_{frameIdx}.png", wx.BITMAP_TYPE_PNG)
+                frame.ExportPng(f"export image{idx}_{animationIdx}_{frameIdx}.png", self.__teamColorId)
                 frameIdx += 1
 
             animationIdx += 1
 
     def OnMiscExportMobdFileStructure(self, event) -> None:
-        """ Exports the Mobd file structure.
+        """ Exports the Mobd file structure of the selected file.
         """
-        SaveMobdFileStructureInfo("mobd file structure info.txt")
+        if self.__listBox.Selection == wx.NOT_FOUND:
+            return
+
+        idx = int(self.__listBox.Selection)
+
+        context = MobdParseContext()
+        mobdFile = MobdFile(self.__mobdFileList[idx], context)
+        mobdFile.DecodeFrames()
+
+        SaveMobdFileStructureInfo("mobd file structure info.txt", context)
 
     def OnMiscPrintPalette(self, event) -> None:
         """ Prints the palette of the selected animation.
@@ -160,9 +182,9 @@ class FrameMain(wx.Frame):
         idx = int(self.__listBox.Selection)
 
         mobdFile = MobdFile(self.__mobdFileList[idx])
+        mobdFile.DecodeFrames()
 
-        for paletteIdx in MobdColorPalette.MobdColorPalettes:
-            palette : MobdColorPalette = MobdColorPalette.MobdColorPalettes[paletteIdx]
+        for palette in mobdFile.ColorPalettes.values():
             print(f"***** Palette @ {palette.PalettePosition} ")
             colors = palette.ColorsRgb
             for idx in range(len(colors)):
@@ -215,22 +237,39 @@ class FrameMain(wx.Frame):
         # with open(f"test{idx}.bin", "wb") as file:
         #     file.write(self.__mobdFileList[idx].RawData)
 
-        mobdFile = MobdFile(self.__mobdFileList[idx])
-        FrameMain.__UpdateBitmap(mobdFile, self.__teamColorId)
+        if idx != self.__mobdFileIdx:
+            self.__mobdFileIdx = idx
+            self.__mobdFile = MobdFile(self.__mobdFileList[idx])
+            self.__frameBitmaps = FrameMain.__RenderFrameBitmaps(self.__mobdFile)
+            self.__spriteBitmaps = {}
 
-        bmp = FrameMain.__CreateFileAnimationsImage(mobdFile)
-        self.__imageControl.SetBitmap(bmp)
+        if self.__teamColorId not in self.__spriteBitmaps:
+            self.__spriteBitmaps[self.__teamColorId] = FrameMain.__CreateFileAnimationsImage(self.__mobdFile, self.__frameBitmaps[self.__teamColorId])
+
+        self.__imageControl.SetBitmap(self.__spriteBitmaps[self.__teamColorId])
         self.__imageControl.GetParent().Layout()
 
     @staticmethod
-    def __UpdateBitmap(mobdFile : MobdFile, teamColorId : int | None = 0) -> None:
+    def __RenderFrameBitmaps(mobdFile : MobdFile) -> dict[int | None, list[wx.Bitmap]]:
+        """ Renders all frames of a sprite in all team colors, each frame is rendered in one pass for all team colors.
+
+        Args:
+            mobdFile (MobdFile): The sprite.
+
+        Returns:
+            dict[int | None, list[wx.Bitmap]]: The frame bitmaps of all animations for each team color.
+        """
+        teamColorIds : list[int | None] = [None] + list(range(NUMBER_OF_TEAM_COLORS))
+        frameBitmaps : dict[int | None, list[wx.Bitmap]] = {teamColorId: [] for teamColorId in teamColorIds}
+
         for animation in mobdFile.AnimationList:
             for frame in animation.FrameList:
-                if frame.Bitmap is not None:
-                    continue
-                
-                pixelData = frame.RenderFrameUInt32Abgr(teamColorId).transpose().tobytes()
-                frame.Bitmap = wx.Bitmap.FromBufferRGBA(frame.Image.Width, frame.Image.Height, pixelData)
+                images = frame.RenderTeamColorsUInt32Abgr(teamColorIds)
+
+                for teamColorId, image in zip(teamColorIds, images):
+                    frameBitmaps[teamColorId].append(BitmapFromUInt32Abgr(image))
+
+        return frameBitmaps
 
     @staticmethod
     def __CalculateCanvasSize(mobdFile : MobdFile) -> tuple[int, int]:
@@ -255,11 +294,12 @@ class FrameMain(wx.Frame):
         return canvasWidth, canvasHeight
     
     @staticmethod
-    def __CreateFileAnimationsImage(mobdFile : MobdFile) -> wx.Bitmap:
+    def __CreateFileAnimationsImage(mobdFile : MobdFile, frameBitmaps : list[wx.Bitmap]) -> wx.Bitmap:
         """ Draws all animations of a sprite to a bitmap.
 
         Args:
             mobdFile (MobdFile): The sprite to be drawn.
+            frameBitmaps (list[wx.Bitmap]): The bitmaps of all frames in animation order.
 
         Returns:
             wx.Bitmap: The bitmap with all sprite animations. 
@@ -272,13 +312,15 @@ class FrameMain(wx.Frame):
         dc.SetBackground(wx.Brush(wx.WHITE, wx.BRUSHSTYLE_TRANSPARENT))
         dc.Clear()
 
+        frameBitmapIdx = 0
         offsetY = 0
         for animation in mobdFile.AnimationList:
             maxFrameWidth, maxFrameHeight = animation.GetMaxWidthAndHeight()
 
             offsetX = 0
-            for frame in animation.FrameList:
-                dc.DrawBitmap(frame.Bitmap, offsetX, offsetY)
+            for _ in animation.FrameList:
+                dc.DrawBitmap(frameBitmaps[frameBitmapIdx], offsetX, offsetY)
+                frameBitmapIdx += 1
 
                 offsetX += maxFrameWidth
 
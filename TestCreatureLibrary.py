@@ -25,7 +25,7 @@ IN THE SOFTWARE.
 """
 
 from Kknd2Reader.KkndCreatureLib import CreatureLibrary
-import wx # type: ignore
+from Kknd2Reader.PngFile import WritePngRgba
 
 cl = CreatureLibrary()
 cl.ReadLibraryFile("assets/creature.klb")
@@ -34,7 +34,7 @@ for entry in cl.EntryList.values():
     if entry.Image is None:
         continue
 
-    entry.Image.SaveFile(f"tests/Id {entry.Id} {entry.Name}.png", wx.BITMAP_TYPE_PNG) # type: ignore
+    WritePngRgba(f"tests/Id {entry.Id} {entry.Name}.png", entry.Image)
 
     paletteStr = ",".join([f"0x{c:08X}" for c in entry.Palette])
     with open(f"tests/Id {entry.Id} {entry.Name} palette.py", "w") as file:
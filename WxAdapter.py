@@ -0,0 +1,54 @@
+"""
+
+Copyright (C) 2025  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import wx
+
+import numpy as np
+import numpy.typing as npt
+
+def BitmapFromRgba(imageRgba : npt.NDArray[np.uint8]) -> wx.Bitmap:
+    """ Creates a bitmap from an RGBA array of the reader package.
+
+    Args:
+        imageRgba (npt.NDArray[np.uint8]): The image [Height, Width, 4].
+
+    Returns:
+        wx.Bitmap: The bitmap.
+    """
+    height, width, _ = imageRgba.shape
+    return wx.Bitmap.FromBufferRGBA(width, height, np.ascontiguousarray(imageRgba).tobytes())
+
+def BitmapFromUInt32Abgr(imageAbgr : npt.NDArray[np.uint32]) -> wx.Bitmap:
+    """ Creates a bitmap from Uint32 ABGR values.
+        (This works only on little endian architecture because then the bytes are in RGBA order.)
+
+    Args:
+        imageAbgr (npt.NDArray[np.uint32]): The image [Height, Width].
+
+    Returns:
+        wx.Bitmap: The bitmap.
+    """
+    height, width = imageAbgr.shape
+    return wx.Bitmap.FromBufferRGBA(width, height, np.ascontiguousarray(imageAbgr).tobytes())